@@ -18,7 +18,7 @@ def is_config_variable(key: str) -> bool:
     :param key: string to be checked
     :return: bool
     """
-    return bool(re.search(r'(GENERAL|NOTFOUND|BDD|EXECUTION|ROCS|JUNIT|JSON|LOGGING)_([a-z]+(?:_[a-z]+)*)', key))
+    return bool(re.search(r'(GENERAL|NOTFOUND|BDD|EXECUTION|ROCS|JUNIT|JSON|PERFORMANCE|LOGGING)_([a-z]+(?:_[a-z]+)*)', key))
 
 
 def split_option(file_obj) -> dict:
@@ -47,6 +47,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-c", "--config", help="Path to alternative config file")
     parser.add_argument("-d", "--diff", help="Path to diff file to proceed")
+    parser.add_argument("-p", "--plan", action="store_true",
+                        help="Print sync plan and number of HTTP calls it takes without exporting")
     args = parser.parse_args()
     config_path = args.config if args.config else None
     diff_path = args.diff if args.diff else None
@@ -56,7 +58,10 @@ def main():
         files_list = get_list_of_feature_files_to_proceed(config=config, diff=diff_path)
         bdd_parser = BddParser(config_path)
         bdd_parser.read_files(files_list)
-        bdd_parser.do_export_results()
+        if args.plan:
+            print(bdd_parser.plan())
+        else:
+            bdd_parser.do_export_results()
     except Exception as e:
         logger.exception(e)
 
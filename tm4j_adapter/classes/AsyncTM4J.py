@@ -0,0 +1,636 @@
+"""
+Asyncio client for TM4J API. Mirrors thread-safe TM4J operations (get_testcase, get_testcycle,
+create_test_result and so on): every method gets handles it works with as arguments and returns
+the found or created ones, so one client instance serves all coroutines running on the event loop.
+Requests and responses are made and parsed by the same BaseTm4j functions as TM4J ones.
+"""
+import asyncio
+import json
+import time
+from typing import List
+import aiohttp
+from classes.BaseTm4j import _check_error_status, _make_test_result_payload, _project_id, _internal_id_url, \
+    _testcase_lookup, _testcase_search_url, _testcases_page_url, _get_cached_testcase, _cache_testcase, \
+    _forget_cached_testcase, _make_new_testcase_payload, _testcycle_search_url, _make_testcycle_payload, \
+    _make_folder_payload, _foldertree_url, _make_environment_payload, _existing_environment_name, _jira_search_url, \
+    _jira_issue_keys, _make_testcycle_links, _test_result_handle, _testrun_items_url, _datarow_results_url, \
+    _datarow_ids
+from classes.DataStructures import TestCaseExecution, TestCaseHandle, TestCycleHandle, TestResultHandle, \
+    PendingTestResult
+from classes.TestCaseIndex import get_shared_testcase_index
+from classes.FolderTree import FolderTree, get_shared_folder_tree, folder_paths
+from classes.EnvironmentRegistry import get_shared_environment_registry
+from classes.TestRunItemIndex import get_shared_testrun_item_index
+from libs.batching import AsyncBulkAccumulator
+from libs.concurrency import AsyncAdaptiveLimiter, is_adaptive, make_limiter
+from libs.jira_issues import JiraIssueResolver, issue_batch_size
+from libs.config import read_config
+from libs.persistent_cache import get_shared_cache, TESTCASE_ID, TESTRUN_ID
+from libs.rate_limit import get_shared_rate_limiter
+from libs.retry import RetryPolicy, CONNECTION, EMPTY, classify_status, parse_retry_after, retry_stats
+from libs.single_flight import AsyncSingleFlight
+from libs.trace_links import AsyncTraceLinkAccumulator, link_batch_size
+from libs.tm_log import csv_logger, get_logger
+from libs.zip_members import open_attachment, attachment_name
+from libs.tags_parse_lib import strip_none_values, choose, check_folder_name, is_true
+from classes.Exceptions import TM4JObjectNotFound, TM4JInvalidValue, \
+    TM4JFolderNotFound, TM4JException, TM4JEnvironmentNotFound
+
+# errors of requests using testcase key that mean the testcase is deleted or changed, see BaseTm4j
+TESTCASE_REJECTIONS = (TM4JObjectNotFound, TM4JInvalidValue, aiohttp.ClientResponseError)
+
+
+class AsyncTM4J:
+    """Class to manage testcase and testcycle (find, post executions, attach files) with aiohttp"""
+    def __init__(self, config_path=None):
+        self.config = read_config(config_path)
+        self._baseurl = self.config['GENERAL']['tm4jUrl']
+        self._serviceurl = self._baseurl.replace("atm", "tests")
+        self._jira_url = self._baseurl.replace('atm/1.0', 'api/2')
+        self._login = self.config['GENERAL']['tm4jLogin']
+        self._password = self.config['GENERAL']['tm4jPassword']
+        self.project_key = self.config['GENERAL']['tm4jProjectKey']
+        self.max_in_flight = int(self.config['PERFORMANCE']['asyncMaxInFlight'])
+        self.limiter = None
+        self._rate_limiter = get_shared_rate_limiter(self.config)
+        self._retry_policy = RetryPolicy.from_config(self.config)
+        self.single_flight = AsyncSingleFlight()
+        self._testcase_index = get_shared_testcase_index(self._baseurl, self.project_key)
+        self._folder_trees = {folder_type: get_shared_folder_tree(self._baseurl, self.project_key, folder_type)
+                              for folder_type in ('TEST_CASE', 'TEST_RUN')}
+        self._folder_lock = None
+        self._environments = get_shared_environment_registry(self._baseurl, self.project_key)
+        self._environment_lock = None
+        self._cache = get_shared_cache(self.config)
+        self.trace_links = AsyncTraceLinkAccumulator(self._post_trace_links, link_batch_size(self.config))
+        self.jira_issues = JiraIssueResolver(self._search_jira_issues, issue_batch_size(self.config), self._cache)
+        self.script_results = AsyncBulkAccumulator(self._put_script_results_chunk,
+                                                   int(self.config['PERFORMANCE']['scriptResultBatchSize']),
+                                                   name='Script results')
+        self.logger = get_logger(__name__, self.config)
+        self._session = None
+        self._in_flight = None
+        self._tc_project_id = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+    async def open(self):
+        """opens connection pool bound to the running event loop and resolves project id"""
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, ssl=False)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              auth=aiohttp.BasicAuth(self._login, self._password))
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._folder_lock = asyncio.Lock()
+        self._environment_lock = asyncio.Lock()
+        if is_adaptive(self.config):
+            # asyncMaxInFlight is the hard cap, adaptive limit moves below it
+            self.limiter = make_limiter(self.config, AsyncAdaptiveLimiter)
+            self.limiter.max_limit = max(self.limiter.min_limit, self.max_in_flight)
+        projects = await self._do('get', f'{self._serviceurl}/project')
+        self._tc_project_id = _project_id(projects, self.project_key)
+        await self._load_testcase_index()
+
+    async def _load_testcase_index(self):
+        """loads all project testcases into shared index page by page if turned on in config"""
+        if self._testcase_index.loaded or not is_true(self.config['PERFORMANCE']['preloadTestcases']):
+            return
+        page_size = int(self.config['PERFORMANCE']['preloadPageSize'])
+        start_at = 0
+        while True:
+            page = await self._do('get', _testcases_page_url(self._baseurl, self.project_key, start_at, page_size), '')
+            self._testcase_index.add_many(page)
+            if len(page) < page_size:
+                break
+            start_at += page_size
+        self._testcase_index.loaded = True
+        self.logger.info(f'Testcase index loaded: {len(self._testcase_index)} testcases')
+
+    async def flush_trace_links(self) -> list:
+        """
+        posts trace links collected so far, see TM4J.flush_trace_links
+        :return: payloads of links that were not posted since the last flush
+        """
+        await self.trace_links.flush_async()
+        return self.trace_links.pop_failed()
+
+    async def close(self):
+        if self._session:
+            await self.trace_links.flush_async()
+            await self.script_results.flush_async()
+            await self._session.close()
+            self._session = None
+
+    async def _do(self, method: str, url: str, payload=None, file_path: str = None, expect_response: bool = False,
+                  coalesce: bool = False):
+        """
+        General coroutine to perform HTTP-actions
+        :param coalesce: concurrent GETs of the same url with this flag share one request and its result
+        """
+        if coalesce and method.lower() == 'get':
+            return await self.single_flight.do(url, lambda: self._do(method, url, payload, file_path, expect_response))
+        self.logger.debug(f"HTTP action called with params: {locals()}...")
+        attempts = dict()
+        while True:
+            if file_path:
+                data = aiohttp.FormData()
+                data.add_field('file', await _read_file(file_path), filename=attachment_name(file_path))
+                headers = None
+            else:
+                data = str(payload) if payload else None
+                headers = {'Content-Type': 'application/json'}
+            retry_after = None
+            try:
+                response, text = await self._send(method, url, data, headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error_class = CONNECTION
+                error = e
+            else:
+                self.logger.debug(f'_do response: {text}')
+                error_class = classify_status(response.status)
+                if error_class:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                elif not text and expect_response:
+                    error_class = EMPTY
+                error = f'Status {response.status}'
+            delay = self._retry_policy.next_delay(method, error_class, attempts, retry_after) if error_class else None
+            if delay is None:
+                break
+            self.logger.warning(f'{method.upper()} {url} failed ({error_class}: {error}), '
+                                f'retrying in {delay:.2f}s. Attempts: {attempts}')
+            await asyncio.sleep(delay)
+        retry_stats.register(sum(attempts.values()) + 1)
+        if error_class == CONNECTION:
+            self.logger.exception(error)
+            raise error
+        _check_error_status(response.status, str(response.url), text, payload)
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            self.logger.exception(e)
+            raise e
+        if not text and expect_response:
+            self.logger.error(f'Max retries exceeded')
+            return ''
+        return json.loads(text) if text else ''
+
+    async def _send(self, method: str, url: str, data, headers: dict) -> tuple:
+        """
+        sends request when rate limiter allows and reads response body,
+        reporting latency and outcome to adaptive limiter.
+        In-flight slot is held only for the request itself, not for backoff delays between retries
+        """
+        if self._rate_limiter:
+            await asyncio.sleep(self._rate_limiter.reserve())
+        async with self._in_flight:
+            if self.limiter:
+                await self.limiter.acquire_async()
+            start = time.monotonic()
+            is_error = True
+            try:
+                async with self._session.request(method, url, data=data, headers=headers) as response:
+                    text = await response.text()
+                    is_error = response.status == 429 or response.status >= 500
+                    return response, text
+            finally:
+                if self.limiter:
+                    await self.limiter.release_async(time.monotonic() - start, is_error)
+
+    async def _get_tc_id(self, key: str) -> int:
+        """Function to get internal testcase id"""
+        if not key:
+            raise TM4JInvalidValue('Testcase key not set, find testcase first')
+        internal_id = self._testcase_index.get_internal_id(key)
+        if not internal_id and self._cache:
+            internal_id = self._cache.get(TESTCASE_ID, key)
+        if not internal_id:
+            response = await self._do('get', _internal_id_url(self._serviceurl, 'testcase', key), '', None, True,
+                                      coalesce=True)
+            internal_id = response['id']
+            if self._cache:
+                self._cache.set(TESTCASE_ID, key, internal_id)
+        self._testcase_index.set_internal_id(key, internal_id)
+        return internal_id
+
+    async def _get_tr_id(self, key: str) -> int:
+        """Function to get internal testrun id"""
+        if not key:
+            raise TM4JInvalidValue('Testrun key not set, find testrun first')
+        internal_id = self._cache.get(TESTRUN_ID, key) if self._cache else None
+        if internal_id:
+            return internal_id
+        response = await self._do('get', _internal_id_url(self._serviceurl, 'testrun', key), '', None, True,
+                                  coalesce=True)
+        if self._cache:
+            self._cache.set(TESTRUN_ID, key, response['id'])
+        return response['id']
+
+    def _forget_testcase(self, key: str):
+        """forgets testcase found earlier after a request using its key failed, see TM4J._forget_testcase"""
+        self.logger.info(f'Testcase {key} is outdated, it will be searched again')
+        self._testcase_index.discard(key)
+        _forget_cached_testcase(self._cache, key)
+
+    async def _get_jira_issue_id(self, issue_key: str) -> str:
+        """function to get jira internal issue id from key"""
+        try:
+            return (await self.jira_issues.resolve_async([issue_key]))[issue_key]
+        except Exception as e:
+            self.logger.exception(f'{e}')
+
+    async def _search_jira_issues(self, jql: str, start_at: int, max_results: int) -> dict:
+        """searches Jira issues ids, keys that are not found do not fail the query"""
+        return await self._do('get', _jira_search_url(self._jira_url, jql, start_at, max_results), '')
+
+    async def _create_folder(self, folder_type: str, name: str):
+        """function creates folder of specified type"""
+        self.logger.info(f'Creating new {folder_type} folder {name}')
+        folder = _make_folder_payload(self.config, self.project_key, folder_type, name)
+        await self._do('post', f'{self._baseurl}/folder', payload=strip_none_values(folder))
+        self._folder_trees[folder_type].add(name)
+
+    async def _get_folder_tree(self, folder_type: str) -> FolderTree:
+        """returns folder tree of the type, same as TM4J._get_folder_tree"""
+        tree = self._folder_trees[folder_type]
+        if not tree.loaded:
+            async with self._folder_lock:
+                if not tree.loaded:
+                    folders = await self._get_folder_paths(folder_type)
+                    tree.load(lambda: folders)
+        return tree
+
+    async def _get_folder_paths(self, folder_type: str):
+        """:return: paths of all project folders of the type or None if they cannot be loaded"""
+        if not is_true(self.config['PERFORMANCE']['preloadFolders']):
+            return None
+        url = _foldertree_url(self._serviceurl, self._tc_project_id, folder_type)
+        try:
+            folders = folder_paths(await self._do('get', url, ''))
+        except Exception as e:
+            self.logger.warning(f'Cannot load {folder_type} folders, they will be created when not found: {e}')
+            return None
+        self.logger.info(f'Loaded {len(folders)} {folder_type} folders')
+        return folders
+
+    async def is_folder_missing(self, folder_type: str, folder: str) -> bool:
+        """checks folder in loaded folder tree, False if the tree is not available"""
+        return bool(folder) and not (await self._get_folder_tree(folder_type)).exists(folder)
+
+    async def ensure_folders(self, folder_type: str, folders: list) -> list:
+        """creates missing folders of the type parents first, every folder is created once, see TM4J.ensure_folders
+        :return: created folders"""
+        tree = await self._get_folder_tree(folder_type)
+        async with self._folder_lock:
+            missing = tree.missing([folder for folder in folders if folder])
+            for folder in missing:
+                try:
+                    await self._create_folder(folder_type, folder)
+                except TM4JObjectNotFound:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f'Cannot create {folder_type} folder {folder}, it may exist already: {e}')
+                    tree.add(folder)
+        return missing
+
+    async def _resolve_environment(self, env: str) -> str:
+        """returns name of environment as it is in TM4J, see TM4J._resolve_environment"""
+        if not env:
+            return env
+        async with self._environment_lock:
+            if not self._environments.loaded:
+                names = await self._get_environment_names()
+                self._environments.load(lambda: names)
+            if self._environments.available and not self._environments.find(env):
+                await self._create_environment(env)
+                self._environments.add(env)
+        return self._environments.resolve(env, None)
+
+    async def _get_environment_names(self):
+        """:return: names of project environments or None if they cannot be listed"""
+        try:
+            environments = await self._do('get', f'{self._baseurl}/environments?projectKey={self.project_key}')
+        except Exception as e:
+            self.logger.warning(f'Cannot list environments, they will be checked when results are rejected: {e}')
+            return None
+        return [environment['name'] for environment in environments]
+
+    async def _create_environment(self, env: str):
+        self.logger.info(f' Creating new env: {env}')
+        payload = _make_environment_payload(self.project_key, env)
+        await self._do('post', f'{self._baseurl}/environments', payload=strip_none_values(payload))
+
+    async def _check_environment(self, env: str) -> str:
+        """Function returns case-sensitive name of existing environment or creates a new one"""
+        self.logger.info(f' Got env name error. Checking if env {env} already exists in system.')
+        url = f'{self._baseurl}/environments'
+        existing_environments: List[dict] = await self._do('get', f'{url}?projectKey={self.project_key}')
+        current_env_name = _existing_environment_name(existing_environments, env)
+        if current_env_name:
+            self.logger.error(f'Environment name is case-sensitive! '
+                              f'Fix your config EXECUTION.env = {env} to {current_env_name} '
+                              f'to avoid extra checks')
+            return current_env_name
+        await self._create_environment(env)
+        self._environments.add(env)
+        return env
+
+    async def _add_testcycle_jira_link(self, tr_id: int, linked_issues: str):
+        issues = _jira_issue_keys(linked_issues)
+        try:
+            issue_ids = await self.jira_issues.resolve_async(issues)
+        except Exception as e:
+            self.logger.exception(f'{e}')
+            issue_ids = dict()
+        await self.trace_links.add_async(_make_testcycle_links(tr_id, issues, issue_ids))
+
+    async def _post_trace_links(self, links: list):
+        await self._do('post', f'{self._serviceurl}/tracelink/bulk/create', strip_none_values(links))
+
+    async def _create_testcase(self, name: str, folder: str, test_source_file_path: str = '') -> dict:
+        """creates new testcase and returns its full data"""
+        testcase = _make_new_testcase_payload(self.project_key, name, folder)
+        await self.ensure_folders('TEST_CASE', [folder])
+        response: dict = await self._do('post', f'{self._baseurl}/testcase', payload=strip_none_values(testcase))
+        key = response['key']
+        csv_logger.info('#'.join([key, name, test_source_file_path]))
+        self.logger.info(f'Testcase {key} created successfully.')
+        testcase = await self._do('get', f'{self._baseurl}/testcase/{key}', '')
+        self._testcase_index.add(testcase)
+        _cache_testcase(self._cache, name, folder, testcase)
+        return testcase
+
+    async def _create_testcycle(self,
+                                name: str,
+                                folder: str = None,
+                                linked_issues: str = None,
+                                check_config: bool = False,
+                                executor: str = None) -> TestCycleHandle:
+        """Creates new testcycle and returns it"""
+        url = f'{self._baseurl}/testrun'
+        testrun = _make_testcycle_payload(self.config, self.project_key, name, folder, executor, check_config)
+        folder = testrun['folder'].strip('/')
+        await self.ensure_folders('TEST_RUN', [folder])
+        try:
+            key = (await self._do('post', url, payload=strip_none_values(testrun)))['key']
+        except TM4JFolderNotFound:
+            await self._create_folder('TEST_RUN', folder)
+            key = (await self._do('post', url, payload=strip_none_values(testrun)))['key']
+        internal_id = await self._get_tr_id(key)
+        if linked_issues:
+            await self._add_testcycle_jira_link(internal_id, linked_issues)
+        self.logger.info(f"Testrun {key} created successfully.")
+        data = await self._do('get', f'{url}/{key}', '')
+        return TestCycleHandle(key=key, name=data.get('name'), internal_id=internal_id, data=data)
+
+    async def get_testcase(self,
+                           name: str = None,
+                           key: str = None,
+                           folder: str = None,
+                           test_source_file_path: str = '',
+                           autocreate: bool = False) -> TestCaseHandle:
+        """Search method for testcase, same rules as TM4J.get_testcase.
+        :return: found or created testcase
+        """
+        autocreate = autocreate or is_true(self.config['NOTFOUND']['createTestcase'])
+        name, key, folder = _testcase_lookup(self.config, name, key, folder)
+        url = _testcase_search_url(self._baseurl, self.project_key, name, key, folder)
+        try:
+            testcase = self._testcase_index.find(key, name, folder)
+            if not testcase and not key:
+                testcase = _get_cached_testcase(self._cache, name, folder)
+            if not testcase:
+                missing = not key and (self._testcase_index.is_absent(name, folder) or
+                                       await self.is_folder_missing('TEST_CASE', folder))
+                response = [] if missing else await self._do('get', url, '', None, True, coalesce=True)
+                testcase = response[0]
+                if not key:
+                    _cache_testcase(self._cache, name, folder, testcase)
+            self._testcase_index.add(testcase)
+        except IndexError:
+            if not (autocreate and name):
+                msg = f'find_testcase: testcase {key} not found. ' \
+                      f'Name=\"{name}\" or autocreate={autocreate} do not allow creation'
+                self.logger.exception(msg)
+                raise TM4JObjectNotFound(msg)
+            self.logger.info(f'Cannot find testcase {key} - {name}. Will create a new one')
+            testcase = await self._create_testcase(name, folder, test_source_file_path)
+        except TM4JFolderNotFound:
+            await self._create_folder('TEST_CASE', folder)
+            testcase = await self._create_testcase(name, folder, test_source_file_path)
+        try:
+            internal_id = await self._get_tc_id(testcase['key'])
+        except TM4JObjectNotFound:
+            self._forget_testcase(testcase['key'])
+            raise
+        return TestCaseHandle(key=testcase['key'],
+                              name=testcase.get('name'),
+                              folder=testcase.get('folder'),
+                              internal_id=internal_id,
+                              data=testcase)
+
+    async def get_testcycle(self,
+                            name: str = None,
+                            folder: str = None,
+                            key: str = None,
+                            linked_issues: str = None,
+                            executor: str = None) -> TestCycleHandle:
+        """Search method for testcycle, same rules as TM4J.get_testcycle.
+        :return: found or created testcycle with resolved internal id
+        """
+        if key:
+            url = _testcycle_search_url(self._baseurl, self.project_key, key=key)
+            testrun = (await self._do('get', url, '', coalesce=True))[0]
+        else:
+            name = choose(name, name, self.config['EXECUTION']['testcycleName'])
+            folder = choose(folder, folder, self.config['GENERAL']['trFolder'])
+            check_folder_name(folder)
+            url = _testcycle_search_url(self._baseurl, self.project_key, folder=folder)
+            try:
+                missing = await self.is_folder_missing('TEST_RUN', folder)
+                response = [] if missing else await self._do('get', url, '', coalesce=True)
+                testrun = list(filter(lambda item: item['name'] == name, response))[0]
+            except IndexError:
+                return await self._create_testcycle(name, folder, linked_issues, True, executor)
+            except TM4JFolderNotFound:
+                await self._create_folder('TEST_RUN', folder)
+                return await self._create_testcycle(name, folder, linked_issues, True, executor)
+        return TestCycleHandle(key=testrun['key'],
+                               name=testrun.get('name'),
+                               internal_id=await self._get_tr_id(testrun['key']),
+                               data=testrun)
+
+    async def _get_testcycle_handle(self, testcycle: TestCycleHandle) -> TestCycleHandle:
+        """returns testcycle handle with resolved internal id"""
+        if testcycle.internal_id:
+            return testcycle
+        return testcycle._replace(internal_id=await self._get_tr_id(testcycle.key))
+
+    async def create_test_result(self,
+                                 testcase: TestCaseHandle,
+                                 testcycle: TestCycleHandle,
+                                 status: str,
+                                 environment: str,
+                                 executed_by: str,
+                                 script_results: json = None,
+                                 comment: str = None,
+                                 issue_links: list = None,
+                                 execution_time: str = None) -> TestResultHandle:
+        """
+        Creates test execution result for testcase in testcycle, see TM4J.create_test_result
+        :return: created test result
+        """
+        environment = await self._resolve_environment(environment)
+        payload = _make_test_result_payload(testcase, status, environment, executed_by, script_results, comment,
+                                            issue_links, execution_time)
+        url = f'{self._baseurl}/testrun/{testcycle.key}/testcase/{testcase.key}/testresult'
+        try:
+            response = await self._do('post', url, strip_none_values(payload))
+        except TM4JEnvironmentNotFound:
+            payload.update({'environment': await self._check_environment(env=environment)})
+            response = await self._do('post', url, strip_none_values(payload))
+        except TESTCASE_REJECTIONS:
+            self._forget_testcase(testcase.key)
+            raise
+        if not response:
+            raise TM4JException(f'Cannot post test results.')
+        self.logger.info(f'Test results posted successfully. Testcase:{testcase.key}, Results:{payload}')
+        return _test_result_handle(self._serviceurl, testcycle, testcase.key, response)
+
+    async def create_test_results(self, testcycle: TestCycleHandle, test_results: List[PendingTestResult]) -> list:
+        """
+        Creates several test execution results in testcycle with one request, see TM4J.create_test_results
+        :return: list of created test results in the same order
+        """
+        payload = [dict(_make_test_result_payload(**result._asdict()), testCaseKey=result.testcase.key)
+                   for result in test_results]
+        for item in payload:
+            item.update(environment=await self._resolve_environment(item.get('environment')))
+        url = f'{self._baseurl}/testrun/{testcycle.key}/testresults'
+        try:
+            response = await self._do('post', url, strip_none_values(payload))
+        except TM4JEnvironmentNotFound:
+            environments = {item['environment'] for item in payload if item.get('environment')}
+            environments = {env: await self._check_environment(env=env) for env in environments}
+            for item in payload:
+                item.update({'environment': environments.get(item.get('environment'))})
+            response = await self._do('post', url, strip_none_values(payload))
+        if not response or len(response) != len(payload):
+            raise TM4JException(f'Cannot post test results. Response: {response}')
+        self.logger.info(f'{len(payload)} test results posted successfully into {testcycle.key}')
+        return [_test_result_handle(self._serviceurl, testcycle, result.testcase.key, created)
+                for result, created in zip(test_results, response)]
+
+    async def create_data_driven_test_results(self,
+                                              test_case_execution: TestCaseExecution,
+                                              testcycle: TestCycleHandle = None,
+                                              testcase: TestCaseHandle = None) -> TestResultHandle:
+        """
+        Post execution results from TestCaseExecution Datastructure, see TM4J.create_data_driven_test_results.
+        Data rows results are put in batches, call flush_script_results after the last testcase
+        :return: last test result of testcase
+        """
+        testcase = testcase if testcase else await self.get_testcase(key=test_case_execution.key,
+                                                                     name=test_case_execution.name)
+        testcycle = await self._get_testcycle_handle(
+            testcycle if testcycle else TestCycleHandle(key=test_case_execution.test_cycle_key))
+        execution_details = dict(status=test_case_execution.status,
+                                 environment=test_case_execution.environment,
+                                 executed_by=test_case_execution.executedBy,
+                                 execution_time=str(test_case_execution.executionTime))
+        if test_case_execution.has_data_rows:
+            testrun_item_id, last_test_result_id = await self.get_testrun_item(testcycle, testcase,
+                                                                               **execution_details)
+            await self.put_update_script_status(last_test_result_id)
+            test_case_execution.zip_with_id(await self.get_datarow_ids(testrun_item_id, testcycle.internal_id))
+            if self.script_results.batch_size > 1:
+                await self.script_results.add_async([(test_case_execution, step)
+                                                     for step in test_case_execution.step_results()])
+            else:
+                await self.put_testscript_results(test_case_execution.jsonate())
+            await asyncio.gather(*[self.attach_testcase_step_file(datarow_id=item.testscript_steps_id_list[0],
+                                                                  file_path=item.log_file)
+                                   for item in test_case_execution.data_row_results])
+            self.logger.info(f'Posted {len(test_case_execution.data_row_results)} data row executions'
+                             f'for testcase {testcase.key}')
+            return TestResultHandle(id=last_test_result_id, testcase_key=testcase.key, testcycle_key=testcycle.key)
+        else:
+            test_result = await self.create_test_result(testcase, testcycle, **execution_details)
+            await self.attach_file_to_test_result(test_result, test_case_execution[0].log_file)
+            return test_result
+
+    async def get_testrun_item(self, testcycle: TestCycleHandle, testcase: TestCaseHandle, **kwargs) -> tuple:
+        """
+        Function to get internal testrun item id and last execution id for testcase.
+        If testcase wasn't added into testrun -- new test execution is created
+        :return: testrunitem id, testcase lastTestResult id
+        """
+        url = _testrun_items_url(self._serviceurl, testcycle.internal_id)
+        index = get_shared_testrun_item_index(self._serviceurl, testcycle.internal_id)
+        await index.refresh_async(lambda: self._do('get', url, ''))
+        item = index.get(testcase.key)
+        if item:
+            return item
+        await self.create_test_result(testcase, testcycle, **kwargs)
+        await index.refresh_async(lambda: self._do('get', url, ''), index.mark_posted())
+        item = index.get(testcase.key)
+        if item:
+            return item
+        raise TM4JObjectNotFound(f'Cannot find {testcase.key} run id in testrun {testcycle.internal_id}')
+
+    async def put_update_script_status(self, run_id):
+        """marks testscript of parametrized testcase result as up-to-date"""
+        await self._do('put', f'{self._serviceurl}/testresult/{run_id}/updatetestscripts', f'{{"id":{run_id}}}')
+
+    async def get_datarow_ids(self, run_id: str, tr_internal_id: int) -> dict:
+        """
+        Function to get list of parameterset ids (datarow ids) - in order to post DD executions
+        :return: dict of row id of the last (current) executions
+        """
+        url = _datarow_results_url(self._serviceurl, tr_internal_id, run_id)
+        return _datarow_ids(await self._do('get', url, ''), run_id)
+
+    async def put_testscript_results(self, script_results: str):
+        """Function to post testcase rows execution results"""
+        await self._do('put', f'{self._serviceurl}/testscriptresult/', payload=script_results)
+
+    async def _put_script_results_chunk(self, chunk: list):
+        """:param chunk: list of (TestCaseExecution, step result) pairs"""
+        await self.put_testscript_results(json.dumps([step for _, step in chunk]))
+
+    async def flush_script_results(self) -> list:
+        """
+        Puts data rows results collected by create_data_driven_test_results
+        :return: list of TestCaseExecution which results were not posted
+        """
+        await self.script_results.flush_async()
+        return list({id(tce): tce for tce, _ in self.script_results.pop_failed()}.values())
+
+    async def attach_file_to_testcycle(self, testcycle: TestCycleHandle, file_path: str):
+        """Attach file to TestCycle execution"""
+        await self._do('post', f'{self._baseurl}/testrun/{testcycle.key}/attachments', file_path=file_path)
+        self.logger.debug(f'Attached file to testcycle {testcycle.key}')
+
+    async def attach_file_to_test_result(self, test_result: TestResultHandle, file_path: str):
+        """Attach file to TestCase execution"""
+        if file_path:
+            await self._do('post', f'{self._baseurl}/testresult/{test_result.id}/attachments', file_path=file_path)
+            self.logger.debug(f'Attached file to testcase {test_result.testcase_key}')
+
+    async def attach_testcase_step_file(self, datarow_id: int, file_path: str):
+        """Function to attach data row execution result"""
+        if file_path:
+            await self._do('post', f'{self._serviceurl}/testscriptresult/{datarow_id}/attachment', file_path=file_path)
+            self.logger.debug(f'Attached file to row execution {datarow_id}')
+
+
+async def _read_file(file_path) -> bytes:
+    """reads attachment file or ZipMember in default executor not to block event loop"""
+    def read():
+        with open_attachment(file_path) as file:
+            return file.read()
+    return await asyncio.get_running_loop().run_in_executor(None, read)
@@ -1,42 +1,348 @@
+import atexit
 import json
+import threading
+import time
 import urllib3
 import re
 from typing import List
+from urllib.parse import quote
 from requests import Session, Request, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout, HTTPError
+from libs.concurrency import get_shared_limiter, max_concurrency
+from libs.jira_issues import get_shared_issue_resolver
+from libs.persistent_cache import get_shared_cache, testcase_name_key, TESTCASE, TESTCASE_KEY, TESTCASE_ID, TESTRUN_ID
+from libs.rate_limit import get_shared_rate_limiter
+from libs.retry import RetryPolicy, CONNECTION, EMPTY, classify_status, parse_retry_after, retry_stats
+from libs.single_flight import single_flight
+from libs.trace_links import get_shared_link_accumulator
 from libs.tm_log import csv_logger, get_logger
 from libs.config import read_config
-from libs.tags_parse_lib import is_jira_issue, strip_none_values, choose, check_folder_name, is_true
+from libs.tags_parse_lib import is_jira_issue, strip_none_values, choose, check_folder_name, is_true, \
+    validate_script_results_json, clear_name, split_testcase_name_key
+from classes.DataStructures import TestCaseHandle, TestCycleHandle, TestResultHandle
+from classes.TestRunItemIndex import get_shared_testrun_item_index
+from classes.TestScript import TestScript
+from classes.TestCaseIndex import get_shared_testcase_index
+from classes.FolderTree import FolderTree, get_shared_folder_tree, folder_paths
+from classes.EnvironmentRegistry import get_shared_environment_registry
 from classes.Exceptions import TM4JObjectNotFound, TM4JInvalidValue, TM4JFolderNotFound, TM4JInvalidFolderName, \
     TM4JException, TM4JEnvironmentNotFound
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# errors of requests using testcase key that mean the testcase is deleted or changed
+TESTCASE_REJECTIONS = (TM4JObjectNotFound, TM4JInvalidValue, HTTPError)
+
 
 def _check_error_response(response: Response):
     """function checks for Folder errors"""
-    text = f'Status {response.status_code} for URL {response.url}. Details: "{response.text}. ' \
-        f'Request: {response.request.body}"'
-    if response.status_code == 400:
-        if bool(re.search(r".+not found for field folder.+", response.text)):
-            raise TM4JFolderNotFound(f'{text}')
-        if bool(re.search(r".+folder should start with a slash.+", response.text)):
-            raise TM4JInvalidFolderName(f'{text}')
-        if bool(re.search(r".+was not found for field environment on project+", response.text)):
-            raise TM4JEnvironmentNotFound(f'{text}')
-        if bool(re.search(r".+was not found for field+", response.text)):
-            raise TM4JInvalidValue(f'{text}')
-    elif response.status_code == 404:
-        raise TM4JObjectNotFound(f'{text}')
-    elif response.status_code == 500:
-        raise TM4JException(f'{text}')
+    _check_error_status(response.status_code, response.url, response.text, response.request.body)
+
+
+def _check_error_status(status_code: int, url: str, text: str, body=None):
+    """function maps TM4J error responses to exceptions for both sync and async clients"""
+    message = f'Status {status_code} for URL {url}. Details: "{text}. ' \
+        f'Request: {body}"'
+    if status_code == 400:
+        if bool(re.search(r".+not found for field folder.+", text)):
+            raise TM4JFolderNotFound(f'{message}')
+        if bool(re.search(r".+folder should start with a slash.+", text)):
+            raise TM4JInvalidFolderName(f'{message}')
+        if bool(re.search(r".+was not found for field environment on project+", text)):
+            raise TM4JEnvironmentNotFound(f'{message}')
+        if bool(re.search(r".+was not found for field+", text)):
+            raise TM4JInvalidValue(f'{message}')
+    elif status_code == 404:
+        raise TM4JObjectNotFound(f'{message}')
+    elif status_code == 500:
+        raise TM4JException(f'{message}')
+
+
+def _make_test_result_payload(testcase: TestCaseHandle,
+                              status: str,
+                              environment: str,
+                              executed_by: str,
+                              script_results: json = None,
+                              comment: str = None,
+                              issue_links: list = None,
+                              execution_time: str = None) -> dict:
+    """function makes test result payload for both sync and async clients. Status is set to Fail if any step is Fail"""
+    if script_results:
+        script_results = validate_script_results_json(script_results)
+        status = "Fail" if (list(filter(lambda step: step['status'] == "Fail", script_results))) else status
+    else:
+        script_results = TestScript.make_script_results(script=testcase.data['testScript'],
+                                                        status=status)
+    return dict({'status': status,
+                 'environment': environment,
+                 'comment': comment,
+                 'executedBy': executed_by,
+                 'scriptResults': script_results,
+                 'issueLinks': issue_links,
+                 'executionTime': execution_time})
+
+
+def _make_testcase_payload(values: dict) -> dict:
+    """function makes testcase payload for update and creation from testcase values, e.g. parsed BDD scenario"""
+    folder = values['folder'] if values['folder'][0] == '/' else f"/{values['folder']}"
+    return {
+        'name': values['name'],
+        'objective': values.get('objective', None),
+        'precondition': values.get('precondition', None),
+        'status': values['status'],
+        'priority': values.get('priority', None),
+        'owner': values.get('owner', None),
+        'estimatedTime': values.get('estimatedTime', None),
+        'component': values.get('component', None),
+        'labels': values.get('labels', None),
+        'folder': folder,
+        'parameters': values.get('parameters', None),
+        'issueLinks': values.get('issueLinks', None),
+        'customFields': values.get('customFields', None),
+        'testScript': {'type': 'STEP_BY_STEP', 'steps':
+                       [{k: v for k, v in d.items() if k != 'index'}
+                        for d in values.get('testScript', [])['steps']]}
+    }
+
+
+# request and response helpers shared by TM4J and AsyncTM4J, they differ only in the way requests are sent
+
+def _project_id(projects: list, project_key: str) -> int:
+    return int([x for x in projects if x['key'] == project_key][0]['id'])
+
+
+def _internal_id_url(serviceurl: str, item_type: str, key: str) -> str:
+    """:param item_type: testcase or testrun"""
+    return f'{serviceurl}/{item_type}/{key}?fields=id,projectId'
+
+
+def _testcase_lookup(config, name: str, key: str, folder: str) -> tuple:
+    """
+    function applies testcase search rules: key set or found in the name is searched alone,
+    otherwise name is cleared and searched in folder, config tcFolder if folder is not set
+    :return: name, key, folder to search
+    """
+    if key:
+        return name, key, folder
+    name = clear_name(name)
+    if name == '':
+        raise TM4JInvalidValue('Testcase name cannot be empty!')
+    n_key, n_name = split_testcase_name_key(name, config['GENERAL']['testCaseKeyDelimiter'])
+    if n_key:
+        return n_name, n_key, folder
+    folder = choose(folder, folder, config['GENERAL']['tcFolder'])
+    check_folder_name(folder)
+    return name, key, folder
+
+
+def _testcase_search_url(baseurl: str, project_key: str, name: str = None, key: str = None,
+                         folder: str = None) -> str:
+    """:return: url of testcase search by key or by name and folder"""
+    url = f'{baseurl}/testcase/search?version=1.0&maxResults=10&query='
+    if key:
+        return f'{url} key = "{key}"'
+    return f'{url} projectKey = "{project_key}" AND name = "{_escape_query_value(name)}"' + \
+        choose(folder, f' AND folder = "/{folder}"', '')
+
+
+def _escape_query_value(value: str) -> str:
+    """escapes backslashes and double quotes of value put into search query string"""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _testcases_page_url(baseurl: str, project_key: str, start_at: int, page_size: int, condition: str = '') -> str:
+    """:param condition: additional query condition, e.g. ' AND folder = "/folder"'"""
+    return f'{baseurl}/testcase/search?version=1.0&startAt={start_at}&maxResults={page_size}' \
+        f'&query=projectKey = "{project_key}"{condition}'
+
+
+def _is_cached_testcase_valid(testcase, name: str, folder: str) -> bool:
+    """checks that testcase cached for its name and folder is not forgotten, renamed or moved since"""
+    return bool(testcase) and \
+        testcase_name_key(testcase.get('name'), folder and testcase.get('folder')) == testcase_name_key(name, folder)
+
+
+def _get_cached_testcase(cache, name: str, folder: str):
+    """
+    gets testcase cached for its name and folder in persistent cache without requests. Cached key is trusted
+    until a request using it fails, see _forget_cached_testcase
+    :return: testcase data or None
+    """
+    if not cache:
+        return None
+    cache_key = testcase_name_key(name, folder)
+    key = cache.get(TESTCASE_KEY, cache_key)
+    if not key:
+        return None
+    testcase = cache.get(TESTCASE, key)
+    if not _is_cached_testcase_valid(testcase, name, folder):
+        cache.invalidate(TESTCASE_KEY, cache_key)
+        return None
+    return testcase
+
+
+def _cache_testcase(cache, name: str, folder: str, testcase: dict):
+    """caches testcase data found or saved for name and folder"""
+    if cache:
+        cache.set(TESTCASE, testcase['key'], testcase)
+        cache.set(TESTCASE_KEY, testcase_name_key(name, folder), testcase['key'])
+
+
+def _forget_cached_testcase(cache, key: str):
+    """drops cached testcase after a request using its key failed, so it is searched again by the next lookup"""
+    if cache:
+        cache.invalidate(TESTCASE, key)
+        cache.invalidate(TESTCASE_ID, key)
+
+
+def _make_new_testcase_payload(project_key: str, name: str, folder: str) -> dict:
+    if name == '':
+        raise TM4JInvalidValue('Testcase name cannot be empty!')
+    return {'projectKey': project_key, 'name': name, 'priority': 'Normal', 'folder': f"/{folder}",
+            'status': 'Approved'}
+
+
+def _testcycle_search_url(baseurl: str, project_key: str, key: str = None, folder: str = None) -> str:
+    """:return: url of testcycle search by key or of all testcycles in folder"""
+    url = f'{baseurl}/testrun/search?version=1.0&maxResults=10&query='
+    if key:
+        return f'{url} key = "{key}"'
+    return f'{url}projectKey = "{project_key}" AND folder = "/{folder}"'
+
+
+def _make_testcycle_payload(config, project_key: str, name: str, folder: str, executor: str,
+                            check_config: bool) -> dict:
+    """
+    function makes payload of new testcycle in folder, config trFolder if folder is not set
+    :param check_config: if set, raises TM4JObjectNotFound when testcycles auto-create is turned off
+    """
+    if config['NOTFOUND']['createTestrun'] != 'True' and check_config:
+        raise TM4JObjectNotFound(f'find_testcycle: TestCycle {name} not found and auto-create is turned off')
+    folder = choose(folder, folder, config['GENERAL']['trFolder'])
+    check_folder_name(folder)
+    return {'projectKey': project_key, 'name': name, 'folder': f"/{folder}", 'owner': executor}
+
+
+def _make_folder_payload(config, project_key: str, folder_type: str, name: str) -> dict:
+    """function makes payload of new folder, raises TM4JObjectNotFound if folders auto-create is turned off"""
+    if (is_true(config['NOTFOUND']['createTcFolder']) and folder_type == 'TEST_CASE') \
+            or (is_true(config['NOTFOUND']['createTrFolder']) and folder_type == 'TEST_RUN'):
+        return {"projectKey": project_key, "name": f'/{name}', "type": folder_type}
+    raise TM4JObjectNotFound(
+        f'find_testcase/testrun: {folder_type} folder "{name}" is not found and auto-create is turned off')
+
+
+def _foldertree_url(serviceurl: str, project_id: int, folder_type: str) -> str:
+    return f'{serviceurl}/project/{project_id}/foldertree/{folder_type.replace("_", "").lower()}'
+
+
+def _make_environment_payload(project_key: str, env: str) -> dict:
+    return {"projectKey": project_key,
+            "name": env,
+            "description": "Created by TM4J"}
+
+
+def _existing_environment_name(environments: List[dict], env: str):
+    """:return: name of project environment matching env case-insensitively or None"""
+    for current_env in environments:
+        current_env_name: str = current_env.get('name')
+        if current_env_name.lower() == env.lower():
+            return current_env_name
+    return None
+
+
+def _jira_search_url(jira_url: str, jql: str, start_at: int, max_results: int) -> str:
+    """Jira issues ids search, keys that are not found do not fail the query"""
+    return (f'{jira_url}/search?jql={quote(jql)}&startAt={start_at}&maxResults={max_results}'
+            '&fields=id&validateQuery=false')
+
+
+def _jira_issue_keys(linked_issues: str) -> list:
+    """:return: Jira issue keys of comma separated linked issues"""
+    return [issue for issue in map(lambda x: x.strip(), linked_issues.split(',')) if is_jira_issue(issue)]
+
+
+def _make_testcycle_links(tr_id: int, issues: list, issue_ids: dict) -> list:
+    """function makes trace links payload of testcycle and resolved Jira issues"""
+    return [{'testRunId': tr_id, 'issueId': issue_ids[issue], 'typeId': 2}
+            for issue in issues if issue_ids.get(issue)]
+
+
+def _test_result_handle(serviceurl: str, testcycle: TestCycleHandle, testcase_key: str,
+                        created: dict) -> TestResultHandle:
+    """makes handle of created test result and keeps it as the last result of testcase in testcycle items index"""
+    if testcycle.internal_id:
+        get_shared_testrun_item_index(serviceurl, testcycle.internal_id) \
+            .set_last_result(testcase_key, created.get('id', None))
+    return TestResultHandle(id=created.get('id', None), testcase_key=testcase_key, testcycle_key=testcycle.key)
+
+
+def _testrun_items_url(serviceurl: str, tr_internal_id: int) -> str:
+    return f'{serviceurl}/testrun/{tr_internal_id}/testrunitems?fields=id,index,issueCount,$lastTestResult'
+
+
+def _datarow_results_url(serviceurl: str, tr_internal_id: int, run_id: str) -> str:
+    return f'{serviceurl}/testrun/{tr_internal_id}/testresults?fields=id,testResultStatusId,' \
+        f'testScriptResults(id,testResultStatusId,comment,index,sourceScriptType,parameterSetId),' \
+        f'traceLinks&itemId={run_id}'
+
+
+def _datarow_ids(last_execution: list, run_id: str) -> dict:
+    """
+    function gets step results ids of last execution by parameterset ids (datarow ids)
+    :return: dict of step result ids lists by parameterset id
+    """
+    if not last_execution:
+        raise TM4JInvalidValue(f'No last execution found for run_id {run_id}')
+    result = dict()
+    for item in last_execution[0]['testScriptResults']:
+        parameterset_id = item.get('parameterSetId', None)
+        # parameterSetId = row x in test data table, so it should exists
+        if parameterset_id:
+            result.setdefault(parameterset_id, []).append(item['id'])
+    if len(result) == 0:
+        raise TM4JObjectNotFound(f'No data table rows found for run_id {run_id}')
+    return result
+
+
+_shared_lock = threading.Lock()
+_shared_sessions = dict()
+_shared_project_ids = dict()
+
+
+def get_shared_session(login: str, password: str, pool_size: int) -> Session:
+    """
+    Function returns process-wide session for given credentials, so all TM4J instances
+    and worker threads reuse the same connection pool instead of new TLS handshakes
+    :param pool_size: max number of kept-alive connections, should follow threads quantity
+    """
+    with _shared_lock:
+        session = _shared_sessions.get((login, password))
+        if session is None:
+            session = Session()
+            session.auth = (login, password)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _shared_sessions[(login, password)] = session
+        return session
+
+
+@atexit.register
+def close_shared_sessions():
+    with _shared_lock:
+        for session in _shared_sessions.values():
+            session.close()
+        _shared_sessions.clear()
 
 
 class BaseTm4j:
     """
     base class to manage TM4J API with all connection logic and service functions
     """
-    def __init__(self, config_path=None):
-        self.config = read_config(config_path)
+    def __init__(self, config_path=None, config=None):
+        self.config = config if config else read_config(config_path)
         self._baseurl = self.config['GENERAL']['tm4jUrl']
         self._serviceurl = self._baseurl.replace("atm", "tests")
         self._jira_url = self._baseurl.replace('atm/1.0', 'api/2')
@@ -44,8 +350,17 @@ class BaseTm4j:
         self._password = self.config['GENERAL']['tm4jPassword']
         self.project_key = self.config['GENERAL']['tm4jProjectKey']
         self.logger = get_logger(__name__, self.config)
-        self._session = Session()
-        self._session.auth = (self._login, self._password)
+        self._session = get_shared_session(self._login, self._password, max_concurrency(self.config))
+        self._limiter = get_shared_limiter(self.config)
+        self._rate_limiter = get_shared_rate_limiter(self.config)
+        self._retry_policy = RetryPolicy.from_config(self.config)
+        self._testcase_index = get_shared_testcase_index(self._baseurl, self.project_key)
+        self._folder_trees = {folder_type: get_shared_folder_tree(self._baseurl, self.project_key, folder_type)
+                              for folder_type in ('TEST_CASE', 'TEST_RUN')}
+        self._environments = get_shared_environment_registry(self._baseurl, self.project_key)
+        self._cache = get_shared_cache(self.config)
+        self.trace_links = get_shared_link_accumulator(self.config)
+        self.jira_issues = get_shared_issue_resolver(self.config, self._search_jira_issues, self._cache)
         self._testResultsId = None
         self.testcase = None
         self._tc_internal_id = None
@@ -53,19 +368,37 @@ class BaseTm4j:
         self._tr_internal_id = None
         self._init_testcase()
         self._init_testrun()
-
-        url = f'{self._serviceurl}/project'
-        projects = self._do('get', url, '')
-
-        self._tc_project_id = int([x for x in projects if x['key'] == self.project_key][0]['id'])
+        self._tc_project_id = self._get_project_id()
 
     def __enter__(self):
-        pass
+        return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._session.close()
+        # session is shared between instances and closed at exit
+        self.flush_trace_links()
         return False
 
+    def flush_trace_links(self) -> list:
+        """
+        posts trace links (testcase web links, testcycle Jira links) collected so far
+        :return: payloads of links that were not posted since the last flush
+        """
+        self.trace_links.flush(self._post_trace_links)
+        return self.trace_links.pop_failed()
+
+    def _post_trace_links(self, links: list):
+        self._do('post', f'{self._serviceurl}/tracelink/bulk/create', strip_none_values(links))
+
+    def _get_project_id(self) -> int:
+        """project id is requested once per process and then reused by all instances"""
+        project = (self._serviceurl, self.project_key)
+        if project not in _shared_project_ids:
+            with _shared_lock:
+                if project not in _shared_project_ids:
+                    projects = self._do('get', f'{self._serviceurl}/project', '')
+                    _shared_project_ids[project] = _project_id(projects, self.project_key)
+        return _shared_project_ids[project]
+
     def _init_testcase(self):
         """ clears all testcase attributes"""
         self.testcase = {'projectKey': self.project_key, 'key': None, 'name': None, 'priority': 'Normal',
@@ -77,8 +410,14 @@ class BaseTm4j:
         self.testrun = {'projectKey': self.project_key, 'key': None, 'name': None, 'folder': None, 'owner': None}
         self._tr_internal_id = None
 
-    def _do(self, method: str, url: str, payload, isfile: bool = False, expect_response: bool = False):
-        """General method to perform HTTP-actions"""
+    def _do(self, method: str, url: str, payload, isfile: bool = False, expect_response: bool = False,
+            coalesce: bool = False):
+        """
+        General method to perform HTTP-actions
+        :param coalesce: concurrent GETs of the same url with this flag share one request and its result
+        """
+        if coalesce and method.lower() == 'get':
+            return single_flight.do(url, lambda: self._do(method, url, payload, isfile, expect_response))
         self.logger.debug(f"HTTP action called with params: {locals()}...")
         if isfile:
             r = Request(method, url, None, payload, None, None, self._session.auth)
@@ -86,23 +425,61 @@ class BaseTm4j:
             headers = {'Content-Type': 'application/json', 'Content-Length': str(len(str(payload).encode('utf-8')))}
             r = Request(method, url, headers, None, str(payload), None, self._session.auth)
         prep_req = self._session.prepare_request(r)
-        for i in range(3):
-            do_response = self._session.send(prep_req, verify=False)
-            self.logger.debug(f'_do response: {do_response.content}')
-            _check_error_response(do_response)
+        attempts = dict()
+        while True:
+            retry_after = None
             try:
-                do_response.raise_for_status()
-            except Exception as e:
-                self.logger.exception(e)
-                raise e
-            if not do_response.text and expect_response:
-                self.logger.info(f'Results expected, retrying to get it')
-                continue
+                do_response = self._send(prep_req)
+            except (ConnectionError, Timeout) as e:
+                error_class = CONNECTION
+                error = e
             else:
-                result = do_response.json() if do_response.text else ''
-                return result
-        self.logger.error(f'Max retries exceeded')
-        return ''
+                self.logger.debug(f'_do response: {do_response.content}')
+                error_class = classify_status(do_response.status_code)
+                if error_class:
+                    retry_after = parse_retry_after(do_response.headers.get('Retry-After'))
+                elif not do_response.text and expect_response:
+                    error_class = EMPTY
+                error = f'Status {do_response.status_code}'
+            delay = self._retry_policy.next_delay(method, error_class, attempts, retry_after) if error_class else None
+            if delay is None:
+                break
+            self.logger.warning(f'{method.upper()} {url} failed ({error_class}: {error}), '
+                                f'retrying in {delay:.2f}s. Attempts: {attempts}')
+            time.sleep(delay)
+        retry_stats.register(sum(attempts.values()) + 1)
+        if error_class == CONNECTION:
+            self.logger.exception(error)
+            raise error
+        _check_error_response(do_response)
+        try:
+            do_response.raise_for_status()
+        except Exception as e:
+            self.logger.exception(e)
+            raise e
+        if not do_response.text and expect_response:
+            self.logger.error(f'Max retries exceeded')
+            return ''
+        return do_response.json() if do_response.text else ''
+
+    def _send(self, prep_req) -> Response:
+        """
+        sends prepared request when rate limiter allows,
+        reporting its latency and outcome to adaptive concurrency limiter
+        """
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+        if not self._limiter:
+            return self._session.send(prep_req, verify=False)
+        self._limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = self._session.send(prep_req, verify=False)
+        except (ConnectionError, Timeout):
+            self._limiter.release(time.monotonic() - start, True)
+            raise
+        self._limiter.release(time.monotonic() - start, response.status_code == 429 or response.status_code >= 500)
+        return response
 
     def _get_tc_id(self) -> str:
         """
@@ -111,15 +488,30 @@ class BaseTm4j:
         """
         key = self.testcase["key"]
         if key:
-            url = f'{self._serviceurl}/testcase/{key}?fields=id,projectId'
-            payload = ''
-            response = self._do('get', url, payload, False, True)
-            self.logger.debug(f'{key} - {response}')
-            self._tc_internal_id = response['id']
-            return response['id']
+            self._tc_internal_id = self._get_testcase_internal_id(key)
+            return self._tc_internal_id
         else:
             raise TM4JInvalidValue('Testcase key not set, find testcase first')
 
+    def _get_testcase_internal_id(self, key: str) -> int:
+        """
+        Function to get internal testcase id by key without touching self.testcase
+        :param key: testcase key
+        :return: internal id
+        """
+        internal_id = self._testcase_index.get_internal_id(key)
+        if not internal_id and self._cache:
+            internal_id = self._cache.get(TESTCASE_ID, key)
+        if not internal_id:
+            url = _internal_id_url(self._serviceurl, 'testcase', key)
+            response = self._do('get', url, '', False, True, coalesce=True)
+            self.logger.debug(f'{key} - {response}')
+            internal_id = response['id']
+            if self._cache:
+                self._cache.set(TESTCASE_ID, key, internal_id)
+        self._testcase_index.set_internal_id(key, internal_id)
+        return internal_id
+
     def _get_tr_id(self):
         """
         Function to get internal testcase id and project id
@@ -127,15 +519,39 @@ class BaseTm4j:
         """
         key = self.testrun["key"]
         if key:
-            url = f'{self._serviceurl}/testrun/{key}?fields=id,projectId'
-            payload = ''
-            response = self._do('get', url, payload, False, True)
-            self.logger.debug(f'{key} - {response}')
-            self._tr_internal_id = response['id']
+            self._tr_internal_id = self._get_testrun_internal_id(key)
             return self._tr_internal_id
         else:
             raise TM4JInvalidValue('Testrun key not set, find testrun first')
 
+    def _get_testrun_internal_id(self, key: str) -> int:
+        """
+        Function to get internal testrun id by key without touching self.testrun
+        :param key: testrun key
+        :return: internal id
+        """
+        internal_id = self._cache.get(TESTRUN_ID, key) if self._cache else None
+        if internal_id:
+            return internal_id
+        url = _internal_id_url(self._serviceurl, 'testrun', key)
+        response = self._do('get', url, '', False, True, coalesce=True)
+        self.logger.debug(f'{key} - {response}')
+        if self._cache:
+            self._cache.set(TESTRUN_ID, key, response['id'])
+        return response['id']
+
+    def _forget_testcase(self, key: str):
+        """forgets testcase found earlier after a request using its key failed, so it is searched again"""
+        self.logger.info(f'Testcase {key} is outdated, it will be searched again')
+        self._testcase_index.discard(key)
+        _forget_cached_testcase(self._cache, key)
+
+    def _get_testcycle_handle(self, testcycle: TestCycleHandle) -> TestCycleHandle:
+        """returns testcycle handle with resolved internal id"""
+        if testcycle.internal_id:
+            return testcycle
+        return testcycle._replace(internal_id=self._get_testrun_internal_id(testcycle.key))
+
     def _get_jira_issue_id(self, issue_key: str) -> str:
         """
         function to get jira internal issue id from key
@@ -143,40 +559,123 @@ class BaseTm4j:
         :param issue_key:
         :return:
         """
-        url = f'{self._jira_url}/issue/{issue_key}'
-        payload = ''
         try:
-            response = self._do('get', url, payload)
-            return response['id']
+            return self.jira_issues.resolve([issue_key])[issue_key]
         except Exception as e:
             self.logger.exception(f'{e}')
 
+    def _search_jira_issues(self, jql: str, start_at: int, max_results: int) -> dict:
+        """searches Jira issues ids, keys that are not found do not fail the query"""
+        return self._do('get', _jira_search_url(self._jira_url, jql, start_at, max_results), '')
+
     def _put_testcase_paramtype_property(self):
         """
         some magic to display TestData table in UI without manual switch&save
         :return:
         """
         if self.testcase.get('parameters', None):
-            self._get_tc_id()
-            payload = {"id": self._tc_internal_id,
-                       "projectId": self._tc_project_id,
-                       "paramType": "TEST_DATA",
-                       "parameters": []}
-            url = f'{self._serviceurl}/testcase/{self._tc_internal_id}'
+            self._put_testcase_paramtype(self._get_tc_id())
+
+    def _put_testcase_paramtype(self, internal_id: int):
+        payload = {"id": internal_id,
+                   "projectId": self._tc_project_id,
+                   "paramType": "TEST_DATA",
+                   "parameters": []}
+        url = f'{self._serviceurl}/testcase/{internal_id}'
+        self._do('put', url, payload=strip_none_values(payload))
+        self.logger.debug(f'Success!')
+
+    def _put_testcase(self, key: str, payload: dict):
+        """updates testcase with payload made by _make_testcase_payload, creates its folder if needed"""
+        url = f'{self._baseurl}/testcase/{key}'
+        self.ensure_folders('TEST_CASE', [payload['folder']])
+        try:
+            self._do('put', url, payload=strip_none_values(payload))
+        except TM4JFolderNotFound:
+            self._create_folder('TEST_CASE', payload['folder'].strip('/'))
             self._do('put', url, payload=strip_none_values(payload))
-            self.logger.debug(f'Success!')
 
     def _create_folder(self, folder_type: str, name: str):
         """function creates folder of specified type"""
         self.logger.info(f'Creating new {folder_type} folder {name}')
-        url = f'{self._baseurl}/folder'
-        if (is_true(self.config['NOTFOUND']['createTcFolder']) and folder_type == 'TEST_CASE') \
-                or (is_true(self.config['NOTFOUND']['createTrFolder']) and folder_type == 'TEST_RUN'):
-            folder = {"projectKey": self.project_key, "name": f'/{name}', "type": folder_type}
-            self._do('post', url, payload=strip_none_values(folder))
-        else:
-            raise TM4JObjectNotFound(
-                f'find_testcase/testrun: {folder_type} folder "{name}" is not found and auto-create is turned off')
+        folder = _make_folder_payload(self.config, self.project_key, folder_type, name)
+        self._do('post', f'{self._baseurl}/folder', payload=strip_none_values(folder))
+        self._folder_trees[folder_type].add(name)
+
+    def _create_missing_folder(self, folder_type: str, name: str):
+        """creates folder missing in folder tree, that may be created by someone else after the tree was loaded"""
+        try:
+            self._create_folder(folder_type, name)
+        except TM4JObjectNotFound:
+            raise
+        except Exception as e:
+            self.logger.warning(f'Cannot create {folder_type} folder {name}, it may exist already: {e}')
+            self._folder_trees[folder_type].add(name)
+
+    def _get_folder_tree(self, folder_type: str) -> FolderTree:
+        """returns folder tree of the type, it is loaded once per process with one request"""
+        tree = self._folder_trees[folder_type]
+        if not tree.loaded:
+            tree.load(lambda: self._get_folder_paths(folder_type))
+        return tree
+
+    def _get_folder_paths(self, folder_type: str):
+        """:return: paths of all project folders of the type or None if they cannot be loaded"""
+        if not is_true(self.config['PERFORMANCE']['preloadFolders']):
+            return None
+        url = _foldertree_url(self._serviceurl, self._tc_project_id, folder_type)
+        try:
+            folders = folder_paths(self._do('get', url, ''))
+        except Exception as e:
+            self.logger.warning(f'Cannot load {folder_type} folders, they will be created when not found: {e}')
+            return None
+        self.logger.info(f'Loaded {len(folders)} {folder_type} folders')
+        return folders
+
+    def is_folder_missing(self, folder_type: str, folder: str) -> bool:
+        """checks folder in loaded folder tree, False if the tree is not available"""
+        return bool(folder) and not self._get_folder_tree(folder_type).exists(folder)
+
+    def missing_folders(self, folder_type: str, folders: list) -> list:
+        """:return: folders of the type that do not exist with their missing parents, parents first"""
+        return self._get_folder_tree(folder_type).missing(folders)
+
+    def ensure_folders(self, folder_type: str, folders: list) -> list:
+        """
+        Thread-safe creation of missing folders of the type with their parents, parents first.
+        Every folder is created once, parallel workers wait for it instead of failing on search or creation
+        :return: created folders
+        """
+        return self._get_folder_tree(folder_type).ensure(
+            [folder for folder in folders if folder],
+            lambda folder: self._create_missing_folder(folder_type, folder))
+
+    def _resolve_environment(self, env: str) -> str:
+        """
+        Thread-safe resolution of environment name before posting results: project environments are listed once
+        per process, name is matched case-insensitively and missing environment is created once.
+        See _check_environment for why it is needed
+        :return: name of environment as it is in TM4J
+        """
+        if not env:
+            return env
+        if not self._environments.loaded:
+            self._environments.load(self._get_environment_names)
+        return self._environments.resolve(env, self._create_environment)
+
+    def _get_environment_names(self):
+        """:return: names of project environments or None if they cannot be listed"""
+        try:
+            environments = self._do('get', f'{self._baseurl}/environments?projectKey={self.project_key}', None)
+        except Exception as e:
+            self.logger.warning(f'Cannot list environments, they will be checked when results are rejected: {e}')
+            return None
+        return [environment['name'] for environment in environments]
+
+    def _create_environment(self, env: str):
+        self.logger.info(f' Creating new env: {env}')
+        payload = _make_environment_payload(self.project_key, env)
+        self._do('post', f'{self._baseurl}/environments', payload=strip_none_values(payload))
 
     def _check_environment(self, env: str) -> str:
         """
@@ -184,41 +683,36 @@ class BaseTm4j:
         or creates a new one. It seems that when posting results, environment is case-sensitive
         (so qas != QAS and TM4JEnvironmentNotFound exception is raised), but environment creation
         is case insensitive (so trying to create qas when there is QAS leads to API error)
-        so we have to do all this magic
+        so we have to do all this magic.
+        Results are posted with names resolved by _resolve_environment, so it is called only if environments
+        could not be listed up front or were changed during export
         """
         self.logger.info(f' Got env name error. Checking if env {env} already exists in system.')
         url = f'{self._baseurl}/environments'
         existing_environments: List[dict] = self._do('get', f'{url}?projectKey={self.project_key}', None)
-        for current_env in existing_environments:
-            current_env_name: str = current_env.get('name')
-            if current_env_name.lower() == env.lower():
-                self.logger.error(f'Environment name is case-sensitive! '
-                             f'Fix your config EXECUTION.env = {env} to {current_env_name} '
-                             f'to avoid extra checks')
-                return current_env_name
-        self.logger.info(f' Creating new env: {env}')
-        payload = {"projectKey": self.project_key,
-                   "name": env,
-                   "description": "Created by TM4J"}
-        self.logger.debug(f'url: {url}, payload: {payload}')
-        self._do('post', url, payload=strip_none_values(payload))
+        current_env_name = _existing_environment_name(existing_environments, env)
+        if current_env_name:
+            self.logger.error(f'Environment name is case-sensitive! '
+                              f'Fix your config EXECUTION.env = {env} to {current_env_name} '
+                              f'to avoid extra checks')
+            return current_env_name
+        self._create_environment(env)
+        self._environments.add(env)
         return env
 
-    def _add_testcycle_jira_link(self, linked_issues: str):
+    def _add_testcycle_jira_link(self, linked_issues: str, tr_id: int = None):
         self.logger.debug(locals())
         linked_issues_list = list(map(lambda x: x.strip(), linked_issues.split(',')))
         if len(linked_issues_list) == 0:
             raise TM4JInvalidValue('Jira issues list is empty')
-        tr_id = self._get_tr_id()
-        payload = list()
-        for issue in linked_issues_list:
-            if is_jira_issue(issue):
-                payload.append({'testRunId': tr_id,
-                                'issueId': self._get_jira_issue_id(issue),
-                                'typeId': 2})
-        url = f'{self._serviceurl}/tracelink/bulk/create'
-        if payload:
-            self._do('post', url, strip_none_values(payload))
+        tr_id = tr_id if tr_id else self._get_tr_id()
+        issues = _jira_issue_keys(linked_issues)
+        try:
+            issue_ids = self.jira_issues.resolve(issues)
+        except Exception as e:
+            self.logger.exception(f'{e}')
+            issue_ids = dict()
+        self.trace_links.add(_make_testcycle_links(tr_id, issues, issue_ids), self._post_trace_links)
 
     def _delete_testrun(self, key):
         """
@@ -238,6 +732,7 @@ class BaseTm4j:
         """
         url = f'{self._baseurl}/testcase/{key}'
         self._do('delete', url, '')
+        self._testcase_index.discard(key)
 
     def _post_new_testcase(self,
                            name: str,
@@ -246,25 +741,52 @@ class BaseTm4j:
         """creates new testcase from self.testcase.
         :param test_source_file_path: additional logging parameters about testcase creation for csv self.logger
         :return nothing, but updates self.testcase"""
-        self.logger.debug(f"Post testcase with params: {locals()}")
-        key = None
         self._init_testcase()
-        self.testcase['name'] = name
-        self.testcase['folder'] = f"/{folder}"
-        self.testcase['status'] = 'Approved'
+        self.testcase = self._create_testcase(name, folder, test_source_file_path)
+        self._get_tc_id()
+        self.logger.info(f"Testcase posted successfully. {self.testcase}")
+
+    def _create_testcase(self,
+                         name: str,
+                         folder: str,
+                         test_source_file_path: str = '') -> dict:
+        """creates new testcase without touching self.testcase.
+        :param test_source_file_path: additional logging parameters about testcase creation for csv self.logger
+        :return full data of created testcase"""
+        self.logger.debug(f"Post testcase with params: {locals()}")
+        testcase = _make_new_testcase_payload(self.project_key, name, folder)
         url = f'{self._baseurl}/testcase'
-        if name == '':
-            raise TM4JInvalidValue('Testcase name cannot be empty!')
-        response: dict = self._do('post', url, payload=strip_none_values(self.testcase))
+        self.ensure_folders('TEST_CASE', [folder])
+        response: dict = self._do('post', url, payload=strip_none_values(testcase))
         key = response['key']
         csv_log_data = [key, name, test_source_file_path]
         csv_logger.info('#'.join(csv_log_data))
         self.logger.info(f'Testcase {key} created successfully.')
         #  now load full data of created testcase
         url = f'{self._baseurl}/testcase/{key}'
-        self.testcase = self._do('get', url, '')
-        self._get_tc_id()
-        self.logger.info(f"Testcase posted successfully. {self.testcase}")
+        testcase = self._do('get', url, '')
+        self._testcase_index.add(testcase)
+        _cache_testcase(self._cache, name, folder, testcase)
+        return testcase
+
+    def _post_testcase(self, payload: dict, folder: str, test_source_file_path: str = '') -> dict:
+        """
+        creates testcase with all fields of payload made by _make_testcase_payload
+        :return: testcase data built from payload and response, without reading it back
+        """
+        if payload['name'] == '':
+            raise TM4JInvalidValue('Testcase name cannot be empty!')
+        testcase = dict(payload, projectKey=self.project_key, folder=f"/{folder}")
+        testcase.update(priority=testcase['priority'] or 'Normal', status=testcase['status'] or 'Approved')
+        testcase = {k: v for k, v in testcase.items() if v is not None}
+        self.ensure_folders('TEST_CASE', [folder])
+        key = self._do('post', f'{self._baseurl}/testcase', payload=strip_none_values(testcase))['key']
+        csv_logger.info('#'.join([key, testcase['name'], test_source_file_path]))
+        self.logger.info(f'Testcase {key} created successfully.')
+        testcase.update(key=key)
+        self._testcase_index.add(testcase)
+        _cache_testcase(self._cache, testcase['name'], folder, testcase)
+        return testcase
 
     def _post_new_testcycle(self,
                             name: str,
@@ -281,29 +803,38 @@ class BaseTm4j:
         :param executor: name of the testcycle owner
         auto creation of not-found is allowed
         """
+        self._init_testrun()
+        testcycle = self._create_testcycle(name, folder, linked_issues, check_config, executor)
+        self.testrun = testcycle.data
+        self._tr_internal_id = testcycle.internal_id
+        return testcycle.key
+
+    def _create_testcycle(self,
+                          name: str,
+                          folder: str = None,
+                          linked_issues: str = None,
+                          check_config: bool = False,
+                          executor: str = None) -> TestCycleHandle:
+        """
+        Creates new testcycle without touching self.testrun, parameters are the same as for _post_new_testcycle
+        :return: created testcycle
+        """
         self.logger.info(f"Post testrun with params: {locals()}")
-        if self.config['NOTFOUND']['createTestrun'] != 'True' and check_config:
-            raise TM4JObjectNotFound(f'find_testcycle: TestCycle {name} not found and auto-create is turned off')
-        else:
-            url = f'{self._baseurl}/testrun'
-            key = None
-            folder = choose(folder, folder, self.config['GENERAL']['trFolder'])
-            check_folder_name(folder)
-            self._init_testrun()
-            self.testrun['name'] = name
-            self.testrun['owner'] = executor
-            self.testrun['folder'] = f"/{folder}"
-            try:
-                key = self._do('post', url, payload=strip_none_values(self.testrun))['key']
-            except TM4JFolderNotFound:
-                self._create_folder('TEST_RUN', folder)
-                key = self._do('post', url, payload=strip_none_values(self.testrun))['key']
-            finally:
-                self.testrun = self._do('get', url + '/' + key, '')
-                if linked_issues:
-                    self._add_testcycle_jira_link(linked_issues)
-                self.logger.info(f"Testrun {key} created successfully.")
-                return key
+        url = f'{self._baseurl}/testrun'
+        testrun = _make_testcycle_payload(self.config, self.project_key, name, folder, executor, check_config)
+        folder = testrun['folder'].strip('/')
+        self.ensure_folders('TEST_RUN', [folder])
+        try:
+            key = self._do('post', url, payload=strip_none_values(testrun))['key']
+        except TM4JFolderNotFound:
+            self._create_folder('TEST_RUN', folder)
+            key = self._do('post', url, payload=strip_none_values(testrun))['key']
+        internal_id = self._get_testrun_internal_id(key)
+        if linked_issues:
+            self._add_testcycle_jira_link(linked_issues, internal_id)
+        self.logger.info(f"Testrun {key} created successfully.")
+        data = self._do('get', url + '/' + key, '')
+        return TestCycleHandle(key=key, name=data.get('name'), internal_id=internal_id, data=data)
 
     def _get_testcase_run_id(self, key: str) -> tuple:
         """
@@ -312,9 +843,7 @@ class BaseTm4j:
         :return:
         """
         self._get_tr_id()
-        url = f'{self._serviceurl}/testrun/{self._tr_internal_id}/testrunitems' \
-            f'?fields=id,index,issueCount,$lastTestResult'
-        response = self._do('get', url, '')
+        response = self._do('get', _testrun_items_url(self._serviceurl, self._tr_internal_id), '')
         for item in response:
             if item['$lastTestResult']['testCase']['key'] == key:
                 return item['id'], item['$lastTestResult']['id']
@@ -338,26 +867,9 @@ class BaseTm4j:
         :param run_id: testcase run id.
         :return: list of row id of the last (current) executions
         """
-        url = f'{self._serviceurl}/testrun/{self._tr_internal_id}/testresults?fields=id,testResultStatusId,' \
-            f'testScriptResults(id,testResultStatusId,comment,index,sourceScriptType,parameterSetId),' \
-            f'traceLinks&itemId={run_id}'
-        last_execution = self._do('get', url, '')
-        if last_execution:
-            result = dict()
-            for item in last_execution[0]['testScriptResults']:
-                parameterset_id = item.get('parameterSetId', None)
-                # parameterSetId = row x in test data table, so it should exists
-                if parameterset_id:
-                    step_ids_list = result.get(parameterset_id, None)
-                    if step_ids_list:
-                        step_ids_list.append(item['id'])
-                    else:
-                        result.update({parameterset_id: [item['id']]})
-            if len(result) == 0:
-                raise TM4JObjectNotFound(f'No data table rows found for run_id {run_id}')
-            return {k: result[k] for k in sorted(result)}
-        else:
-            raise TM4JInvalidValue(f'No execution results are found for {run_id}')
+        last_execution = self._do('get', _datarow_results_url(self._serviceurl, self._tr_internal_id, run_id), '')
+        result = _datarow_ids(last_execution, run_id)
+        return {k: result[k] for k in sorted(result)}
 
     def _put_testscript_results(self, script_results: str):
         """
@@ -1,9 +1,16 @@
+from configparser import ConfigParser
+from classes.BddSyncPlan import BddSyncPlan, PlannedTestcase, CREATE, UPDATE, LINK, SKIP
+from classes.DataStructures import TestCaseHandle
 from classes.Parser import Parser
 from classes.TestScript import TestScript
 from classes.TestParameters import TestParameters
 from libs.tags_parse_lib import parse_scenario_tags, split_testcase_name_key
 from behave import parser as pr
+from libs.concurrency import max_concurrency
 from libs.files import FilesHandler
+from libs.persistent_cache import fingerprint
+from libs.retry import retry_stats
+from libs.trace_links import link_batch_size
 from libs.update_tests_with_keys import update_feature_file_with_keys
 """
 Class to deal with Behave .feature files
@@ -22,24 +29,47 @@ Format example:
 """
 
 
+def read_feature_file(config: ConfigParser, file_path: str) -> list:
+    """
+    BddParser.file_reader: parses .feature file with behave and converts its scenarios into compact records,
+    so behave model objects are not passed between processes
+    :return: list of dicts with scenario name, tags, test script and parameters, feature data and paths
+    """
+    fh = FilesHandler(config, file_path)
+    feature = pr.parse_file(file_path)
+    feature_folder_name, feature_link = fh.get_bdd_file_paths()
+    if len(feature.scenarios) == 0:
+        raise LookupError('no scenarios found in .feature file')
+    precondition = feature.background.name if feature.background else ''
+    objective = feature.name
+    records = list()
+    for scenario in feature.scenarios:
+        parameters = None
+        if hasattr(scenario, 'examples') and hasattr(scenario.examples[0], 'table'):
+            tp = TestParameters()
+            table = scenario.examples[0].table
+            tp.set_variables(table.headings)
+            for row in table.rows:
+                tp.append_values(row.headings, row.cells)
+            parameters = tp.parameters
+        records.append({'name': f'{scenario.name}{scenario.description}'.replace('[]', ''),
+                        'tags': [str(tag) for tag in scenario.tags + feature.tags],
+                        'testScript': parse_steps_to_script(scenario.steps),
+                        'parameters': parameters,
+                        'precondition': precondition,
+                        'objective': objective,
+                        'feature_file_path': file_path,
+                        'feature_folder_name': feature_folder_name,
+                        'link': feature_link})
+    return records
+
+
 class BddParser(Parser):
+    file_reader = staticmethod(read_feature_file)
+
     def __init__(self, config_path: str = None):
         super().__init__(config_path)
 
-    def _read_single_file(self, file_path: str):
-        fh = FilesHandler(self.config, file_path)
-        feature = pr.parse_file(file_path)
-        feature_folder_name, feature_link = fh.get_bdd_file_paths()
-        if len(feature.scenarios) == 0:
-            raise LookupError('no scenarios found in .feature file')
-        precondition = feature.background.name if feature.background else ''
-        objective = feature.name
-        for scenario in feature.scenarios:
-            if feature.tags:
-                scenario.tags.extend(feature.tags)
-            parsed_scenario = scenario, precondition, objective, file_path, feature_folder_name, feature_link
-            self.file_contents.append(parsed_scenario)
-
     def _parse_contents(self):
 
         def has_obsolete_tags(tags: list) -> bool:
@@ -50,13 +80,13 @@ class BddParser(Parser):
                     self.logger.info(f'Scenario {name} is tagged as obsolete and will be skipped!')
                     return True
 
-        for parsed_scenario in self.file_contents:
-            scenario, precondition, objective, feature_file_path, feature_folder_name, feature_link = parsed_scenario
+        for scenario in self.file_contents:
             parsed_tags = dict()
-            name = f'{scenario.name}{scenario.description}'.replace('[]', '')
+            name = scenario['name']
+            feature_folder_name = scenario['feature_folder_name']
             # starting from tags to skip scenarios tagged as obsolete or deprecated
-            if scenario.tags:
-                parsed_tags = parse_scenario_tags(scenario.tags)
+            if scenario['tags']:
+                parsed_tags = parse_scenario_tags(scenario['tags'])
                 if has_obsolete_tags(parsed_tags['labels']):
                     continue
                 if self.config['BDD']['parseJiraTags'] != 'True':
@@ -69,51 +99,124 @@ class BddParser(Parser):
                 "projectKey": self.config['GENERAL']['tm4jProjectKey'],
                 "key": n_key,
                 "name": n_name,
-                "precondition": precondition,
-                "objective": objective,
+                "precondition": scenario['precondition'],
+                "objective": scenario['objective'],
                 "folder": f"{self.config['GENERAL']['tcFolder']}{sub_folder}",
                 "status": "Approved",
-                "link": feature_link,
-                "feature_file_path": feature_file_path
+                "link": scenario['link'],
+                "feature_file_path": scenario['feature_file_path']
             }
             testcase.update(parsed_tags)
-            testcase.update({"testScript": parse_steps_to_script(scenario.steps)})
-            if hasattr(scenario, 'examples') and hasattr(scenario.examples[0], 'table'):
-                tp = TestParameters()
-                table = scenario.examples[0].table
-                tp.set_variables(table.headings)
-                for row in table.rows:
-                    tp.append_values(row.headings, row.cells)
-                testcase.update({'parameters': tp.parameters})
+            testcase.update({"testScript": scenario['testScript']})
+            if scenario['parameters'] is not None:
+                testcase.update({'parameters': scenario['parameters']})
             self.parse_results.append(testcase)
             self.export_results['Results found'] += 1
 
-    def _post_single_result(self, args: tuple):
+    def plan(self) -> BddSyncPlan:
+        """
+        Compares parsed scenarios with remote testcases of tcFolder loaded in bulk
+        :return: plan of requests to sync them
+        """
+        plan = BddSyncPlan(link_batch_size(self.config), self.config['BDD']['updateFeatureFileOnExport'] == 'True')
+        self.tm.load_testcases(self.config['GENERAL']['tcFolder'])
+        for testcase in self.parse_results:
+            values = {k: v for k, v in testcase.items() if k not in ('link', 'feature_file_path')}
+            planned = PlannedTestcase(values=values,
+                                      link=testcase['link'],
+                                      feature_file_path=testcase['feature_file_path'],
+                                      fingerprint=fingerprint(values, testcase['link']),
+                                      parsed=testcase)
+            # unchanged scenario costs no requests, its testcase key is taken from the last sync
+            key = self.tm.get_unchanged_testcase_key(values, planned.fingerprint)
+            if key:
+                plan.unchanged.append(planned._replace(action=SKIP, key=key))
+                continue
+            remote = self.tm.find_remote_testcase(values)
+            if remote is None:
+                plan.creates.append(planned)
+            elif self.tm.is_testcase_up_to_date(remote, values):
+                plan.links.append(planned._replace(action=LINK, remote=remote, key=remote['key']))
+            else:
+                plan.updates.append(planned._replace(action=UPDATE, remote=remote, key=remote['key']))
+        plan.folders = self.tm.missing_folders('TEST_CASE', [planned.values['folder']
+                                                             for planned in plan.creates + plan.updates])
+        return plan
+
+    def apply(self, plan: BddSyncPlan) -> list:
+        """
+        Creates folders, then creates, updates and links testcases in threads, then writes new keys
+        into feature files. Testcases are remembered as synced only when their links are posted
+        :return: list of planned testcases that were not synced
+        """
+        from libs.multi_threading import run_threaded
+        self.tm.ensure_folders('TEST_CASE', plan.folders)
+        links = dict()                      # id of planned testcase -> its link payload
+        failed = run_threaded(plan.to_apply,
+                              lambda planned: links.update({id(planned): self._apply_single(planned)}),
+                              None,
+                              max_concurrency(self.config)) if plan.to_apply else list()
+        failed_ids = {id(planned) for planned in failed}
+        failed_links = {_link_id(link) for link in self.tm.flush_trace_links()}
+        failed_to_link = list()
+        for planned in plan.to_apply:
+            if id(planned) in failed_ids:
+                continue
+            if _link_id(links.get(id(planned))) in failed_links:
+                self.logger.error(f'Feature file link is not added to testcase {planned.parsed["key"]}: '
+                                  f'{planned.link}')
+                failed_to_link.append(planned)
+            else:
+                self.tm.set_testcase_fingerprint(planned.values, planned.parsed['key'], planned.fingerprint)
+        for planned in plan.unchanged:
+            planned.parsed.update(key=planned.key)
+        # feature files are updated in one thread, since scenarios of one file are synced concurrently
+        for planned in plan.write_backs:
+            if planned.parsed.get('key') and all(planned is not failed_planned for failed_planned in failed):
+                update_feature_file_with_keys(key=planned.parsed['key'],
+                                              name=planned.values['name'],
+                                              feature_file_path=planned.feature_file_path)
+        return failed + failed_to_link
+
+    def _apply_single(self, planned: PlannedTestcase) -> dict:
+        """:return: payload of feature file link added to testcase"""
         self.logger.debug(f' {locals()}')
-        testcase, = args
-        feature_file_link = testcase.pop('link')
-        feature_file_path = testcase.pop('feature_file_path')
         try:
-            key = self.tm.find_testcase(name=testcase['name'],
-                                        key=testcase['key'],
-                                        folder=testcase['folder'],
-                                        test_source_file_path=feature_file_path,
-                                        autocreate=True)
-            self.tm.update_testcase(testcase)
-            self.tm.add_testcase_weblink(description=feature_file_link, link_url=feature_file_link)
-            if self.config['BDD']['updateFeatureFileOnExport'] == 'True':
-                update_feature_file_with_keys(key=key,
-                                              name=testcase['name'],
-                                              feature_file_path=feature_file_path)
-            # get back feature_file_path for unit testing since Python pop update
-            # self.testcase object
-            testcase.update({'feature_file_path': feature_file_path,
-                             'key': key})
+            if planned.action == CREATE:
+                testcase = self.tm.create_testcase_from_values(planned.values, planned.feature_file_path)
+            elif planned.action == UPDATE:
+                testcase = self.tm.update_testcase_from_values(planned.remote, planned.values)
+            else:
+                testcase = TestCaseHandle(key=planned.key, data=planned.remote)
+            # existing testcase may have the link already, e.g. if it was synced before cache expired
+            if planned.action != CREATE and planned.link in self.tm.get_testcase_weblinks(testcase.key):
+                link = None
+            else:
+                link = self.tm.add_weblink(testcase, description=planned.link, link_url=planned.link)
+            planned.parsed.update(key=testcase.key)
+            return link
         except Exception as e:
             text = e.response.content if hasattr(e, 'response') else e
-            self.logger.error(f'post_testcases error: {text}. Feature file: {feature_file_link}, testcase: {testcase}')
+            self.logger.error(f'post_testcases error: {text}. Feature file: {planned.link}, '
+                              f'testcase: {planned.values}')
             raise e
 
+    def do_export_results(self, args: tuple = None):
+        """syncs parsed scenarios with plan made for all of them"""
+        requests = retry_stats.requests
+        self.export_results['Results found'] = len(self.parse_results)
+        plan = self.plan()
+        self.logger.info(plan)
+        failed = self.apply(plan)
+        self.export_results['Exported'] = len(self.parse_results) - len(failed)
+        self.export_results['Failed'] = len(failed)
+        self.export_results['Calls per testcase'] = self.calls_per_result(retry_stats.requests - requests)
+        self.logger.info(self.export_results)
+
+
+def _link_id(link: dict):
+    return tuple(sorted(link.items())) if link else None
+
 
 def parse_steps_to_script(steps):
     """function parses gherkin steps into description-expected test script"""
@@ -0,0 +1,86 @@
+from math import ceil
+from typing import List, NamedTuple
+"""
+Plan of BDD features synchronisation. Desired testcases parsed from all feature files are compared with remote
+testcases loaded in bulk, so applying the plan makes only the requests that change something
+"""
+
+
+CREATE = 'create'
+UPDATE = 'update'
+LINK = 'link'
+SKIP = 'skip'
+
+
+class PlannedTestcase(NamedTuple):
+    """
+    Parsed scenario with everything needed to sync it
+    """
+    values: dict                            # testcase fields for create_testcase_from_values
+    link: str                               # feature file link added to testcase traceability
+    feature_file_path: str
+    fingerprint: str                        # fingerprint of values and link, see TM4J.get_unchanged_testcase_key
+    parsed: dict                            # parse result the scenario was planned from, gets testcase key
+    action: str = CREATE                    # CREATE, UPDATE, LINK or SKIP if unchanged since the last export
+    remote: dict = None                     # remote testcase data, None if testcase is created
+    key: str = None                         # key of remote testcase
+
+
+class BddSyncPlan:
+    """
+    Actions to sync feature files with TM4J:
+        folders     -- folders to create before testcases
+        creates     -- testcases to create
+        updates     -- remote testcases which fields differ from the scenario
+        links       -- remote testcases that are up to date, but have no fingerprint of the last sync (first sync,
+                       expired or disabled cache): their feature link is added if they do not have it
+        unchanged   -- scenarios not changed since the last export
+        write_backs -- scenarios without key to update in feature files
+    """
+    def __init__(self, link_batch_size: int = 1, update_feature_files: bool = False):
+        self.link_batch_size = max(1, link_batch_size)
+        self.update_feature_files = update_feature_files
+        self.folders: List[str] = list()      # missing folders of created and updated testcases, parents first
+        self.creates: List[PlannedTestcase] = list()
+        self.updates: List[PlannedTestcase] = list()
+        self.links: List[PlannedTestcase] = list()
+        self.unchanged: List[PlannedTestcase] = list()
+
+    def __len__(self):
+        return len(self.creates) + len(self.updates) + len(self.links) + len(self.unchanged)
+
+    @property
+    def to_apply(self) -> List[PlannedTestcase]:
+        """testcases that need requests, in creation, update, link order"""
+        return self.creates + self.updates + self.links
+
+    @property
+    def write_backs(self) -> List[PlannedTestcase]:
+        if not self.update_feature_files:
+            return list()
+        return [planned for planned in self.to_apply + self.unchanged if not planned.values.get('key')]
+
+    def http_calls(self) -> int:
+        """
+        max number of requests applying the plan takes: folder creation, creation or update,
+        paramType update and internal id (with existing links) lookup for every testcase, batched links
+        """
+        calls = len(self.folders) + len(self.creates) + len(self.updates)
+        calls += sum(1 for planned in self.creates + self.updates if planned.values.get('parameters'))
+        calls += len(self.to_apply) + ceil(len(self.to_apply) / self.link_batch_size)
+        return calls
+
+    def __str__(self):
+        lines = [f'BDD sync plan for {len(self)} scenarios:',
+                 f'  folders to create: {len(self.folders)}']
+        lines += [f'    + /{folder}' for folder in self.folders]
+        lines.append(f'  testcases to create: {len(self.creates)}')
+        lines += [f'    + {planned.values["folder"]}/{planned.values["name"]}' for planned in self.creates]
+        lines.append(f'  testcases to update: {len(self.updates)}')
+        lines += [f'    ~ {planned.key} {planned.values["name"]}' for planned in self.updates]
+        lines.append(f'  up to date testcases to link: {len(self.links)}')
+        lines += [f'    = {planned.key} {planned.values["name"]}' for planned in self.links]
+        lines.append(f'  unchanged since the last export: {len(self.unchanged)}')
+        lines.append(f'  feature file key write-backs: {len(self.write_backs)}')
+        lines.append(f'  HTTP calls: {self.http_calls()} at most')
+        return '\n'.join(lines)
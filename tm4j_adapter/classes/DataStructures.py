@@ -1,9 +1,56 @@
-from typing import List
+from typing import List, NamedTuple
 from itertools import chain
 import datetime
 import json
 
 
+class TestCaseHandle(NamedTuple):
+    """
+    Immutable reference to testcase returned by stateless TM4J methods
+    """
+    key: str
+    name: str = None
+    folder: str = None
+    internal_id: int = None                 # id from tests/1.0 API, needed for trace links and paramType
+    data: dict = None                       # full testcase data from atm/1.0 API
+
+
+class TestCycleHandle(NamedTuple):
+    """
+    Immutable reference to testcycle (testrun) returned by stateless TM4J methods
+    """
+    key: str
+    name: str = None
+    internal_id: int = None                 # id from tests/1.0 API, needed for testrun items and results
+    data: dict = None
+
+
+class TestResultHandle(NamedTuple):
+    """
+    Immutable reference to posted test execution result
+    """
+    id: int
+    testcase_key: str = None
+    testcycle_key: str = None
+
+
+class PendingTestResult(NamedTuple):
+    """
+    Test execution result resolved to testcase, but not posted yet.
+    Fields are create_test_result arguments, so results can be posted in bulk or one by one:
+        tm.create_test_results(testcycle, [pending, ...])
+        tm.create_test_result(testcycle=testcycle, **pending._asdict())
+    """
+    testcase: TestCaseHandle
+    status: str
+    environment: str
+    executed_by: str
+    script_results: list = None
+    comment: str = None
+    issue_links: list = None
+    execution_time: str = None
+
+
 class DataRowResult(object):
     """
     Class corresponds to test execution for one data row (data set)
@@ -14,7 +61,7 @@ class DataRowResult(object):
         self.parameterSetId: int = 0            # ParameterSet = data row in data table
         self.testResultStatusId: int = 0        # UI statuses ID unique per project
         self.executionDate = self.get_now()
-        self.log_file: str = ''                 # log file path
+        self.log_file = ''                      # log file path or ZipMember
         self.xml_file: str = ''                 # junit xml file path
         self.is_failed = False                  # is test execution failed
         self.testscript_steps_id_list = list()  # list of testscript steps id (one or more for test containing one or more steps)
@@ -110,7 +157,11 @@ class TestCaseExecution(object):
         return json.dumps(self.dictate(), default=DataRowResult.jsonate)
 
     def jsonate(self) -> str:
-        return json.dumps(list(chain(*[x.dictate() for x in self.data_row_results])), default=DataRowResult.jsonate)
+        return json.dumps(self.step_results(), default=DataRowResult.jsonate)
+
+    def step_results(self) -> list:
+        """testscript step results of all data rows for testscriptresult PUT"""
+        return list(chain(*[x.dictate() for x in self.data_row_results]))
 
     def get_files_list(self) -> list:
         return [(x.xml_file, x.log_file) for x in self.data_row_results]
@@ -130,15 +181,19 @@ class TestsExecutionResults(list):
         super().__init__()
         self.json_codes = status_codes                                  # per project  status codes json
         self.status_codes = {x['name']: x['id'] for x in status_codes}  # name: id status codes dict
+        self._reset_index()
 
     def __str__(self):
         return str([str(x) for x in self])
 
     def __eq__(self, other):
         if type(other) is type(self):
-            return self.__dict__ == other.__dict__
+            return self._properties() == other._properties()
         return False
 
+    def _properties(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if k not in ['_by_key', '_by_name', '_indexed']}
+
     def __getitem__(self, key):
         if isinstance(key, int):
             return super().__getitem__(key)
@@ -157,6 +212,73 @@ class TestsExecutionResults(list):
         if not isinstance(item, TestCaseExecution):
             raise TypeError(f'item is not of type {type(TestCaseExecution)}')
         super(TestsExecutionResults, self).append(item)
+        if self._indexed == len(self) - 1:
+            self._index(self._indexed, item)
+
+    def _reset_index(self):
+        """drops indexes on any change but append, find_result rebuilds them"""
+        self._by_key = dict()               # testcase key -> position of the first execution with it
+        self._by_name = dict()              # testcase name -> position of the first execution with it
+        self._indexed = 0                   # number of indexed executions
+
+    def clear(self) -> None:
+        super().clear()
+        self._reset_index()
+
+    def extend(self, items) -> None:
+        super().extend(items)
+        self._reset_index()
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def insert(self, index: int, item: TestCaseExecution) -> None:
+        super().insert(index, item)
+        self._reset_index()
+
+    def remove(self, item: TestCaseExecution) -> None:
+        super().remove(item)
+        self._reset_index()
+
+    def pop(self, index: int = -1) -> TestCaseExecution:
+        item = super().pop(index)
+        self._reset_index()
+        return item
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._reset_index()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._reset_index()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._reset_index()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reset_index()
+
+    def _index(self, position: int, item: TestCaseExecution):
+        if item.key is not None:
+            self._by_key.setdefault(item.key, position)
+        self._by_name.setdefault(item.name, position)
+        self._indexed = position + 1
+
+    def find_result(self, testcase_key: str, testcase_name: str):
+        """
+        :return: the first execution with the key (if it is not None) or the name, None if there is no such execution
+        """
+        if self._indexed != len(self):
+            self._reset_index()
+            for position, item in enumerate(self):
+                self._index(position, item)
+        positions = [self._by_name.get(testcase_name), self._by_key.get(testcase_key)]
+        positions = [position for position in positions if position is not None]
+        return self[min(positions)] if positions else None
 
     def set_testrun_key(self, key: str):
         for result in self:
@@ -174,11 +296,10 @@ class TestsExecutionResults(list):
                            index=testcase_example_row,
                            testResultStatusId=self.status_codes[testcase_status],
                            is_failed=(testcase_status == 'Fail'))
-        try:
-            tce = [x for x in self
-                   if ((testcase_key is not None and x.key == testcase_key) or (x.name == testcase_name))][0]
+        tce = self.find_result(testcase_key, testcase_name)
+        if tce is not None:
             tce.executionTime += int(testcase_execution_time)
-        except IndexError:
+        else:
             tce = TestCaseExecution(key=testcase_key,
                                     name=testcase_name,
                                     executionTime=int(testcase_execution_time))
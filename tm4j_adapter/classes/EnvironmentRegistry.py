@@ -0,0 +1,77 @@
+import threading
+from libs.tm_log import get_logger
+"""
+In-memory registry of project environments, so environment of every test result is resolved without requests
+"""
+
+logger = get_logger(__name__)
+
+
+class EnvironmentRegistry:
+    """
+    Thread-safe map of environment names by their lower case. Posting results, TM4J compares environment
+    case-sensitively (qas != QAS), but creating it -- case-insensitively, so existing name is used in any case.
+    If environments cannot be loaded, registry is unavailable and names are used as they are.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.available = False
+        self._names = dict()                # lower case name -> name in TM4J
+        self._warned = set()                # names in other case that are reported already
+
+    def __len__(self):
+        return len(self._names)
+
+    def load(self, get_names: callable):
+        """
+        fills registry once, concurrent callers wait for the first one
+        :param get_names: function returning list of environment names or None if they cannot be loaded
+        :return: True if registry was loaded by this call
+        """
+        with self.lock:
+            if self.loaded:
+                return False
+            names = get_names()
+            self.available = names is not None
+            for name in names or []:
+                self.add(name)
+            self.loaded = True
+            return True
+
+    def add(self, name: str):
+        with self.lock:
+            self._names.setdefault(name.lower(), name)
+
+    def find(self, env: str):
+        """:return: name of existing environment in TM4J case or None"""
+        with self.lock:
+            return self._names.get(env.lower())
+
+    def resolve(self, env: str, create: callable) -> str:
+        """
+        :param create: function creating environment by name, it is called once for every missing environment
+        :return: name of environment in TM4J case
+        """
+        if not env or not self.available:
+            return env
+        with self.lock:
+            name = self.find(env)
+            if not name:
+                create(env)
+                self.add(env)
+                name = env
+            elif name != env and env not in self._warned:
+                self._warned.add(env)
+                logger.warning(f'Environment name is case-sensitive! Fix your config EXECUTION.env = {env} to {name}')
+            return name
+
+
+_shared_lock = threading.Lock()
+_shared_registries = dict()
+
+
+def get_shared_environment_registry(url: str, project_key: str) -> EnvironmentRegistry:
+    """returns process-wide environment registry of the project"""
+    with _shared_lock:
+        return _shared_registries.setdefault((url, project_key), EnvironmentRegistry())
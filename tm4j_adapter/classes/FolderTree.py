@@ -0,0 +1,96 @@
+import threading
+from typing import List
+"""
+In-memory tree of project folders, so folder existence is checked without failed requests
+"""
+
+
+class FolderTree:
+    """
+    Thread-safe set of folder paths of one type (TEST_CASE or TEST_RUN), paths are stored without slashes around.
+    If folders cannot be loaded, tree is unavailable: every folder is treated as existing,
+    so folders are created only when TM4J does not find them.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.available = False
+        self._folders = set()
+
+    def __len__(self):
+        return len(self._folders)
+
+    @staticmethod
+    def _path(folder: str) -> str:
+        return folder.strip('/')
+
+    def load(self, get_folders: callable):
+        """
+        fills tree once, concurrent callers wait for the first one
+        :param get_folders: function returning list of folder paths or None if they cannot be loaded
+        :return: True if tree was loaded by this call
+        """
+        with self._lock:
+            if self.loaded:
+                return False
+            folders = get_folders()
+            self.available = folders is not None
+            self._folders.update(self._path(folder) for folder in folders or [])
+            self.loaded = True
+            return True
+
+    def add(self, folder: str):
+        with self._lock:
+            self._folders.add(self._path(folder))
+
+    def exists(self, folder: str) -> bool:
+        with self._lock:
+            return not self.available or self._path(folder) in self._folders
+
+    def missing(self, folders: list) -> List[str]:
+        """:return: folders that do not exist with their missing parents, parents first"""
+        paths = set()
+        for folder in folders:
+            parts = self._path(folder).split('/')
+            paths.update('/'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+        with self._lock:
+            missing = [path for path in paths if path and not self.exists(path)]
+        return sorted(missing, key=lambda path: (path.count('/'), path))
+
+    def ensure(self, folders: list, create: callable) -> List[str]:
+        """
+        creates missing folders parents first; concurrent callers wait, so every folder is created once
+        :param create: function creating folder by its path
+        :return: created folders
+        """
+        with self._lock:
+            missing = self.missing(folders)
+            for folder in missing:
+                create(folder)
+                self.add(folder)
+            return missing
+
+
+def folder_paths(nodes, parent: str = '') -> List[str]:
+    """
+    :param nodes: folder tree response: root node or list of nodes with name and children
+    :return: paths of all folders of the tree
+    """
+    if isinstance(nodes, dict):
+        nodes = nodes.get('children') or []
+    paths = list()
+    for node in nodes:
+        path = f"{parent}/{node['name']}".strip('/')
+        paths.append(path)
+        paths.extend(folder_paths(node.get('children') or [], path))
+    return paths
+
+
+_shared_lock = threading.Lock()
+_shared_trees = dict()
+
+
+def get_shared_folder_tree(url: str, project_key: str, folder_type: str) -> FolderTree:
+    """returns process-wide folder tree of the project"""
+    with _shared_lock:
+        return _shared_trees.setdefault((url, project_key, folder_type), FolderTree())
@@ -44,6 +44,10 @@ class JsonParser(Parser):
             parse_result = project_key, testcase_key, testcase_name, status, comment, reporter, issue_links, script_results
             self.parse_results.append(parse_result)
 
+    def _testcase_lookups(self) -> list:
+        return [(testcase_name, testcase_key, self.config['GENERAL']['tcFolder'])
+                for _, testcase_key, testcase_name, *_ in self.parse_results]
+
     def _post_single_result(self, args: tuple):
         self.logger.debug(f'{locals()}')
 
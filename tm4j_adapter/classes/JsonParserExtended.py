@@ -47,6 +47,10 @@ class JsonParserExtended(Parser):
                             script_results)
             self.parse_results.append(parse_result)
 
+    def _testcase_lookups(self) -> list:
+        return [(testcase_name, testcase_key, self.config['GENERAL']['tcFolder'])
+                for _, testcase_key, testcase_name, *_ in self.parse_results]
+
     def _post_single_result(self, args: tuple):
         self.logger.debug(f'{locals()}')
 
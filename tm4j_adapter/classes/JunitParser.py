@@ -1,8 +1,9 @@
 from classes.ThreadedParser import ThreadedParser
-from classes.TM4J import TM4J
+from classes.DataStructures import TestCaseHandle, PendingTestResult
 from libs.test_log_parser import parse_test_log
 from libs.files import get_full_path
-from xml.etree import ElementTree
+from configparser import ConfigParser
+from xml.etree.ElementTree import iterparse
 
 """
 Class to handle execution report in JUnit .xml format
@@ -19,10 +20,56 @@ Format example:
           <failure message='PhotoUploader crashed in @nonobjc UISegmentedControl.init()'>&lt;unknown&gt;:0</failure>
         </testcase>
     </testsuite>
+Testsuites can be nested into <testsuites> or each other. <error> is posted as Fail, <skipped> as Not Executed.
 """
 
 
+def iter_junit_testcases(file_path: str):
+    """
+    Generator reading JUnit report with iterparse: every element (testcase, suite system-out, properties,
+    whole testsuite) is removed from the tree as soon as it is read, so memory does not grow with report size
+    :return: (name, status, comment, execution time in ms) of every testcase
+    """
+    stack = list()
+    open_testcases = 0                      # children of testcase are kept until testcase is read
+    suites_found = False
+    for event, element in iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(element)
+            open_testcases += element.tag == 'testcase'
+            continue
+        stack.pop()
+        if element.tag == 'testsuite':
+            suites_found = True
+        if element.tag == 'testcase':
+            open_testcases -= 1
+            status, comment = 'Pass', ''
+            for tag, status_name, title in (('failure', 'Fail', 'Failure'), ('error', 'Fail', 'Error'),
+                                            ('skipped', 'Not Executed', 'Skipped')):
+                result_element = element.find(tag)
+                if result_element is not None:
+                    status = status_name
+                    comment = f'<strong>{title}:</strong>{result_element.get("message") or ""}<br>' \
+                        f'{result_element.text or ""}'
+                    break
+            yield element.get('name', None), status, comment, int(1000 * float(element.get('time') or '0'))
+        elif open_testcases:
+            continue
+        if stack:
+            stack[-1].remove(element)
+        element.clear()
+    if not suites_found:
+        raise ValueError(f"There are no test suites in {file_path}")
+
+
+def read_junit_file(config: ConfigParser, file_path: str) -> list:
+    """JunitParser.file_reader, report DOM is never kept in memory"""
+    return list(iter_junit_testcases(file_path))
+
+
 class JunitParser(ThreadedParser):
+    file_reader = staticmethod(read_junit_file)
+
     def __init__(self, testcycle_name: str, config_path: str = None, testlogs_path: str = None):
         super().__init__(config_path)
         self.testcycle_name = testcycle_name
@@ -30,53 +77,52 @@ class JunitParser(ThreadedParser):
         self.testlogs_path = get_full_path(testlogs_path, self.config['GENERAL']['useRelativePath'])
         self.test_logs = parse_test_log(self.testlogs_path) if testlogs_path else None
 
-    def _read_single_file(self, file_path: str):
-        self.file = file_path
-        with open(self.file) as f:
-            self.file_contents = ElementTree.parse(f)
-
     def _parse_contents(self):
-        parsed_contents = []
-        test_suites = self.file_contents.findall('testsuite')
-        if not test_suites:
-            raise ValueError("There are no test suites in parsed files")
-        for test_suite in test_suites:
-            for test_case in test_suite.findall('testcase'):
-                parsed_contents.append(test_case)
-        for result in parsed_contents:
+        for testcase_name, testcase_status, result_comment, testcase_execution_time in self.file_contents:
             testcase_comment = ''
-            testcase_name = result.get('name', None)
-            testcase_execution_time = int(1000 * float(result.get('time', '0')))
             if self.test_logs:
                 logs_details = self.test_logs.get(testcase_name, None)
                 testcase_comment = f'<strong>Test logs data:</strong> {logs_details} <br>' if logs_details else ''
-            failure_element = result.find('failure')
-            if failure_element is not None:
-                testcase_status = 'Fail'
-                testcase_comment += f'<strong>Failure:</strong>{failure_element.get("message")}<br>{failure_element.text}'
-            else:
-                testcase_status = 'Pass'
-            parse_result = testcase_name, testcase_status, testcase_comment, testcase_execution_time
+            parse_result = testcase_name, testcase_status, testcase_comment + result_comment, testcase_execution_time
             self.parse_results.append(parse_result)
+        self.file_contents = list()
+
+    def _testcase_lookups(self) -> list:
+        return [(args[0], None, self.config['GENERAL']['tcFolder']) for args in self.parse_results]
+
+    def _make_pending_result(self, testcase: TestCaseHandle, args: tuple) -> PendingTestResult:
+        _, testcase_status, testcase_comment, testcase_execution_time = args
+        return PendingTestResult(testcase=testcase,
+                                 status=testcase_status,
+                                 environment=self.config['EXECUTION']['env'],
+                                 executed_by=self.config['EXECUTION']['reporter'],
+                                 comment=testcase_comment,
+                                 execution_time=testcase_execution_time)
+
+    def _resolve_single_result(self, args: tuple) -> PendingTestResult:
+        testcase = self.tm.get_testcase(name=args[0],
+                                        folder=self.config['GENERAL']['tcFolder'])
+        return self._make_pending_result(testcase, args)
+
+    async def _resolve_single_result_async(self, atm, args: tuple) -> PendingTestResult:
+        testcase = await atm.get_testcase(name=args[0],
+                                          folder=self.config['GENERAL']['tcFolder'])
+        return self._make_pending_result(testcase, args)
 
     def _post_single_result(self, args: tuple):
-        # need to instantiate separate tm instance to avoid concurrency issues in multithreading
-        tm = TM4J(self.config_path)
+        # stateless tm methods are used, so one tm instance is shared by all threads
         self.logger.debug(f'{locals()}')
-        testcase_name, testcase_status, testcase_comment, testcase_execution_time = args
-        tm.find_testcase(name=testcase_name,
-                         folder=self.config['GENERAL']['tcFolder'])
-        tm.post_test_result(status=testcase_status,
-                            environment=self.config['EXECUTION']['env'],
-                            executed_by=self.config['EXECUTION']['reporter'],
-                            comment=testcase_comment,
-                            execution_time=testcase_execution_time,
-                            test_cycle_key=self.testcycle_key)
+        self.tm.create_test_result(testcycle=self.testcycle, **self._resolve_single_result(args)._asdict())
+
+    async def _post_single_result_async(self, atm, args: tuple):
+        result = await self._resolve_single_result_async(atm, args)
+        await atm.create_test_result(testcycle=self.testcycle, **result._asdict())
 
     def do_export_results(self, args: tuple = None):
-        self.testcycle_key = self.tm.find_testcycle(self.testcycle_name, self.config['GENERAL']['trFolder'])
+        self.testcycle = self.tm.get_testcycle(self.testcycle_name, self.config['GENERAL']['trFolder'])
+        self.testcycle_key = self.testcycle.key
         if self.testlogs_path:
-            self.tm.attach_testrun_file(self.testlogs_path)
+            self.tm.attach_file_to_testcycle(self.testcycle, self.testlogs_path)
         super().do_export_results(args)
 
     def manage_unposted_results(self, failed_posts: list):
@@ -1,7 +1,9 @@
 """
 Parsers classes
 """
-
+from functools import partial
+from libs.parallel_parse import parse_processes, read_files_parallel
+from libs.retry import retry_stats
 from libs.tm_log import get_logger
 from libs.config import read_config
 from classes.TM4J import TM4J
@@ -11,11 +13,16 @@ class Parser:
     """
     base class to parse data and post into tm4j
     """
+    # module-level function reading one file into list of picklable records: file_reader(config, file_path).
+    # If it is set, records of all files are collected into self.file_contents and big file sets are read
+    # in process pool, otherwise _read_single_file is called for every file
+    file_reader = None
+
     def __init__(self, config_path: str = None):
         self.config_path = config_path
         self.config = read_config(config_path)
         self.logger = get_logger(__name__, self.config)
-        self.tm = TM4J(self.config_path)
+        self.tm = TM4J(self.config_path, self.config)
         self.file = None
         self.file_contents = list()
         self.parse_results = list()
@@ -37,9 +44,16 @@ class Parser:
         self.logger.info(f'Reading files to parse: {files}')
         if not files:
             raise FileNotFoundError('Cannot read files to parse. Files list is empty!')
-        for file in files:
-            self._read_single_file(file)
-            self.export_results['Files read'] += 1
+        if self.file_reader:
+            records = read_files_parallel(partial(self.file_reader, self.config), files, parse_processes(self.config))
+            for file, file_records in zip(files, records):
+                self.file = file
+                self.file_contents.extend(file_records)
+                self.export_results['Files read'] += 1
+        else:
+            for file in files:
+                self._read_single_file(file)
+                self.export_results['Files read'] += 1
         self._parse_contents()
 
     def _parse_contents(self):
@@ -57,6 +71,20 @@ class Parser:
         """
         pass
 
+    def _testcase_lookups(self) -> list:
+        """
+        method to list testcases that parsed results are posted for
+        :return: list of (name, key, folder) tuples, see TM4J.resolve_testcases
+        Should be overridden for specific parsers to resolve testcases in bulk before posting
+        """
+        return list()
+
+    def resolve_testcases(self):
+        """resolves testcases of all parsed results with few searches if it is turned on in config"""
+        lookups = self._testcase_lookups()
+        if lookups and int(self.config['PERFORMANCE']['searchBatchSize']) > 1:
+            self.tm.resolve_testcases(lookups)
+
     def do_export_results(self, args: tuple = None):
         """
         method to post results from self.export_results
@@ -64,6 +92,8 @@ class Parser:
         """
         self.export_results['Results found'] = len(self.parse_results)
         self.logger.info(f'Exporting {len(self.parse_results)} results')
+        requests = retry_stats.requests
+        self.resolve_testcases()
         for result in self.parse_results:
             new_args = (result,) + args if args else (result,)
             try:
@@ -72,8 +102,19 @@ class Parser:
             except Exception as e:
                 self.export_results['Failed'] += 1
                 self.logger.error(f"Parser -> Export results: Error exporting: {result}: {e}")
+        self.log_failed_links(self.tm.flush_trace_links())
+        self.export_results['Calls per testcase'] = self.calls_per_result(retry_stats.requests - requests)
         self.logger.info(self.export_results)
 
+    def log_failed_links(self, failed_links: list):
+        """reports trace links (e.g. testcycle Jira links) that were not posted on flush at the end of export"""
+        if failed_links:
+            self.logger.error(f'{len(failed_links)} trace links were not posted: {failed_links}')
+
+    def calls_per_result(self, requests: int) -> float:
+        """average number of HTTP requests export took per result"""
+        return round(requests / len(self.parse_results), 2) if self.parse_results else 0.0
+
     @staticmethod
     def match_execution_result(result: str) -> str:
         """
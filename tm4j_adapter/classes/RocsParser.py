@@ -1,10 +1,9 @@
 from classes.ThreadedParser import ThreadedParser
-from classes.TM4J import TM4J
 from classes.DataStructures import TestsExecutionResults, TestCaseExecution
-import tempfile
 from zipfile import ZipFile, ZIP_DEFLATED
-from xml.dom.minidom import parseString
+from xml.etree.ElementTree import XMLPullParser
 from libs.tags_parse_lib import clear_name
+from libs.zip_members import ZipMember, close_archives
 """
 Class to deal with rocs execution results provided in a single artifacts.zip file
 .xml-report format:
@@ -31,6 +30,22 @@ Class to deal with rocs execution results provided in a single artifacts.zip fil
 """
 
 
+def read_testcase_attributes(report, chunk_size: int = 1024) -> dict:
+    """
+    Reads attributes of the first <testcase> of rocs report with incremental parser,
+    the rest of report (e.g. long system-out) is not read
+    :param report: binary file object of .xml-report
+    :return: testcase attributes: name, status, time, ...
+    """
+    parser = XMLPullParser(events=('start',))
+    for chunk in iter(lambda: report.read(chunk_size), b''):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag == 'testcase':
+                return dict(element.attrib)
+    raise ValueError('No testcase found in rocs report')
+
+
 class RocsParser(ThreadedParser):
     def __init__(self, artifact_path: str, testcycle_name: str, config_path: str = None, testcycle_key: str = None):
         super().__init__(config_path)
@@ -42,28 +57,27 @@ class RocsParser(ThreadedParser):
 
     def read_files(self, files=None):
         """
-        override method to deal with one single file
+        override method to deal with one single file, log files are not extracted,
+        they are attached straight from the archive
         """
         self.logger.info(f'Parsing {self.artifact_path}')
         self.parse_results.clear()
         files_counter = 0
         with ZipFile(self.artifact_path, 'r') as artifacts_zip:
-            tempdir = tempfile.mkdtemp()
             for filename in artifacts_zip.namelist():
                 if ".xml" in filename:
                     files_counter += 1
                     xml_file = filename
                     logfile_name = "split_" + filename.split(".")[-2] + "_feature.log"
                     with artifacts_zip.open(filename) as report:
-                        dom = parseString(report.read())
+                        testcase = read_testcase_attributes(report)
                     testcase_key, testcase_name, testcase_example_row = \
-                        self.get_splitted_data(name=dom.getElementsByTagName("testcase")[0].attributes['name'].value,
+                        self.get_splitted_data(name=testcase['name'],
                                                delimiter=self.config['GENERAL']['testCaseKeyDelimiter'])
-                    testcase_status = self.match_execution_result(dom.getElementsByTagName("testcase")[0]
-                                                                  .attributes['status'].value)
-                    testcase_execution_time = int(1000 * float(dom.getElementsByTagName("testcase")[0]
-                                                               .attributes['time'].value))
-                    logfile = artifacts_zip.extract(logfile_name, tempdir)
+                    testcase_status = self.match_execution_result(testcase['status'])
+                    testcase_execution_time = int(1000 * float(testcase['time']))
+                    artifacts_zip.getinfo(logfile_name)     # fail on missing log before posting anything
+                    logfile = ZipMember(self.artifact_path, logfile_name)
                     tce = self.parse_results.add_result(*(testcase_key, testcase_name, testcase_status, logfile,
                                                           xml_file, testcase_execution_time, testcase_example_row))
                     tce.update(environment=self.config['EXECUTION']['env'],
@@ -73,18 +87,24 @@ class RocsParser(ThreadedParser):
         self.logger.info(f'Parsed {files_counter} files with test results, {len(self.parse_results)} testcases')
 
     def _post_single_result(self, tce: TestCaseExecution):
-        # need to instantiate separate tm instance to avoid concurrency issues in multithreading
-        tm = TM4J(self.config_path)
+        # stateless tm methods are used, so one tm instance is shared by all threads
         self.logger.debug(f'{locals()}')
-        tm.post_data_driven_test_results(tce)
+        self.tm.create_data_driven_test_results(tce, testcycle=self.testcycle)
+
+    async def _post_single_result_async(self, atm, tce: TestCaseExecution):
+        await atm.create_data_driven_test_results(tce, testcycle=self.testcycle)
 
     def do_export_results(self, args: tuple = None):
-        if not self.testcycle_key:
-            self.testcycle_key = self.tm.find_testcycle(name=self.testcycle_name,
-                                                        folder=self.config['GENERAL']['trFolder'],
-                                                        linked_issues=self.config['EXECUTION']['jiraTaskList'])
+        self.testcycle = self.tm.get_testcycle(name=self.testcycle_name,
+                                               folder=self.config['GENERAL']['trFolder'],
+                                               key=self.testcycle_key,
+                                               linked_issues=self.config['EXECUTION']['jiraTaskList'])
+        self.testcycle_key = self.testcycle.key
         self.parse_results.set_testrun_key(self.testcycle_key)
-        super().do_export_results(args)
+        try:
+            super().do_export_results(args)
+        finally:
+            close_archives()
         self.logger.info(f'\n\nRocs test execution summary:\n'
                          f'{"-" * 25}\n'
                          f'Created testcycle {self.testcycle_key}: {self.testcycle_name}\n'
@@ -1,17 +1,37 @@
 import json
-from classes.DataStructures import TestCaseExecution
-from classes.TestScript import TestScript
+from typing import List
+from classes.DataStructures import TestCaseExecution, TestCaseHandle, TestCycleHandle, TestResultHandle, \
+    PendingTestResult
+from classes.TestRunItemIndex import get_shared_testrun_item_index
+from libs.batching import BulkAccumulator, split_into_chunks
+from libs.persistent_cache import testcase_name_key, TESTCASE_FINGERPRINT, TESTCASE_ID
+from libs.zip_members import open_attachment
 from libs.tags_parse_lib import split_testcase_name_key, clear_name, \
-    strip_none_values, choose, validate_script_results_json, check_folder_name, is_true
-from classes.BaseTm4j import BaseTm4j
+    strip_none_values, choose, check_folder_name, is_true
+from classes.BaseTm4j import BaseTm4j, _make_test_result_payload, _make_testcase_payload, _testcase_lookup, \
+    _testcase_search_url, _testcases_page_url, _testcycle_search_url, _test_result_handle, _testrun_items_url, \
+    _datarow_results_url, _datarow_ids, _escape_query_value, _get_cached_testcase, _cache_testcase, \
+    TESTCASE_REJECTIONS
 from classes.Exceptions import TM4JObjectNotFound, TM4JInvalidValue, \
     TM4JFolderNotFound, TM4JException, TM4JEnvironmentNotFound
 
 
 class TM4J(BaseTm4j):
-    """Class to manage testcase and testcycle (find, post executions, attach files"""
-    def __init__(self, config_path=None):
-        super().__init__(config_path)
+    """Class to manage testcase and testcycle (find, post executions, attach files.
+    Methods find_testcase, find_testcycle, post_test_result and so on keep found items in self parameters,
+    so every thread needs its own instance. Methods get_testcase, get_testcycle, create_test_result and so on
+    return handles and take them as arguments, so one instance can be shared between threads."""
+    def __init__(self, config_path=None, config=None):
+        super().__init__(config_path, config)
+        # data rows results of create_data_driven_test_results, put with flush_script_results
+        self.script_results = BulkAccumulator(self._put_script_results_chunk,
+                                              int(self.config['PERFORMANCE']['scriptResultBatchSize']),
+                                              int(self.config['GENERAL']['threadsQty']),
+                                              name='Script results')
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush_script_results()
+        return super().__exit__(exc_type, exc_val, exc_tb)
 
     def find_testcase(self,
                       name: str = None,
@@ -28,36 +48,66 @@ class TM4J(BaseTm4j):
         :param test_source_file_path: test source path for csv logger
         :param autocreate: option to override tests autocreation
         """
+        testcase = self.get_testcase(name, key, folder, test_source_file_path, autocreate)
+        self.testcase = testcase.data
+        self._tc_internal_id = testcase.internal_id
+        return testcase.key
+
+    def get_testcase(self,
+                     name: str = None,
+                     key: str = None,
+                     folder: str = None,
+                     test_source_file_path: str = '',
+                     autocreate: bool = False) -> TestCaseHandle:
+        """Thread-safe version of find_testcase: same search and creation rules, but found testcase
+        is returned instead of being stored in self parameter.
+        :return: found or created testcase
+        """
         autocreate = autocreate or is_true(self.config['NOTFOUND']['createTestcase'])
+        testcase = self._find_testcase_data(name, key, folder, test_source_file_path, autocreate)
+        try:
+            internal_id = self._get_testcase_internal_id(testcase['key'])
+        except TM4JObjectNotFound:
+            self._forget_testcase(testcase['key'])
+            raise
+        return TestCaseHandle(key=testcase['key'],
+                              name=testcase.get('name'),
+                              folder=testcase.get('folder'),
+                              internal_id=internal_id,
+                              data=testcase)
+
+    def _find_testcase_data(self,
+                            name: str,
+                            key: str,
+                            folder: str,
+                            test_source_file_path: str,
+                            autocreate: bool) -> dict:
+        """
+        Searches testcase for get_testcase
+        :return: testcase data
+        """
         self.logger.debug(f"Find testcase with params: {locals()}")
-        url_options = list()
-        url_options.append(f'{self._baseurl}/testcase/search?version=1.0&maxResults=10&query=')
-        if key:
-            url_options.append(f' key = "{key}"')
-        else:
-            name = clear_name(name)
-            if name == '':
-                raise TM4JInvalidValue('Testcase name cannot be empty!')
-            n_key, n_name = split_testcase_name_key(name, self.config['GENERAL']['testCaseKeyDelimiter'])
-            # check if name starts with testCase key -- then find by key
-            if n_key:
-                self.find_testcase(n_name, n_key, folder, test_source_file_path)
-                return self.testcase['key']
-            else:
-                folder = choose(folder, folder, self.config['GENERAL']['tcFolder'])
-                check_folder_name(folder)
-                url_options.append(f' projectKey = "{self.project_key}" AND name = "{name}"')
-                url_options.append(choose(folder, f" AND folder = \"/{folder}\"", ''))
-        url = ''.join(url_options)
+        self._load_testcase_index()
+        name, key, folder = _testcase_lookup(self.config, name, key, folder)
+        url = _testcase_search_url(self._baseurl, self.project_key, name, key, folder)
         payload = ''
         try:
-            response = self._do('get', url, payload, False, True)
-            self.testcase = response[0]
-            self._get_tc_id()
+            testcase = self._testcase_index.find(key, name, folder)
+            if not testcase and not key:
+                testcase = _get_cached_testcase(self._cache, name, folder)
+            if not testcase:
+                # testcase cannot be in folder that does not exist, so it is created without search
+                missing = not key and (self._testcase_index.is_absent(name, folder) or
+                                       self.is_folder_missing('TEST_CASE', folder))
+                response = [] if missing else self._do('get', url, payload, False, True, coalesce=True)
+                testcase = response[0]
+                if not key:
+                    _cache_testcase(self._cache, name, folder, testcase)
+            self._testcase_index.add(testcase)
         except IndexError:
             if autocreate and name:
                 self.logger.info(f'Cannot find testcase {key} - {name}. Will create a new one')
-                self._post_new_testcase(name, folder, test_source_file_path)
+                testcase = self._create_testcase(name, folder, test_source_file_path)
             else:
                 msg = f'find_testcase: testcase {key} not found. '\
                       f'Name=\"{name}\" or autocreate={autocreate} do not allow creation'
@@ -65,40 +115,206 @@ class TM4J(BaseTm4j):
                 raise TM4JObjectNotFound(msg)
         except TM4JFolderNotFound:
             self._create_folder('TEST_CASE', folder)
-            self._post_new_testcase(name, folder, test_source_file_path)
-        return self.testcase['key']
+            testcase = self._create_testcase(name, folder, test_source_file_path)
+        return testcase
+
+    def _get_current_testcase(self) -> TestCaseHandle:
+        """makes handle of testcase stored in self parameter"""
+        return TestCaseHandle(key=self.testcase['key'],
+                              name=self.testcase.get('name'),
+                              folder=self.testcase.get('folder'),
+                              internal_id=self._tc_internal_id,
+                              data=self.testcase)
 
     def update_testcase(self, updated_values: json):
         """update testcase from self parameters"""
-        url = f'{self._baseurl}/testcase/{self.testcase["key"]}'
-        folder = updated_values['folder'] if updated_values['folder'][0] == '/' \
-            else f"/{updated_values['folder']}"
-        testcase = {
-            'name': updated_values['name'],
-            'objective': updated_values.get('objective', None),
-            'precondition': updated_values.get('precondition', None),
-            'status': updated_values['status'],
-            'priority': updated_values.get('priority', None),
-            'owner': updated_values.get('owner', None),
-            'estimatedTime': updated_values.get('estimatedTime', None),
-            'component': updated_values.get('component', None),
-            'labels': updated_values.get('labels', None),
-            'folder': folder,
-            'parameters': updated_values.get('parameters', None),
-            'issueLinks': updated_values.get('issueLinks', None),
-            'customFields': updated_values.get('customFields', None),
-            'testScript': {'type': 'STEP_BY_STEP', 'steps':
-                           [{k: v for k, v in d.items() if k != 'index'}
-                            for d in updated_values.get('testScript', [])['steps']]}
-        }
+        testcase = _make_testcase_payload(updated_values)
+        self._testcase_index.discard(self.testcase["key"])
         try:
-            self._do('put', url, payload=strip_none_values(testcase))
-        except TM4JFolderNotFound:
-            self._create_folder('TEST_CASE', folder.strip('/'))
-            self._do('put', url, payload=strip_none_values(testcase))
+            self._put_testcase(self.testcase["key"], testcase)
         finally:
             self._put_testcase_paramtype_property()
 
+    def create_testcase_from_values(self, values: dict, test_source_file_path: str = '') -> TestCaseHandle:
+        """
+        Thread-safe creation of testcase with all values in one POST, internal id is resolved only if paramType is put
+        :param values: testcase fields as for update_testcase
+        :return: created testcase, internal id is not resolved if testcase has no parameters
+        """
+        payload = _make_testcase_payload(values)
+        folder = payload['folder'].strip('/')
+        try:
+            testcase = self._post_testcase(payload, folder, test_source_file_path)
+        except TM4JFolderNotFound:
+            self._create_folder('TEST_CASE', folder)
+            testcase = self._post_testcase(payload, folder, test_source_file_path)
+        return self._saved_testcase_handle(testcase, payload, None)
+
+    def update_testcase_from_values(self, testcase: dict, values: dict) -> TestCaseHandle:
+        """
+        Thread-safe update of found testcase with values in one PUT, testcase data is built from values
+        :param testcase: current testcase data
+        :param values: testcase fields as for update_testcase
+        :return: updated testcase, its data is current data updated with values
+        """
+        payload = _make_testcase_payload(values)
+        key = testcase['key']
+        self._testcase_index.discard(key)
+        self._put_testcase(key, payload)
+        saved = dict(testcase, **{k: v for k, v in payload.items() if v is not None})
+        self._testcase_index.add(saved)
+        _cache_testcase(self._cache, saved['name'], payload['folder'].strip('/'), saved)
+        return self._saved_testcase_handle(saved, payload, testcase.get('parameters'))
+
+    def _saved_testcase_handle(self, testcase: dict, payload: dict, previous_parameters) -> TestCaseHandle:
+        """puts paramType of saved testcase if its parameters are changed and returns its handle"""
+        key = testcase['key']
+        # paramType is put with parameters, so it is up to date if they are unchanged
+        if payload.get('parameters') and payload['parameters'] != previous_parameters:
+            self._put_testcase_paramtype(self._get_testcase_internal_id(key))
+        return TestCaseHandle(key=key,
+                              name=testcase.get('name'),
+                              folder=testcase.get('folder'),
+                              internal_id=self._testcase_index.get_internal_id(key),
+                              data=testcase)
+
+    @staticmethod
+    def is_testcase_up_to_date(testcase: dict, values: dict) -> bool:
+        """
+        Checks if testcase data already has all values, so it does not need update
+        :param testcase: current testcase data
+        :param values: testcase fields as for update_testcase
+        """
+        for field, value in _make_testcase_payload(values).items():
+            if value is None:
+                continue
+            current = testcase.get(field)
+            if field == 'testScript':
+                current = [{k: step.get(k) or '' for k in ('description', 'testData', 'expectedResult')}
+                           for step in (current or {}).get('steps', [])]
+                value = [{k: step.get(k) or '' for k in ('description', 'testData', 'expectedResult')}
+                         for step in value['steps']]
+            elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+                current, value = sorted(current or []), sorted(value)
+            elif isinstance(value, str):
+                current = current or ''
+            if current != value:
+                return False
+        return True
+
+    def load_testcases(self, folder: str):
+        """
+        Loads testcases of folder and its subfolders into shared index with few paged requests,
+        so find_remote_testcase does not search them one by one. Nothing is loaded if all project is preloaded
+        """
+        self._load_testcase_index()
+        if self._testcase_index.loaded:
+            return
+        page_size = int(self.config['PERFORMANCE']['preloadPageSize'])
+        for page in self._get_project_testcases_pages(page_size, f' AND folder <= "/{folder.strip("/")}"'):
+            self._testcase_index.add_many(page)
+        self.logger.info(f'Loaded testcases of folder {folder}: {len(self._testcase_index)} testcases in index')
+
+    def find_remote_testcase(self, values: dict):
+        """
+        Thread-safe search of testcase for values with the same rules as get_testcase, but without
+        creating it. Testcases loaded with load_testcases are searched locally, other ones only by key
+        :return: testcase data or None
+        """
+        key = values.get('key')
+        name = clear_name(values['name'])
+        folder = values['folder'].strip('/')
+        testcase = self._testcase_index.find(key, name, folder)
+        if testcase or not key:
+            return testcase
+        url = _testcase_search_url(self._baseurl, self.project_key, key=key)
+        response = self._do('get', url, '', False, True, coalesce=True)
+        if not response:
+            return None
+        self._testcase_index.add(response[0])
+        return response[0]
+
+    def resolve_testcases(self, lookups: list) -> dict:
+        """
+        Resolves testcases of all parsed results before posting with few concurrent searches: keys with
+        `key IN (...)`, names with `name IN (...)` in their folder. Found testcases are put into shared index
+        and names that are not found are marked absent, so get_testcase finds or creates them without searches.
+        Names found with another case or spaces are not marked absent, get_testcase searches them one by one.
+        Names cached by previous runs are not searched, found ones are cached for the next runs
+        :param lookups: list of (name, key, folder) tuples with the same rules as get_testcase arguments
+        :return: dict of found testcase data by lookup, None if testcase is not found
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        self._load_testcase_index()
+        searches = dict()                   # lookup -> (key, name, folder) to find in index
+        keys, names = set(), dict()         # to search: keys, folder -> names
+        delimiter = self.config['GENERAL']['testCaseKeyDelimiter']
+        for lookup in dict.fromkeys(lookups):
+            name, key, folder = lookup
+            if not key:
+                key, name = split_testcase_name_key(clear_name(name or ''), delimiter)
+            folder = '' if key else choose(folder, folder, self.config['GENERAL']['tcFolder']).strip('/')
+            searches[lookup] = key, name, folder
+            if self._testcase_index.find(key, name, folder) or (not key and not name):
+                continue
+            cached = None if key else _get_cached_testcase(self._cache, name, folder)
+            if cached:
+                self._testcase_index.add(cached)
+            elif key:
+                keys.add(key)
+            elif self.is_folder_missing('TEST_CASE', folder):
+                self._testcase_index.mark_absent(name, folder)
+            else:
+                names.setdefault(folder, set()).add(name)
+        batch_size = int(self.config['PERFORMANCE']['searchBatchSize'])
+        # condition, folder and names it searches, names not found by successful search are absent
+        conditions = [(_in_condition('key', chunk), '', list())
+                      for chunk in split_into_chunks(sorted(keys), batch_size)]
+        conditions += [(choose(folder, f' AND folder = "/{folder}"', '') + _in_condition('name', chunk), folder, chunk)
+                       for folder, folder_names in names.items()
+                       for chunk in split_into_chunks(sorted(folder_names), batch_size)]
+
+        def search(condition: tuple):
+            page_size = int(self.config['PERFORMANCE']['preloadPageSize'])
+            found = set()
+            try:
+                for page in self._get_project_testcases_pages(page_size, condition[0]):
+                    self._testcase_index.add_many(page)
+                    found.update(_loose_name(testcase.get('name')) for testcase in page)
+                    for testcase in page:
+                        if testcase.get('name') in condition[2]:
+                            _cache_testcase(self._cache, testcase['name'], condition[1], testcase)
+            except Exception as e:
+                self.logger.warning(f'Cannot resolve testcases in bulk, they will be searched one by one: {e}')
+                return
+            for name in condition[2]:
+                if _loose_name(name) not in found:
+                    self._testcase_index.mark_absent(name, condition[1])
+
+        with ThreadPoolExecutor(max(1, int(self.config['GENERAL']['threadsQty']))) as executor:
+            list(executor.map(search, conditions))
+        self.logger.info(f'Resolved {len(searches)} testcases with {len(conditions)} searches')
+        return {lookup: self._testcase_index.find(*search) for lookup, search in searches.items()}
+
+    def get_unchanged_testcase_key(self, values: dict, values_fingerprint: str):
+        """
+        Checks if testcase was saved from the same values by this or previous run, see set_testcase_fingerprint.
+        Fingerprints are kept in persistent cache, so testcase is saved again after cacheTtlHours anyway
+        :param values: testcase fields as for update_testcase
+        :param values_fingerprint: fingerprint of values and everything else saved with testcase, e.g. links
+        :return: testcase key or None if testcase should be saved
+        """
+        if not self._cache or not is_true(self.config['PERFORMANCE']['skipUnchangedTestcases']):
+            return None
+        saved = self._cache.get(TESTCASE_FINGERPRINT, _testcase_values_id(values))
+        return saved['key'] if saved and saved['fingerprint'] == values_fingerprint else None
+
+    def set_testcase_fingerprint(self, values: dict, key: str, values_fingerprint: str):
+        """remembers fingerprint of values testcase key was saved from"""
+        if self._cache:
+            self._cache.set(TESTCASE_FINGERPRINT, _testcase_values_id(values),
+                            {'key': key, 'fingerprint': values_fingerprint})
+
     def add_testcase_weblink(self, link_url: str, description: str):
         """
         Add weblink to testcase traceability tab
@@ -108,15 +324,35 @@ class TM4J(BaseTm4j):
         """
         if not self._tc_internal_id:
             raise TM4JInvalidValue('Testcase internal id not set, find testcase first')
-        url = f'{self._serviceurl}/tracelink/bulk/create'
-        payload = json.dumps([{"url": link_url,
-                               "urlDescription": description,
-                               "testCaseId": self._tc_internal_id,
-                               "typeId": 1}])
-        try:
-            self._do('post', url, payload)
-        except TM4JInvalidValue:
-            pass
+        self.add_weblink(self._get_current_testcase(), link_url, description)
+
+    def add_weblink(self, testcase: TestCaseHandle, link_url: str, description: str) -> dict:
+        """
+        Thread-safe version of add_testcase_weblink. Links are posted in batches, see flush_trace_links
+        :param testcase: testcase, its internal id is resolved if not set
+        :param link_url:
+        :param description:
+        :return: link payload, flush_trace_links returns it if link is not posted
+        """
+        internal_id = testcase.internal_id if testcase.internal_id else self._get_testcase_internal_id(testcase.key)
+        link = {"url": link_url,
+                "urlDescription": description,
+                "testCaseId": internal_id,
+                "typeId": 1}
+        self.trace_links.add([link], self._post_trace_links)
+        return link
+
+    def get_testcase_weblinks(self, key: str) -> list:
+        """
+        Thread-safe request of testcase web links, testcase internal id is resolved with the same request
+        :return: urls of testcase web links
+        """
+        response = self._do('get', f'{self._serviceurl}/testcase/{key}?fields=id,projectId,traceLinks', '', False,
+                            True, coalesce=True)
+        self._testcase_index.set_internal_id(key, response['id'])
+        if self._cache:
+            self._cache.set(TESTCASE_ID, key, response['id'])
+        return [link['url'] for link in response.get('traceLinks') or [] if link.get('url')]
 
     def find_testcycle(self,
                        name: str = None,
@@ -135,32 +371,46 @@ class TM4J(BaseTm4j):
         If None, config folder will be used
             Folder should be specified in "parent folder" or "parent folder/child folder" format
         """
+        testcycle = self.get_testcycle(name, folder, key, linked_issues, executor)
+        self.testrun = testcycle.data
+        self._tr_internal_id = testcycle.internal_id
+        return testcycle.key
+
+    def get_testcycle(self,
+                      name: str = None,
+                      folder: str = None,
+                      key: str = None,
+                      linked_issues: str = None,
+                      executor: str = None) -> TestCycleHandle:
+        """Thread-safe version of find_testcycle: same search and creation rules, but found testcycle
+        is returned instead of being stored in self parameter.
+        :return: found or created testcycle with resolved internal id
+        """
         self.logger.info(f"Find testrun with params: {locals()}")
         payload = ''
-        url_options = list()
-        url_options.append(f'{self._baseurl}/testrun/search?version=1.0&maxResults=10&query=')
         if key:
-            url_options.append(f' key = "{key}"')
-            url = ''.join(url_options)
-            response = self._do('get', url, payload)
-            self.testrun = response[0]
+            url = _testcycle_search_url(self._baseurl, self.project_key, key=key)
+            response = self._do('get', url, payload, coalesce=True)
+            testrun = response[0]
         else:
             name = choose(name, name, self.config['EXECUTION']['testcycleName'])
             folder = choose(folder, folder, self.config['GENERAL']['trFolder'])
             check_folder_name(folder)
-            url_options.append(f'projectKey = "{self.project_key}"')
-            url_options.append(f" AND folder = \"/{folder}\"")
-            url = ''.join(url_options)
+            url = _testcycle_search_url(self._baseurl, self.project_key, folder=folder)
             try:
-                response = self._do('get', url, payload)
+                missing = self.is_folder_missing('TEST_RUN', folder)
+                response = [] if missing else self._do('get', url, payload, coalesce=True)
                 testruns = list(filter(lambda testrun: testrun['name'] == name, response))
-                self.testrun = testruns[0]
+                testrun = testruns[0]
             except IndexError:
-                self._post_new_testcycle(name, folder, linked_issues, True, executor)
+                return self._create_testcycle(name, folder, linked_issues, True, executor)
             except TM4JFolderNotFound:
                 self._create_folder('TEST_RUN', folder)
-                self._post_new_testcycle(name, folder, linked_issues, True, executor)
-        return self.testrun['key']
+                return self._create_testcycle(name, folder, linked_issues, True, executor)
+        return TestCycleHandle(key=testrun['key'],
+                               name=testrun.get('name'),
+                               internal_id=self._get_testrun_internal_id(testrun['key']),
+                               data=testrun)
 
     def post_test_result(self, status: str,
                          environment: str,
@@ -182,7 +432,6 @@ class TM4J(BaseTm4j):
         :param execution_time: test execution time
         """
         self.logger.info(f'Post results with params {locals()}')
-        response = None
         key = test_cycle_key if test_cycle_key else self.testrun['key']
         if key is None:
             message = 'post_test_result: no testrun id found, call _post_new_testrun first'
@@ -194,31 +443,78 @@ class TM4J(BaseTm4j):
             raise TM4JException(message)
         else:
             self.testrun['key'] = key
-            if script_results:
-                script_results = validate_script_results_json(script_results)
-                status = "Fail" if (list(filter(lambda step: step['status'] == "Fail", script_results))) else status
-            else:
-                script_results = TestScript.make_script_results(script=self.testcase['testScript'],
-                                                                status=status)
-            payload = dict({'status': status,
-                            'environment': environment,
-                            'comment': comment,
-                            'executedBy': executed_by,
-                            'scriptResults': script_results,
-                            'issueLinks': issue_links,
-                            'executionTime': execution_time})
-            url = f'{self._baseurl}/testrun/{key}/testcase/{self.testcase["key"]}/testresult'
-            try:
-                response = self._do('post', url, strip_none_values(payload))
-            except TM4JEnvironmentNotFound:
-                new_environment = self._check_environment(env=environment)
-                payload.update({'environment': new_environment})
-                response = self._do('post', url, strip_none_values(payload))
-            if response:
-                self._testResultsId = response.get('id', None)
-                self.logger.info(f'Test results posted successfully. Testcase:{self.testcase["key"]}, Results:{payload}')
-            else:
-                raise TM4JException(f'Cannot post test results.')
+            test_result = self.create_test_result(testcase=self._get_current_testcase(),
+                                                  testcycle=TestCycleHandle(key=key),
+                                                  status=status,
+                                                  environment=environment,
+                                                  executed_by=executed_by,
+                                                  script_results=script_results,
+                                                  comment=comment,
+                                                  issue_links=issue_links,
+                                                  execution_time=execution_time)
+            self._testResultsId = test_result.id
+
+    def create_test_result(self,
+                           testcase: TestCaseHandle,
+                           testcycle: TestCycleHandle,
+                           status: str,
+                           environment: str,
+                           executed_by: str,
+                           script_results: json = None,
+                           comment: str = None,
+                           issue_links: list = None,
+                           execution_time: str = None) -> TestResultHandle:
+        """
+        Thread-safe version of post_test_result: creates test execution result of testcase in testcycle
+        :param testcase: testcase to post result for
+        :param testcycle: testcycle to post result into
+        other parameters are the same as for post_test_result
+        :return: created test result
+        """
+        environment = self._resolve_environment(environment)
+        payload = _make_test_result_payload(testcase, status, environment, executed_by, script_results, comment,
+                                            issue_links, execution_time)
+        url = f'{self._baseurl}/testrun/{testcycle.key}/testcase/{testcase.key}/testresult'
+        try:
+            response = self._do('post', url, strip_none_values(payload))
+        except TM4JEnvironmentNotFound:
+            new_environment = self._check_environment(env=environment)
+            payload.update({'environment': new_environment})
+            response = self._do('post', url, strip_none_values(payload))
+        except TESTCASE_REJECTIONS:
+            self._forget_testcase(testcase.key)
+            raise
+        if response:
+            self.logger.info(f'Test results posted successfully. Testcase:{testcase.key}, Results:{payload}')
+            return _test_result_handle(self._serviceurl, testcycle, testcase.key, response)
+        else:
+            raise TM4JException(f'Cannot post test results.')
+
+    def create_test_results(self, testcycle: TestCycleHandle, test_results: List[PendingTestResult]) -> list:
+        """
+        Creates several test execution results in testcycle with one request
+        :param testcycle: testcycle to post results into
+        :param test_results: results resolved to testcases
+        :return: list of created test results in the same order
+        """
+        payload = [dict(_make_test_result_payload(**result._asdict()), testCaseKey=result.testcase.key)
+                   for result in test_results]
+        for item in payload:
+            item.update(environment=self._resolve_environment(item.get('environment')))
+        url = f'{self._baseurl}/testrun/{testcycle.key}/testresults'
+        try:
+            response = self._do('post', url, strip_none_values(payload))
+        except TM4JEnvironmentNotFound:
+            environments = {item['environment'] for item in payload if item.get('environment')}
+            environments = {env: self._check_environment(env=env) for env in environments}
+            for item in payload:
+                item.update({'environment': environments.get(item.get('environment'))})
+            response = self._do('post', url, strip_none_values(payload))
+        if not response or len(response) != len(payload):
+            raise TM4JException(f'Cannot post test results. Response: {response}')
+        self.logger.info(f'{len(payload)} test results posted successfully into {testcycle.key}')
+        return [_test_result_handle(self._serviceurl, testcycle, result.testcase.key, created)
+                for result, created in zip(test_results, response)]
 
     def post_data_driven_test_results(self, test_case_execution: TestCaseExecution):
         """
@@ -227,48 +523,96 @@ class TM4J(BaseTm4j):
         :param test_case_execution:
         :return:
         """
-        testcase_key = self.find_testcase(key=test_case_execution.key,
-                                          name=test_case_execution.name)
+        testcase = self.get_testcase(key=test_case_execution.key,
+                                     name=test_case_execution.name)
+        self.testcase = testcase.data
+        self._tc_internal_id = testcase.internal_id
+        self.testrun['key'] = test_case_execution.test_cycle_key
+        # data rows results are put at once, so failure is raised for this testcase only
+        test_result = self.create_data_driven_test_results(test_case_execution, testcase=testcase, batched=False)
+        self._testResultsId = test_result.id
+
+    def create_data_driven_test_results(self,
+                                        test_case_execution: TestCaseExecution,
+                                        testcycle: TestCycleHandle = None,
+                                        testcase: TestCaseHandle = None,
+                                        batched: bool = True) -> TestResultHandle:
+        """
+        Thread-safe version of post_data_driven_test_results. Data rows results of many testcases are put
+        together in batches of scriptResultBatchSize steps, call flush_script_results after the last testcase
+        :param test_case_execution:
+        :param testcycle: testcycle to post into, test_case_execution.test_cycle_key is used if not set
+        :param testcase: found testcase, it is searched by test_case_execution key and name if not set
+        :param batched: if False, data rows results are put with one request of this testcase
+        :return: last test result of testcase
+        """
+        testcase = testcase if testcase else self.get_testcase(key=test_case_execution.key,
+                                                               name=test_case_execution.name)
+        testcycle = self._get_testcycle_handle(
+            testcycle if testcycle else TestCycleHandle(key=test_case_execution.test_cycle_key))
         execution_details = dict(status=test_case_execution.status,
                                  environment=test_case_execution.environment,
                                  executed_by=test_case_execution.executedBy,
-                                 execution_time=str(test_case_execution.executionTime),
-                                 test_cycle_key=test_case_execution.test_cycle_key)
-        self.testrun['key'] = test_case_execution.test_cycle_key
+                                 execution_time=str(test_case_execution.executionTime))
         if test_case_execution.has_data_rows:
-            testrun_item_id, testcase_last_test_result_id = self.get_testcase_run_id(testcase_key, **execution_details)
+            testrun_item_id, testcase_last_test_result_id = self.get_testrun_item(testcycle, testcase,
+                                                                                  **execution_details)
             self.put_update_script_status(testcase_last_test_result_id)
-            test_case_execution.zip_with_id(self.get_datarow_ids(testrun_item_id))
-            self.put_testscript_results(test_case_execution.jsonate())
+            test_case_execution.zip_with_id(self.get_datarow_ids(testrun_item_id, testcycle.internal_id))
+            if batched and self.script_results.batch_size > 1:
+                self.script_results.add([(test_case_execution, step)
+                                         for step in test_case_execution.step_results()])
+            else:
+                self.put_testscript_results(test_case_execution.jsonate())
             for item in test_case_execution.data_row_results:
                 # testscript_steps_id_list[0] -- attach file to the first step in testscript
                 self.attach_testcase_step_file(datarow_id=item.testscript_steps_id_list[0],
                                                file_path=item.log_file)
             self.logger.info(f'Posted {len(test_case_execution.data_row_results)} data row executions'
-                        f'for testcase {testcase_key}')
+                             f'for testcase {testcase.key}')
+            return TestResultHandle(id=testcase_last_test_result_id,
+                                    testcase_key=testcase.key,
+                                    testcycle_key=testcycle.key)
         else:
-            self.post_test_result(**execution_details)
-            self.attach_testcase_result_file(file_path=test_case_execution[0].log_file)
+            test_result = self.create_test_result(testcase, testcycle, **execution_details)
+            self.attach_file_to_test_result(test_result, file_path=test_case_execution[0].log_file)
+            return test_result
 
     def get_testcase_run_id(self, key: str, **kwargs) -> tuple:
         """
         Function to get internal testrun item id and last execution id for testcase
         If no items found (testcase wasn't added into testrun) -- new test execution is created
-        and function is recursively called
         :param key: testcase key
         :param kwargs: test execution details
         :return: testrunitem id, testcase lastTestResult id
         """
         self._get_tr_id()
-        url = f'{self._serviceurl}/testrun/{self._tr_internal_id}/testrunitems?' \
-            f'fields=id,index,issueCount,$lastTestResult'
-        response = self._do('get', url, '')
-        for item in response:
-            if item['$lastTestResult']['testCase']['key'] == key:
-                return item['id'], item['$lastTestResult']['id']
-        self.post_test_result(**kwargs)
-        return self.get_testcase_run_id(key=key)
-        # raise TM4JObjectNotFound(f'Cannot find {key} run id in testrun {self._tr_internal_id}')
+        kwargs.pop('test_cycle_key', None)
+        return self.get_testrun_item(TestCycleHandle(key=self.testrun['key'], internal_id=self._tr_internal_id),
+                                     TestCaseHandle(key=key, data=self.testcase),
+                                     **kwargs)
+
+    def get_testrun_item(self, testcycle: TestCycleHandle, testcase: TestCaseHandle, **kwargs) -> tuple:
+        """
+        Thread-safe version of get_testcase_run_id
+        :param testcycle: testcycle with internal id
+        :param testcase: testcase to get testrun item for
+        :param kwargs: test execution details for create_test_result
+        :return: testrunitem id, testcase lastTestResult id
+        """
+        url = _testrun_items_url(self._serviceurl, testcycle.internal_id)
+        index = get_shared_testrun_item_index(self._serviceurl, testcycle.internal_id)
+        index.refresh(lambda: self._do('get', url, ''))
+        item = index.get(testcase.key)
+        if item:
+            return item
+        # testcase is added into testrun with its first result, then items are reloaded once for all threads
+        self.create_test_result(testcase, testcycle, **kwargs)
+        index.refresh(lambda: self._do('get', url, ''), index.mark_posted())
+        item = index.get(testcase.key)
+        if item:
+            return item
+        raise TM4JObjectNotFound(f'Cannot find {testcase.key} run id in testrun {testcycle.internal_id}')
 
     def put_update_script_status(self, run_id):
         """
@@ -282,32 +626,16 @@ class TM4J(BaseTm4j):
         payload = f'{{"id":{run_id}}}'
         self._do('put', url, payload)
 
-    def get_datarow_ids(self, run_id: str) -> dict:
+    def get_datarow_ids(self, run_id: str, tr_internal_id: int = None) -> dict:
         """
         Function to get list of parameterset ids (datarow ids) - in order to post DD executions
         :param run_id: testcase run id.
+        :param tr_internal_id: testrun internal id, self._tr_internal_id is used if not set
         :return: dict of row id of the last (current) executions
         """
-        url = f'{self._serviceurl}/testrun/{self._tr_internal_id}/testresults?fields=id,testResultStatusId,' \
-            f'testScriptResults(id,testResultStatusId,comment,index,sourceScriptType,parameterSetId),' \
-            f'traceLinks&itemId={run_id}'
-        last_execution = self._do('get', url, '')
-        if last_execution:
-            result = dict()
-            for item in last_execution[0]['testScriptResults']:
-                parameterset_id = item.get('parameterSetId', None)
-                # parameterSetId = row x in test data table, so it should exists
-                if parameterset_id:
-                    step_ids_list = result.get(parameterset_id, None)
-                    if step_ids_list:
-                        step_ids_list.append(item['id'])
-                    else:
-                        result.update({parameterset_id: [item['id']]})
-            if len(result) == 0:
-                raise TM4JObjectNotFound(f'No data table rows found for run_id {run_id}')
-            return result
-        else:
-            raise TM4JInvalidValue(f'No last execution found for run_id {run_id}')
+        tr_internal_id = tr_internal_id if tr_internal_id else self._tr_internal_id
+        url = _datarow_results_url(self._serviceurl, tr_internal_id, run_id)
+        return _datarow_ids(self._do('get', url, ''), run_id)
 
     def put_testscript_results(self, script_results: str):
         """
@@ -318,6 +646,18 @@ class TM4J(BaseTm4j):
         url = f'{self._serviceurl}/testscriptresult/'
         self._do('put', url, payload=script_results)
 
+    def _put_script_results_chunk(self, chunk: list):
+        """:param chunk: list of (TestCaseExecution, step result) pairs"""
+        self.put_testscript_results(json.dumps([step for _, step in chunk]))
+
+    def flush_script_results(self) -> list:
+        """
+        Puts data rows results collected by create_data_driven_test_results
+        :return: list of TestCaseExecution which results were not posted
+        """
+        self.script_results.flush()
+        return list({id(tce): tce for tce, _ in self.script_results.pop_failed()}.values())
+
     def attach_testrun_file(self, file_path: str):
         """
         Attach file to TestCycle execution. Must have value of *self.testrun['key']*
@@ -326,27 +666,47 @@ class TM4J(BaseTm4j):
         :return:
         """
         if self.testrun['key'] is not None:
-            url = f'{self._baseurl}/testrun/{self.testrun["key"]}/attachments'
-            with open(file_path, 'rb') as file:
-                payload = {'file': file}
-                self._do('post', url, payload, True)
-            self.logger.debug(f'Attached file to testcycle {self.testrun["key"]}')
+            self.attach_file_to_testcycle(TestCycleHandle(key=self.testrun['key']), file_path)
         else:
             raise TM4JException('attachTestResultFile: no testCycle id exists, call _post_new_testcycle first')
 
+    def attach_file_to_testcycle(self, testcycle: TestCycleHandle, file_path: str):
+        """
+        Thread-safe version of attach_testrun_file
+        :param testcycle:
+        :param file_path: file path or ZipMember
+        """
+        url = f'{self._baseurl}/testrun/{testcycle.key}/attachments'
+        with open_attachment(file_path) as file:
+            payload = {'file': file}
+            self._do('post', url, payload, True)
+        self.logger.debug(f'Attached file to testcycle {testcycle.key}')
+
     def attach_testcase_result_file(self, file_path: str):
         """Attach file to TestCase execution. Must have value of *self._testResultsId*
 -- call _post_new_testcycle beforehand."""
         if file_path:
             if self._testResultsId is not None:
-                url = f'{self._baseurl}/testresult/{str(self._testResultsId)}/attachments'
-                with open(file_path, 'rb') as file:
-                    payload = {'file': file}
-                    self._do('post', url, payload, True)
-                self.logger.debug(f'Attached file to testcase {self.testcase["key"]}')
+                self.attach_file_to_test_result(TestResultHandle(id=self._testResultsId,
+                                                                 testcase_key=self.testcase['key'],
+                                                                 testcycle_key=self.testrun['key']),
+                                                file_path)
             else:
                 raise TM4JException('attachTestResultFile: no testResult id exists, call postTestResults first')
 
+    def attach_file_to_test_result(self, test_result: TestResultHandle, file_path: str):
+        """
+        Thread-safe version of attach_testcase_result_file
+        :param test_result: posted test result
+        :param file_path: file path or ZipMember to attach, nothing is done if empty
+        """
+        if file_path:
+            url = f'{self._baseurl}/testresult/{str(test_result.id)}/attachments'
+            with open_attachment(file_path) as file:
+                payload = {'file': file}
+                self._do('post', url, payload, True)
+            self.logger.debug(f'Attached file to testcase {test_result.testcase_key}')
+
     def attach_testcase_step_file(self, datarow_id: int, file_path: str):
         """
         Function to attach data row execution result
@@ -357,14 +717,49 @@ class TM4J(BaseTm4j):
         if file_path:
             self.logger.debug(locals())
             url = f'{self._serviceurl}/testscriptresult/{datarow_id}/attachment'
-            with open(file_path, 'rb') as file:
+            with open_attachment(file_path) as file:
                 payload = {'file': file}
                 self._do('post', url, payload, True)
-            self.logger.info(f'Attached file to row execution for {self.testcase["key"]}')
+            self.logger.info(f'Attached file to row execution {datarow_id}')
 
-    def _get_all_project_testcases(self, max_results: int = 2000) -> list:
-        url = f'{self._baseurl}/testcase/search?version=1.0&maxResults={max_results}&query=projectKey = "{self.project_key}"'
-        response = self._do('get', url, '')
+    def _get_all_project_testcases(self, page_size: int = 1000) -> list:
+        response = [testcase for page in self._get_project_testcases_pages(page_size) for testcase in page]
         self.logger.info(f'Got {len(response)} testcases')
         return response
 
+    def _get_project_testcases_pages(self, page_size: int, condition: str = ''):
+        """
+        generator requesting project testcases page by page
+        :param condition: additional query condition, e.g. ' AND folder = "/folder"'
+        """
+        start_at = 0
+        while True:
+            url = _testcases_page_url(self._baseurl, self.project_key, start_at, page_size, condition)
+            page = self._do('get', url, '')
+            yield page
+            if len(page) < page_size:
+                break
+            start_at += page_size
+
+    def _load_testcase_index(self):
+        """loads all project testcases into shared index once per process if turned on in config"""
+        if self._testcase_index.loaded or not is_true(self.config['PERFORMANCE']['preloadTestcases']):
+            return
+        page_size = int(self.config['PERFORMANCE']['preloadPageSize'])
+        if self._testcase_index.load(lambda: self._get_project_testcases_pages(page_size)):
+            self.logger.info(f'Testcase index loaded: {len(self._testcase_index)} testcases')
+
+
+def _in_condition(field: str, values: list) -> str:
+    quoted = ', '.join(f'"{_escape_query_value(value)}"' for value in values)
+    return f' AND {field} IN ({quoted})'
+
+
+def _loose_name(name: str) -> str:
+    """name as search may match it: case and spaces are ignored"""
+    return ' '.join((name or '').split()).lower()
+
+
+def _testcase_values_id(values: dict) -> str:
+    """testcase values are identified by key if it is set, otherwise by name and folder"""
+    return values.get('key') or testcase_name_key(values['name'], values['folder'])
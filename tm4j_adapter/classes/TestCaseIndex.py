@@ -0,0 +1,116 @@
+import copy
+import threading
+"""
+In-memory index of project testcases, so testcase lookups are answered without testcase/search requests
+"""
+
+
+class TestCaseIndex:
+    """
+    Thread-safe index of testcases data by key, by name and folder and by internal id.
+    Lookups return copies of testcase data, so callers can change them safely.
+    If testcase has duplicates by name, the first one added is returned -- same as the first search result.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._by_key = dict()
+        self._by_name = dict()              # name -> key, for searches without folder
+        self._by_name_folder = dict()       # (name, folder) -> key
+        self._names = dict()                # key -> (name, folder) pairs it was added with, to discard it
+        self._internal_ids = dict()         # key -> internal id
+        self._by_internal_id = dict()       # internal id -> key
+        self._absent = set()                # (name, folder) searched in bulk and not found
+
+    def __len__(self):
+        return len(self._by_key)
+
+    @staticmethod
+    def _folder(folder: str) -> str:
+        return f"/{folder.strip('/')}" if folder else ''
+
+    def load(self, get_pages: callable):
+        """
+        fills index once, concurrent callers wait for the first one
+        :param get_pages: function returning iterable of testcases lists
+        :return: True if index was loaded by this call
+        """
+        with self._lock:
+            if self.loaded:
+                return False
+            for page in get_pages():
+                self.add_many(page)
+            self.loaded = True
+            return True
+
+    def add_many(self, testcases: list):
+        with self._lock:
+            for testcase in testcases:
+                self.add(testcase)
+
+    def add(self, testcase: dict):
+        key = testcase['key']
+        name = testcase.get('name')
+        with self._lock:
+            folder = self._folder(testcase.get('folder'))
+            self._by_key[key] = testcase
+            self._by_name.setdefault(name, key)
+            self._by_name_folder.setdefault((name, folder), key)
+            self._names.setdefault(key, set()).add((name, folder))
+            self._absent.discard((name, folder))
+
+    def mark_absent(self, name: str, folder: str):
+        """marks testcase name as not existing in folder, so it is created without search"""
+        with self._lock:
+            if (name, self._folder(folder)) not in self._by_name_folder:
+                self._absent.add((name, self._folder(folder)))
+
+    def is_absent(self, name: str, folder: str) -> bool:
+        with self._lock:
+            return (name, self._folder(folder)) in self._absent
+
+    def discard(self, key: str):
+        """removes testcase, e.g. if it was changed or deleted"""
+        with self._lock:
+            self._by_key.pop(key, None)
+            internal_id = self._internal_ids.pop(key, None)
+            self._by_internal_id.pop(internal_id, None)
+            for name, folder in self._names.pop(key, set()):
+                if self._by_name.get(name) == key:
+                    del self._by_name[name]
+                if self._by_name_folder.get((name, folder)) == key:
+                    del self._by_name_folder[(name, folder)]
+
+    def find(self, key: str = None, name: str = None, folder: str = None):
+        """
+        finds testcase by key or by name and folder (any folder if folder is empty)
+        :return: copy of testcase data or None
+        """
+        with self._lock:
+            if not key:
+                key = self._by_name_folder.get((name, self._folder(folder))) if folder else self._by_name.get(name)
+            testcase = self._by_key.get(key)
+            return copy.deepcopy(testcase) if testcase else None
+
+    def find_by_internal_id(self, internal_id: int):
+        with self._lock:
+            key = self._by_internal_id.get(internal_id)
+            return self.find(key=key) if key else None
+
+    def get_internal_id(self, key: str):
+        return self._internal_ids.get(key)
+
+    def set_internal_id(self, key: str, internal_id: int):
+        with self._lock:
+            self._internal_ids[key] = internal_id
+            self._by_internal_id[internal_id] = key
+
+
+_shared_lock = threading.Lock()
+_shared_indexes = dict()
+
+
+def get_shared_testcase_index(url: str, project_key: str) -> TestCaseIndex:
+    """returns process-wide testcase index of the project"""
+    with _shared_lock:
+        return _shared_indexes.setdefault((url, project_key), TestCaseIndex())
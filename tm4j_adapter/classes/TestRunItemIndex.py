@@ -0,0 +1,94 @@
+import asyncio
+import threading
+"""
+Index of testcycle items: testcase key -> (testrun item id, last test result id).
+Testrun items list is downloaded once per testcycle instead of once per data-driven testcase.
+"""
+
+
+class TestRunItemIndex:
+    """
+    Thread-safe index of one testcycle items. New items appear only after the first result of testcase
+    is posted, so index is reloaded then. Concurrent reloads are coalesced:
+        ticket = index.mark_posted()            # after result is posted
+        index.refresh(fetch_items, ticket)      # reloads only if no reload was started after the ticket
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._async_refresh_lock = None
+        self._items = dict()
+        self._posted = 0                    # number of posted results that may have added items
+        self._covered = -1                  # number of posted results seen by the last reload
+        self.reloads = 0
+
+    def get(self, testcase_key: str):
+        """:return: tuple (testrun item id, last test result id) or None"""
+        with self._lock:
+            return self._items.get(testcase_key)
+
+    def set_last_result(self, testcase_key: str, test_result_id: int):
+        """updates last result id of existing item after new result is posted"""
+        with self._lock:
+            item = self._items.get(testcase_key)
+            if item and test_result_id:
+                self._items[testcase_key] = (item[0], test_result_id)
+
+    def _replace(self, items: list):
+        with self._lock:
+            loaded = {item['$lastTestResult']['testCase']['key']: (item['id'], item['$lastTestResult']['id'])
+                      for item in items}
+            # results posted while items were downloading are newer than downloaded ones
+            for key, (item_id, last_result_id) in loaded.items():
+                current = self._items.get(key)
+                if current and current[0] == item_id and current[1] > last_result_id:
+                    loaded[key] = current
+            self._items = loaded
+        self.reloads += 1
+
+    def mark_posted(self) -> int:
+        """registers posted result, returns ticket for refresh"""
+        with self._lock:
+            self._posted += 1
+            return self._posted
+
+    def _start_refresh(self, ticket: int):
+        """:return: number of posted results the reload will see or None if reload is not needed"""
+        with self._lock:
+            return None if self._covered >= ticket else self._posted
+
+    def refresh(self, fetch_items: callable, ticket: int = 0):
+        """
+        reloads items unless reload started after the ticket was taken already finished.
+        With ticket 0 items are loaded only once
+        :param fetch_items: function returning testrun items list
+        """
+        with self._refresh_lock:
+            covered = self._start_refresh(ticket)
+            if covered is not None:
+                self._replace(fetch_items())
+                self._covered = covered
+
+    def _get_async_refresh_lock(self) -> asyncio.Lock:
+        # created lazily to be bound to the running loop
+        if self._async_refresh_lock is None:
+            self._async_refresh_lock = asyncio.Lock()
+        return self._async_refresh_lock
+
+    async def refresh_async(self, fetch_items: callable, ticket: int = 0):
+        """same as refresh for coroutine fetch_items"""
+        async with self._get_async_refresh_lock():
+            covered = self._start_refresh(ticket)
+            if covered is not None:
+                self._replace(await fetch_items())
+                self._covered = covered
+
+
+_shared_lock = threading.Lock()
+_shared_indexes = dict()
+
+
+def get_shared_testrun_item_index(url: str, testrun_internal_id: int) -> TestRunItemIndex:
+    """returns process-wide items index of testcycle"""
+    with _shared_lock:
+        return _shared_indexes.setdefault((url, testrun_internal_id), TestRunItemIndex())
@@ -1,21 +1,63 @@
+from collections import Counter
 from classes.Parser import Parser
+from libs.concurrency import get_shared_limiter, max_concurrency
+from libs.persistent_cache import get_shared_cache
+from libs.retry import retry_stats
+from libs.single_flight import single_flight
+from libs.tags_parse_lib import is_true
 """
 Class using multithreading when exporting results
 """
 
 
 class ThreadedParser(Parser):
+    # methods specific parsers implement to post results in chunks and with async client, None if not supported:
+    #   _resolve_single_result(args) -- resolves single result folded into tuple to PendingTestResult
+    #       without posting it
+    #   async _resolve_single_result_async(atm, args) -- same with shared AsyncTM4J client
+    #   async _post_single_result_async(atm, args) -- posts single result with shared AsyncTM4J client
+    _resolve_single_result = None
+    _resolve_single_result_async = None
+    _post_single_result_async = None
+
     def __init__(self, config_path: str = None):
         super().__init__(config_path)
         self.testcycle_key = None
+        self.testcycle = None       # TestCycleHandle shared by all threads
+        self.limiter = get_shared_limiter(self.config)
+        self.single_flight = single_flight
+        self.accumulators = [self.tm.trace_links, self.tm.script_results]     # batched requests for summary
+
+    @property
+    def use_async_client(self) -> bool:
+        """async export is used if turned on in config and parser implements _post_single_result_async"""
+        return is_true(self.config['PERFORMANCE']['asyncClient']) and self._post_single_result_async is not None
+
+    @property
+    def use_batching(self) -> bool:
+        """results are posted in chunks if batch size is set in config and parser implements result resolving"""
+        resolve_method = '_resolve_single_result_async' if self.use_async_client else '_resolve_single_result'
+        return int(self.config['PERFORMANCE']['resultBatchSize']) > 1 and getattr(self, resolve_method) is not None
 
     def do_export_results(self, args: tuple = None):
         import time
         from libs.multi_threading import run_threaded
         start = time.time()
+        requests = retry_stats.requests
         self.export_results['Results found'] = len(self.parse_results)
         self.logger.info(f'Exporting {len(self.parse_results)} results')
-        failed_posts = run_threaded(self.parse_results, self._post_single_result, args)
+        self.resolve_testcases()
+        if self.use_async_client:
+            import asyncio
+            failed_posts = asyncio.run(self._do_export_results_async(args))
+        elif self.use_batching:
+            failed_posts = self._do_export_results_in_batches(args)
+        else:
+            # with adaptive concurrency threads over current limit wait for limiter in TM4J, not for pool
+            failed_posts = run_threaded(self.parse_results, self._post_single_result, args,
+                                        max_concurrency(self.config))
+        failed_posts = _add_failed(failed_posts, self.tm.flush_script_results())
+        self.log_failed_links(self.tm.flush_trace_links())
         self.logger.info("Posting results took: {:.2f} seconds".format(time.time() - start))
         if failed_posts:
             self.logger.error(f'{" "*30} EXPORT HAS SOME ERRORS: {len(self.parse_results)} results were in report, '
@@ -25,8 +67,75 @@ class ThreadedParser(Parser):
             self.logger.info('Execution results posted successfully.')
         self.export_results['Failed'] = len(failed_posts)
         self.export_results['Exported'] = len(self.parse_results) - len(failed_posts)
+        if self.limiter:
+            self.export_results.update(self.limiter.stats())
+        self.export_results.update(retry_stats.stats())
+        self.export_results['Calls per testcase'] = self.calls_per_result(retry_stats.requests - requests)
+        self.export_results['Coalesced requests'] = self.single_flight.coalesced
+        cache = get_shared_cache(self.config)
+        if cache:
+            self.export_results.update(cache.stats())
+        batched_stats = Counter()
+        for accumulator in self.accumulators:
+            batched_stats.update(accumulator.stats())
+        self.export_results.update(batched_stats)
         self.logger.info(self.export_results)
 
+    def _do_export_results_in_batches(self, args: tuple = None) -> list:
+        """
+        resolves results to testcases in threads, then posts them into testcycle in chunks
+        :return: list of results that were not posted
+        """
+        from libs.batching import post_in_chunks
+        from libs.multi_threading import run_threaded, add_tuple_to_item
+        resolved = list()                   # (result, PendingTestResult)
+        failed_posts = run_threaded(
+            self.parse_results,
+            lambda result: resolved.append((result, self._resolve_single_result(add_tuple_to_item(result, args)))),
+            None,
+            max_concurrency(self.config))
+        failed_chunks = post_in_chunks(resolved,
+                                       int(self.config['PERFORMANCE']['resultBatchSize']),
+                                       lambda chunk: self.tm.create_test_results(self.testcycle,
+                                                                                 [result for _, result in chunk]),
+                                       lambda item: self.tm.create_test_result(testcycle=self.testcycle,
+                                                                               **item[1]._asdict()),
+                                       max_concurrency(self.config))
+        return failed_posts + [result for result, _ in failed_chunks]
+
+    async def _do_export_results_async(self, args: tuple = None) -> list:
+        """posts all results with one AsyncTM4J client on a single event loop"""
+        from classes.AsyncTM4J import AsyncTM4J
+        from libs.async_execution import run_async
+        from libs.batching import post_in_chunks_async
+        from libs.multi_threading import add_tuple_to_item
+        async with AsyncTM4J(self.config_path) as atm:
+            self.limiter = atm.limiter
+            self.single_flight = atm.single_flight
+            self.accumulators.extend([atm.trace_links, atm.script_results])
+            if not self.use_batching:
+                failed_posts = await run_async(self.parse_results,
+                                               lambda values: self._post_single_result_async(atm, values),
+                                               args,
+                                               atm.max_in_flight)
+                failed_posts = _add_failed(failed_posts, await atm.flush_script_results())
+            else:
+                resolved = list()           # (result, PendingTestResult)
+
+                async def resolve(result):
+                    resolved.append((result,
+                                     await self._resolve_single_result_async(atm, add_tuple_to_item(result, args))))
+
+                failed_posts = await run_async(self.parse_results, resolve, None, atm.max_in_flight)
+                failed_chunks = await post_in_chunks_async(
+                    resolved,
+                    int(self.config['PERFORMANCE']['resultBatchSize']),
+                    lambda chunk: atm.create_test_results(self.testcycle, [result for _, result in chunk]),
+                    lambda item: atm.create_test_result(testcycle=self.testcycle, **item[1]._asdict()))
+                failed_posts = failed_posts + [result for result, _ in failed_chunks]
+            self.log_failed_links(await atm.flush_trace_links())
+            return failed_posts
+
     def manage_unposted_results(self, failed_posts: list):
         """
         function to manage unposted results -- export, save and so on.
@@ -36,3 +145,7 @@ class ThreadedParser(Parser):
         """
         pass
 
+
+def _add_failed(failed_posts: list, failed: list) -> list:
+    """adds results that failed after export, e.g. on flush of batched requests, to failed ones"""
+    return failed_posts + [result for result in failed if all(result is not post for post in failed_posts)]
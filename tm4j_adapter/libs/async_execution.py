@@ -0,0 +1,47 @@
+"""
+Module implements asyncio execution of coroutines over results list with bounded number of in-flight actions
+"""
+import asyncio
+from libs.multi_threading import add_tuple_to_item
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+
+async def run_async(results_list: list, action: callable, args, max_in_flight: int) -> list:
+    """
+    Awaits action for every item of results_list. Only max_in_flight workers are started, they take items
+    one by one, so memory does not grow with the list size.
+    :param results_list: items to proceed
+    :param action: coroutine function taking item folded into tuple with args
+    :param args: some data relating to all results in list
+    :param max_in_flight: number of concurrent workers
+    :return: list of items that were not posted
+    """
+    retry_list = list()
+    exceptions_list = list()
+    counter = 0
+    items = iter(results_list)
+    initial_list_size = len(results_list)
+
+    async def worker():
+        nonlocal counter
+        for result_to_post in items:
+            values = add_tuple_to_item(result_to_post, args)
+            try:
+                await action(values)
+                counter += 1
+            except Exception as e:
+                retry_list.append(result_to_post)
+                exceptions_list.append(e)
+
+    await asyncio.gather(*[worker() for _ in range(min(max_in_flight, initial_list_size))])
+    logger.info(f'Posted {counter} results')
+    if retry_list and (len(retry_list) < initial_list_size):
+        logger.info(f'Retrying to post {len(retry_list)} results')
+        return await run_async(retry_list, action, args, max_in_flight)
+    elif retry_list and (len(retry_list) == initial_list_size):
+        logger.error(f'Exceptions do not converge. Exiting')
+        logger.exception(f'Exceptions: {exceptions_list}')
+        return retry_list
+    return []
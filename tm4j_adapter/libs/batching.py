@@ -0,0 +1,196 @@
+"""
+Module implements posting items in chunks with fallback: if chunk request fails, chunk is split in halves
+and posted again, so only failing items end up posted one by one.
+Accumulators collect items during export and post them in chunks when batch size is reached and on flush.
+Chunks that fail for a reason not depending on their items (e.g. authorization or missing endpoint) are not bisected.
+"""
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+
+def split_into_chunks(items: list, chunk_size: int) -> list:
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+# statuses of requests that fail whatever items are posted, so halves of failed chunk would fail too
+DETERMINISTIC_STATUSES = (401, 403, 404, 405)
+
+
+def error_status(error: Exception):
+    """:return: HTTP status of failed request from requests, aiohttp or TM4J exception, None if it is unknown"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'status', None)
+    if status is None:
+        match = re.match(r'Status (\d{3}) ', str(error))
+        status = int(match.group(1)) if match else None
+    return status
+
+
+def _is_bisectable(chunk: list, error: Exception) -> bool:
+    return len(chunk) > 1 and error_status(error) not in DETERMINISTIC_STATUSES
+
+
+def post_in_chunks(items: list, chunk_size: int, post_chunk: callable, post_single: callable,
+                   threads_qty: int = 1) -> list:
+    """
+    Posts items with post_chunk in chunks of chunk_size; failed chunks are bisected down to single items,
+    that are posted with post_single
+    :param post_chunk: function taking list of items
+    :param post_single: function taking single item
+    :param threads_qty: number of chunks posted concurrently
+    :return: list of items that were not posted
+    """
+    failed = list()
+    lock = threading.Lock()
+
+    def post(chunk: list):
+        try:
+            if len(chunk) == 1:
+                post_single(chunk[0])
+            else:
+                post_chunk(chunk)
+            return
+        except Exception as e:
+            logger.warning(f'Failed to post {len(chunk)} items: {e}')
+            if not _is_bisectable(chunk, e):
+                with lock:
+                    failed.extend(chunk)
+                return
+        middle = len(chunk) // 2
+        post(chunk[:middle])
+        post(chunk[middle:])
+
+    with ThreadPoolExecutor(max(1, threads_qty)) as executor:
+        list(executor.map(post, split_into_chunks(items, chunk_size)))
+    logger.info(f'Posted {len(items) - len(failed)} items in chunks of {chunk_size}')
+    return failed
+
+
+async def post_in_chunks_async(items: list, chunk_size: int, post_chunk: callable, post_single: callable) -> list:
+    """
+    Same as post_in_chunks for coroutine functions, all chunks are posted concurrently
+    :return: list of items that were not posted
+    """
+    failed = list()
+
+    async def post(chunk: list):
+        try:
+            if len(chunk) == 1:
+                await post_single(chunk[0])
+            else:
+                await post_chunk(chunk)
+            return
+        except Exception as e:
+            logger.warning(f'Failed to post {len(chunk)} items: {e}')
+            if not _is_bisectable(chunk, e):
+                failed.extend(chunk)
+                return
+        middle = len(chunk) // 2
+        await asyncio.gather(post(chunk[:middle]), post(chunk[middle:]))
+
+    await asyncio.gather(*[post(chunk) for chunk in split_into_chunks(items, chunk_size)])
+    logger.info(f'Posted {len(items) - len(failed)} items in chunks of {chunk_size}')
+    return failed
+
+
+class BulkAccumulator:
+    """
+    Thread-safe accumulator of items posted in chunks:
+        accumulator = BulkAccumulator(post_items, batch_size=100, name='Trace links')
+        accumulator.add(items)          # posts pending items when 100 of them are collected
+        accumulator.flush()             # posts the rest
+        accumulator.pop_failed()        # items that were rejected
+    Accumulator shared by several clients is made without post_items, every client passes its own one:
+        accumulator.add(items, client.post_items)
+        accumulator.flush(client.post_items)
+    """
+    def __init__(self, post_items: callable = None, batch_size: int = 100, threads_qty: int = 1,
+                 name: str = 'Items', unique: bool = False):
+        """
+        :param post_items: function taking list of items, used if add and flush get no other one
+        :param batch_size: max items per request, 1 posts every item at once
+        :param name: items name for export summary
+        :param unique: skip items added already, items should be dicts
+        """
+        self.post_items = post_items
+        self.batch_size = max(1, batch_size)
+        self.threads_qty = threads_qty
+        self.name = name
+        self.unique = unique
+        self._lock = threading.Lock()
+        self._pending = list()
+        self._seen = set()
+        self._failed = list()
+        self.posted = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _take(self, items: list, force: bool = False) -> list:
+        """adds items and returns pending ones to post if batch is full or flush is forced"""
+        with self._lock:
+            for item in items:
+                if self.unique:
+                    item_id = tuple(sorted(item.items()))
+                    if item_id in self._seen:
+                        continue
+                    self._seen.add(item_id)
+                self._pending.append(item)
+            # without flush only full batches are taken, the rest waits for next items
+            size = len(self._pending) if force else len(self._pending) // self.batch_size * self.batch_size
+            pending, self._pending = self._pending[:size], self._pending[size:]
+            return pending
+
+    def _count(self, pending: list, failed: list):
+        with self._lock:
+            self.posted += len(pending) - len(failed)
+            self.failed += len(failed)
+            self._failed.extend(failed)
+
+    def add(self, items: list, post_items: callable = None):
+        """:param post_items: posts full batches instead of post_items the accumulator is made with"""
+        self._post(self._take(items), post_items or self.post_items)
+
+    def flush(self, post_items: callable = None):
+        """:param post_items: posts pending items instead of post_items the accumulator is made with"""
+        self._post(self._take(list(), force=True), post_items or self.post_items)
+
+    def _post(self, pending: list, post_items: callable):
+        if pending:
+            failed = post_in_chunks(pending, self.batch_size, post_items, lambda item: post_items([item]),
+                                    self.threads_qty)
+            self._count(pending, failed)
+
+    def pop_failed(self) -> list:
+        """:return: items that were not posted since the last call"""
+        with self._lock:
+            failed, self._failed = self._failed, list()
+            return failed
+
+    def stats(self) -> dict:
+        """values for export summary"""
+        return {f'{self.name} posted': self.posted, f'{self.name} failed': self.failed}
+
+
+class AsyncBulkAccumulator(BulkAccumulator):
+    """
+    Same as BulkAccumulator for coroutine post_items, used by single event loop:
+        await accumulator.add_async(items)
+        await accumulator.flush_async()
+    """
+    async def add_async(self, items: list):
+        await self._post_async(self._take(items))
+
+    async def flush_async(self):
+        await self._post_async(self._take(list(), force=True))
+
+    async def _post_async(self, pending: list):
+        if pending:
+            failed = await post_in_chunks_async(pending, self.batch_size, self.post_items,
+                                                lambda item: self.post_items([item]))
+            self._count(pending, failed)
@@ -0,0 +1,164 @@
+"""
+Module implements adaptive (AIMD) limit of concurrent HTTP requests to TM4J.
+Limit grows by one per round trip while server latency stays close to the best observed one
+and is cut by backoff ratio on 429/5xx responses, connection errors or latency growth.
+"""
+import asyncio
+import threading
+import time
+from configparser import ConfigParser
+from libs.tags_parse_lib import is_true
+
+
+class AdaptiveLimiter:
+    """
+    Thread-safe AIMD limiter of in-flight requests:
+        limiter.acquire()
+        ... send request ...
+        limiter.release(latency, is_error)
+    """
+    def __init__(self,
+                 initial_limit: int,
+                 min_limit: int = 1,
+                 max_limit: int = 50,
+                 backoff_ratio: float = 0.5,
+                 latency_tolerance: float = 2.0,
+                 smoothing: float = 0.2):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio              # multiplicative decrease factor
+        self.latency_tolerance = latency_tolerance      # smoothed latency / min latency ratio to back off at
+        self.smoothing = smoothing                      # weight of the last sample in smoothed latency
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.min_latency = None
+        self.smoothed_latency = None
+        self._started = time.monotonic()
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """blocks until number of requests in flight is below current limit"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, is_error: bool = False):
+        """
+        registers finished request and adjusts the limit
+        :param latency: request duration in seconds
+        :param is_error: True for 429/5xx responses and connection errors
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._update(latency, is_error)
+            self._condition.notify_all()
+
+    def _update(self, latency: float, is_error: bool):
+        """AIMD step, must be called under lock"""
+        self.completed += 1
+        now = time.monotonic()
+        if is_error:
+            self.errors += 1
+            self._decrease(now, latency)
+            return
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        self.smoothed_latency = latency if self.smoothed_latency is None \
+            else self.smoothing * latency + (1 - self.smoothing) * self.smoothed_latency
+        if self.smoothed_latency > self.min_latency * self.latency_tolerance:
+            self._decrease(now, latency)
+        else:
+            # +1 per round trip: every request of the current window adds 1/limit
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def _decrease(self, now: float, latency: float):
+        # requests that were in flight together fail together, so back off once per round trip
+        if now - self._last_decrease > latency:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+            self._last_decrease = now
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.completed if self.completed else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """completed requests per second since limiter creation"""
+        elapsed = time.monotonic() - self._started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        """values for export summary"""
+        return {'Concurrency limit': int(self.limit),
+                'Throughput, req/s': round(self.throughput, 2),
+                'HTTP error rate': round(self.error_rate, 3)}
+
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """
+    Same AIMD limiter for coroutines running on one event loop
+        await limiter.acquire_async()
+        ... send request ...
+        await limiter.release_async(latency, is_error)
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_condition = None
+
+    def _get_async_condition(self) -> asyncio.Condition:
+        # created lazily to be bound to the running loop
+        if self._async_condition is None:
+            self._async_condition = asyncio.Condition()
+        return self._async_condition
+
+    async def acquire_async(self):
+        condition = self._get_async_condition()
+        async with condition:
+            while self.in_flight >= int(self.limit):
+                await condition.wait()
+            self.in_flight += 1
+
+    async def release_async(self, latency: float, is_error: bool = False):
+        condition = self._get_async_condition()
+        async with condition:
+            self.in_flight -= 1
+            self._update(latency, is_error)
+            condition.notify_all()
+
+
+def is_adaptive(config: ConfigParser) -> bool:
+    return is_true(config['PERFORMANCE']['adaptiveConcurrency'])
+
+
+def max_concurrency(config: ConfigParser) -> int:
+    """max number of concurrent requests: thread pool and connection pool size"""
+    if is_adaptive(config):
+        return max(int(config['PERFORMANCE']['maxConcurrency']), int(config['GENERAL']['threadsQty']))
+    return int(config['GENERAL']['threadsQty'])
+
+
+def make_limiter(config: ConfigParser, limiter_class: type = AdaptiveLimiter):
+    """creates limiter from config, GENERAL.threadsQty is used as initial limit"""
+    return limiter_class(initial_limit=int(config['GENERAL']['threadsQty']),
+                         min_limit=int(config['PERFORMANCE']['minConcurrency']),
+                         max_limit=max_concurrency(config))
+
+
+_shared_lock = threading.Lock()
+_shared_limiter = None
+
+
+def get_shared_limiter(config: ConfigParser):
+    """
+    Returns process-wide limiter shared by all TM4J instances or None if adaptive concurrency is off
+    """
+    global _shared_limiter
+    if not is_adaptive(config):
+        return None
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = make_limiter(config)
+        return _shared_limiter
@@ -1,5 +1,9 @@
 import configparser
-from libs.files import try_file_exists
+import os
+from libs.files import try_file_exists, get_full_path
+
+DEFAULT_CONFIG_PATH = get_full_path('parseconfig.ini', use_relative_path=True)
+OPTIONAL_SECTIONS = ('PERFORMANCE',)
 
 
 def read_config(config_path: str = None) -> configparser.ConfigParser:
@@ -9,21 +13,41 @@ def read_config(config_path: str = None) -> configparser.ConfigParser:
     if not _is_config_consistent(config_path):
         config_path = 'parseconfig.ini'
     c_config = configparser.ConfigParser()
+    _read_optional_defaults(c_config)
     c_config.read(config_path)
+    _anchor_cache_path(c_config, config_path)
     return c_config
 
 
+def _read_optional_defaults(c_config: configparser.ConfigParser):
+    """options of optional sections missing in config take values of default 'parseconfig.ini' of the adapter"""
+    default_config = configparser.ConfigParser()
+    default_config.read(DEFAULT_CONFIG_PATH)
+    for section in OPTIONAL_SECTIONS:
+        if default_config.has_section(section):
+            c_config[section] = default_config[section]
+
+
+def _anchor_cache_path(c_config: configparser.ConfigParser, config_path: str):
+    """relative cache path is kept next to config file, so runs from different directories share the cache"""
+    cache_path = c_config.get('PERFORMANCE', 'cachePath', fallback='')
+    if cache_path and not os.path.isabs(cache_path):
+        c_config['PERFORMANCE']['cachePath'] = os.path.join(os.path.dirname(os.path.abspath(config_path)), cache_path)
+
+
 def _is_config_consistent(config_path: str) -> bool:
     """
     Function checks if provided config has the same structure as 'parseconfig.ini' file
     :param config_path: path to config to check
-    :return: True if config has all the sections and options as default
+    :return: True if config has all the sections and options as default, except optional sections
     """
     default_config = configparser.ConfigParser()
     custom_config = configparser.ConfigParser()
-    default_config.read('parseconfig.ini')
+    default_config.read(DEFAULT_CONFIG_PATH)
     custom_config.read(config_path)
     for section in default_config.sections():
+        if section in OPTIONAL_SECTIONS:
+            continue
         for option in default_config[section]:
             if not custom_config.has_option(section, option):
                 raise ValueError(f'Your config file is missing for {section}.{option} option')
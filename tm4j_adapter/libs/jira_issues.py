@@ -0,0 +1,103 @@
+"""
+Module implements resolution of Jira issue keys to internal ids with few JQL searches instead of one
+issue request per key. Resolved ids and keys that are not found are cached in memory for all threads
+and in persistent cache between runs.
+"""
+import threading
+from configparser import ConfigParser
+from libs.batching import split_into_chunks
+from libs.persistent_cache import PersistentCache, JIRA_ISSUE_ID
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+
+def issues_query(keys: list) -> str:
+    return f'key in ({", ".join(keys)})'
+
+
+class JiraIssueResolver:
+    """
+    Thread-safe resolver of Jira issue ids:
+        resolver = JiraIssueResolver(search_issues, batch_size=50)
+        resolver.resolve(['JQA-1', 'JQA-2'])       # {'JQA-1': '10001', 'JQA-2': None} with one search
+    search_issues(jql, start_at, max_results) returns Jira search response with issues and total.
+    """
+    def __init__(self, search_issues: callable, batch_size: int = 50, cache: PersistentCache = None):
+        """
+        :param batch_size: max issue keys per search request
+        :param cache: persistent cache to keep ids between runs, None keeps them in memory only
+        """
+        self.search_issues = search_issues
+        self.batch_size = max(1, batch_size)
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._ids = dict()                  # key -> id, None if issue is not found
+
+    def _known(self, keys: list) -> list:
+        """:return: keys that are not resolved yet, resolving those that are in persistent cache"""
+        unknown = list()
+        for key in dict.fromkeys(keys):
+            if key in self._ids:
+                continue
+            cached = self._cache.get(JIRA_ISSUE_ID, key) if self._cache else None
+            if cached is None:
+                unknown.append(key)
+            else:
+                self._ids[key] = cached['id']
+        return unknown
+
+    def _store(self, keys: list, issues: list):
+        found = {issue['key']: issue['id'] for issue in issues}
+        for key in keys:
+            self._ids[key] = found.get(key)
+            if self._cache:
+                self._cache.set(JIRA_ISSUE_ID, key, {'id': self._ids[key]})
+            if self._ids[key] is None:
+                logger.warning(f'Jira issue {key} is not found')
+
+    def resolve(self, keys: list) -> dict:
+        """:return: dict of issue ids by keys, None for issues that are not found"""
+        with self._lock:
+            for chunk in split_into_chunks(self._known(keys), self.batch_size):
+                issues = list()
+                while True:
+                    response = self.search_issues(issues_query(chunk), len(issues), self.batch_size)
+                    issues.extend(response.get('issues', []))
+                    if not response.get('issues') or len(issues) >= response.get('total', 0):
+                        break
+                self._store(chunk, issues)
+            return {key: self._ids.get(key) for key in keys}
+
+    async def resolve_async(self, keys: list) -> dict:
+        """same as resolve for coroutine search_issues, used by single event loop"""
+        for chunk in split_into_chunks(self._known(keys), self.batch_size):
+            issues = list()
+            while True:
+                response = await self.search_issues(issues_query(chunk), len(issues), self.batch_size)
+                issues.extend(response.get('issues', []))
+                if not response.get('issues') or len(issues) >= response.get('total', 0):
+                    break
+            self._store(chunk, issues)
+        return {key: self._ids.get(key) for key in keys}
+
+
+def issue_batch_size(config: ConfigParser) -> int:
+    return int(config['PERFORMANCE']['issueBatchSize'])
+
+
+_shared_lock = threading.Lock()
+_shared_resolvers = dict()
+
+
+def get_shared_issue_resolver(config: ConfigParser, search_issues: callable,
+                              cache: PersistentCache = None) -> JiraIssueResolver:
+    """
+    Returns process-wide resolver of Jira url from config,
+    search_issues of the first caller is used for all searches
+    """
+    url = config['GENERAL']['tm4jUrl']
+    with _shared_lock:
+        if url not in _shared_resolvers:
+            _shared_resolvers[url] = JiraIssueResolver(search_issues, issue_batch_size(config), cache)
+        return _shared_resolvers[url]
@@ -8,8 +8,8 @@ from libs.tm_log import get_logger
 logger = get_logger(__name__)
 
 
-def run_threaded(results_list: list, action: callable, args) -> list:
-    threads_qty = int(gen_config['threadsQty'])
+def run_threaded(results_list: list, action: callable, args, threads_qty: int = None) -> list:
+    threads_qty = threads_qty if threads_qty else int(gen_config['threadsQty'])
     retry_list = list()
     exceptions_list = list()
     future_to_post = {}
@@ -29,7 +29,7 @@ def run_threaded(results_list: list, action: callable, args) -> list:
     logger.info(f'Posted {counter} results')
     if retry_list and (len(retry_list) < initial_list_size):
         logger.info(f'Retrying to post {len(retry_list)} results')
-        run_threaded(retry_list, action, args)
+        return run_threaded(retry_list, action, args, threads_qty)
     elif retry_list and (len(retry_list) == initial_list_size):
         logger.error(f'Exceptions do not converge. Exiting')
         logger.exception(f'Exceptions: {exceptions_list}')
@@ -0,0 +1,34 @@
+"""
+Module implements parse stage reading files in process pool, so parsing of big file sets (e.g. thousands
+of .feature files) uses all CPU cores. File readers should be module-level functions returning picklable records.
+Small file sets are read in current process, since starting processes costs more than it saves.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+MIN_FILES_PER_PROCESS = 20
+
+
+def parse_processes(config: ConfigParser) -> int:
+    """number of processes from config, 0 means number of CPU cores"""
+    processes = int(config['PERFORMANCE']['parseProcesses'])
+    return processes if processes > 0 else os.cpu_count() or 1
+
+
+def read_files_parallel(read_file: callable, files: list, processes: int) -> list:
+    """
+    Reads files with read_file in process pool, at least MIN_FILES_PER_PROCESS files per process
+    :param read_file: module-level function taking file path, or functools.partial of it
+    :param processes: max number of processes, 1 reads files in current process
+    :return: list of read_file results in the same order as files
+    """
+    processes = min(processes, len(files) // MIN_FILES_PER_PROCESS)
+    if processes <= 1:
+        return [read_file(file) for file in files]
+    logger.info(f'Reading {len(files)} files in {processes} processes')
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(read_file, files, chunksize=max(1, len(files) // (processes * 4))))
@@ -0,0 +1,119 @@
+"""
+Module implements persistent cache of TM4J lookups (testcase name -> key -> data,
+testcase/testrun/issue key -> internal id) kept in SQLite database between runs. Database is opened in WAL mode
+with busy timeout, so parallel jobs sharing the workspace can read and write it concurrently.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from configparser import ConfigParser
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+TESTCASE_KEY = 'testcase_key'           # testcase name and folder -> key
+TESTCASE = 'testcase'                   # testcase key -> testcase data
+TESTCASE_ID = 'testcase_id'             # testcase key -> internal id
+TESTRUN_ID = 'testrun_id'               # testrun key -> internal id
+TESTCASE_FINGERPRINT = 'testcase_fp'    # testcase key or name and folder -> fingerprint of synced values and key
+JIRA_ISSUE_ID = 'jira_issue_id'         # Jira issue key -> internal id, None if issue is not found
+
+
+def testcase_name_key(name: str, folder: str) -> str:
+    folder = f"/{folder.strip('/')}" if folder else ''
+    return f'{folder}|{name}'
+
+
+def fingerprint(*values) -> str:
+    """stable hash of json serializable values"""
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class PersistentCache:
+    """
+    Key-value cache with TTL. Entries are scoped by TM4J url and project, every thread uses its own connection.
+        cache.get(TESTCASE_ID, 'CST-T1')
+        cache.set(TESTCASE_ID, 'CST-T1', 1234)
+        cache.invalidate(TESTCASE_ID, 'CST-T1')
+    """
+    def __init__(self, path: str, ttl: float, scope: str):
+        self.path = path
+        self.ttl = ttl
+        self.scope = scope
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS entries (scope TEXT, kind TEXT, key TEXT, '
+                               'value TEXT, updated REAL, PRIMARY KEY (scope, kind, key))')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, kind: str, key: str):
+        """:return: cached value or None if it is absent or expired"""
+        try:
+            row = self._connection().execute('SELECT value FROM entries WHERE scope=? AND kind=? AND key=? '
+                                             'AND updated>?', (self.scope, kind, key, time.time() - self.ttl)
+                                             ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f'Cache read failed: {e}')
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, kind: str, key: str, value):
+        try:
+            with self._connection() as connection:
+                connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                                   (self.scope, kind, key, json.dumps(value), time.time()))
+        except sqlite3.Error as e:
+            logger.warning(f'Cache write failed: {e}')
+
+    def invalidate(self, kind: str, key: str):
+        try:
+            with self._connection() as connection:
+                connection.execute('DELETE FROM entries WHERE scope=? AND kind=? AND key=?', (self.scope, kind, key))
+        except sqlite3.Error as e:
+            logger.warning(f'Cache write failed: {e}')
+
+    def stats(self) -> dict:
+        """values for export summary"""
+        return {'Cache hits': self.hits, 'Cache misses': self.misses}
+
+
+_shared_lock = threading.Lock()
+_shared_caches = dict()
+
+
+def get_shared_cache(config: ConfigParser):
+    """
+    Returns process-wide cache for TM4J url and project from config or None if cache is turned off
+    """
+    path = config['PERFORMANCE']['cachePath']
+    if not path:
+        return None
+    scope = f"{config['GENERAL']['tm4jUrl']}|{config['GENERAL']['tm4jProjectKey']}"
+    with _shared_lock:
+        if (path, scope) not in _shared_caches:
+            try:
+                _shared_caches[(path, scope)] = PersistentCache(path,
+                                                                float(config['PERFORMANCE']['cacheTtlHours']) * 3600,
+                                                                scope)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f'Cannot open cache {path}, working without it: {e}')
+                _shared_caches[(path, scope)] = None
+        return _shared_caches[(path, scope)]
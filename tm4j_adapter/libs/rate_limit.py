@@ -0,0 +1,110 @@
+"""
+Module implements token bucket limiting request rate to TM4J server.
+Bucket state can be kept in a file in temp dir, so all adapter processes on the host that talk to
+the same server share one bucket and their combined rate stays under the configured limit.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from configparser import ConfigParser
+from urllib.parse import urlparse
+from libs.tags_parse_lib import is_true
+from libs.tm_log import get_logger
+
+try:
+    import fcntl
+except ImportError:     # Windows: bucket is shared between threads of one process only
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Caller reserves a token and waits until it becomes available:
+        time.sleep(bucket.reserve())
+    Reservations may take bucket below zero, so waiting callers are served in order without polling.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+
+    def _take(self, tokens: float, updated: float) -> tuple:
+        """refills bucket since last update and takes one token
+        :return: new tokens value, new update time, delay before the token can be used"""
+        now = time.time()
+        tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate) - 1
+        return tokens, now, max(0.0, -tokens / self.rate)
+
+    def reserve(self) -> float:
+        """takes one token, returns delay in seconds before request can be sent"""
+        with self._lock:
+            self._tokens, self._updated, delay = self._take(self._tokens, self._updated)
+        return delay
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket with state stored in file and guarded by exclusive file lock"""
+    _state = struct.Struct('dd')
+
+    def __init__(self, rate: float, burst: int, file_path: str):
+        super().__init__(rate, burst)
+        self.file_path = file_path
+
+    def reserve(self) -> float:
+        with self._lock:
+            fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                data = os.read(fd, self._state.size)
+                tokens, updated = self._state.unpack(data) if len(data) == self._state.size \
+                    else (float(self.burst), time.time())
+                tokens, updated, delay = self._take(tokens, updated)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self._state.pack(tokens, updated))
+            finally:
+                os.close(fd)    # closing descriptor releases the lock
+        return delay
+
+
+def _bucket_file_path(config: ConfigParser) -> str:
+    """one bucket file per TM4J server"""
+    host = urlparse(config['GENERAL']['tm4jUrl']).netloc
+    return os.path.join(tempfile.gettempdir(), f'tm4j_adapter_{hashlib.md5(host.encode()).hexdigest()}.bucket')
+
+
+def make_rate_limiter(config: ConfigParser):
+    """creates token bucket from config or returns None if rate limit is off"""
+    rate = float(config['PERFORMANCE']['rateLimit'])
+    if rate <= 0:
+        return None
+    burst = int(config['PERFORMANCE']['rateBurst'])
+    if is_true(config['PERFORMANCE']['rateLimitShared']):
+        if fcntl:
+            return FileTokenBucket(rate, burst, _bucket_file_path(config))
+        logger.warning('File locks are not supported on this platform, rate limit is applied per process')
+    return TokenBucket(rate, burst)
+
+
+_shared_lock = threading.Lock()
+_shared_rate_limiter = None
+
+
+def get_shared_rate_limiter(config: ConfigParser):
+    """Returns process-wide token bucket shared by all TM4J instances or None if rate limit is off"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = make_rate_limiter(config)
+        return _shared_rate_limiter
@@ -0,0 +1,113 @@
+"""
+Module implements retry policy of HTTP requests to TM4J: every error class has its own retry budget,
+delay between attempts grows exponentially with full jitter, server Retry-After header is honoured.
+Non-idempotent requests (POST) are retried only when server explicitly refused to process them (429).
+"""
+import random
+import threading
+import time
+from configparser import ConfigParser
+from email.utils import parsedate_to_datetime
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+CONNECTION = 'connection'   # connection reset, refused or timed out
+THROTTLED = 'throttled'     # 429 Too Many Requests
+SERVER = 'server'           # 500, 502, 503, 504
+EMPTY = 'empty'             # empty body when response is expected
+
+
+def classify_status(status_code: int):
+    """returns error class of retryable HTTP status or None"""
+    if status_code == 429:
+        return THROTTLED
+    if status_code in (500, 502, 503, 504):
+        return SERVER
+    return None
+
+
+def parse_retry_after(value: str):
+    """
+    Retry-After header may hold either delay in seconds or HTTP date
+    :return: delay in seconds or None if header is absent or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether failed attempt should be repeated and how long to wait before it:
+        attempts = dict()
+        delay = policy.next_delay('GET', SERVER, attempts, retry_after)
+        if delay is None: give up
+    """
+    def __init__(self, budgets: dict, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.budgets = budgets
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> 'RetryPolicy':
+        prf = config['PERFORMANCE']
+        return cls(budgets={CONNECTION: int(prf['retryConnectionErrors']),
+                            THROTTLED: int(prf['retryThrottled']),
+                            SERVER: int(prf['retryServerErrors']),
+                            EMPTY: 2},
+                   base_delay=float(prf['retryBaseDelay']),
+                   max_delay=float(prf['retryMaxDelay']))
+
+    def is_retryable(self, method: str, error_class: str) -> bool:
+        # 429 means request was not processed, everything else may have been applied already
+        return error_class == THROTTLED or method.upper() in IDEMPOTENT_METHODS
+
+    def next_delay(self, method: str, error_class: str, attempts: dict, retry_after: float = None):
+        """
+        Registers failed attempt of error_class in attempts
+        :return: delay in seconds before next attempt or None if request should not be retried
+        """
+        if not self.is_retryable(method, error_class):
+            return None
+        used = attempts.get(error_class, 0)
+        if used >= self.budgets.get(error_class, 0):
+            return None
+        attempts[error_class] = used + 1
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # full jitter: uniform delay up to exponentially growing cap
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** sum(attempts.values())))
+
+
+class RetryStats:
+    """Thread-safe counter of attempts every request took"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.attempts = 0
+        self.max_attempts = 0
+
+    def register(self, attempts: int):
+        with self._lock:
+            self.requests += 1
+            self.attempts += attempts
+            self.retried += 1 if attempts > 1 else 0
+            self.max_attempts = max(self.max_attempts, attempts)
+
+    def stats(self) -> dict:
+        """values for export summary"""
+        return {'HTTP requests': self.requests,
+                'HTTP retries': self.attempts - self.requests,
+                'Retried requests': self.retried,
+                'Max attempts per request': self.max_attempts}
+
+
+retry_stats = RetryStats()
@@ -0,0 +1,75 @@
+"""
+Module implements single-flight coalescing: concurrent identical calls share one execution and its result.
+Used for TM4J lookups (testcase/testcycle search, internal ids, testrun items) that parallel workers
+send at the same moment for the same testcase or testcycle.
+"""
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Thread-safe: the first caller for the key executes function, others wait for it and get its result
+    (or its exception). Every caller gets its own deep copy of the result, so it can be changed safely.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+        self.coalesced = 0
+
+    def do(self, key, function: callable):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if is_leader:
+            try:
+                call.result = function()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+
+class AsyncSingleFlight:
+    """Same coalescing for coroutines running on one event loop"""
+    def __init__(self):
+        self._calls = dict()
+        self.coalesced = 0
+
+    async def do(self, key, coroutine_function: callable):
+        future = self._calls.get(key)
+        if future is None:
+            future = self._calls[key] = asyncio.get_event_loop().create_future()
+            try:
+                future.set_result(await coroutine_function())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                del self._calls[key]
+                if not future.done():   # leader was cancelled
+                    future.cancel()
+        else:
+            self.coalesced += 1
+        return copy.deepcopy(await future)
+
+
+single_flight = SingleFlight()
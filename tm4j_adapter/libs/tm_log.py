@@ -54,6 +54,10 @@ def get_logger(name, config=None) -> logging.Logger:
     :param config:
     :return:
     """
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        # logger is already configured, new handlers would duplicate every record
+        return logger
     l_log_config = config['LOGGING'] if config else log_config
     project = config['GENERAL']['tm4jProjectKey'] if config else gen_config['tm4jProjectKey']
     reporter = config['EXECUTION']['reporter'] if config else exc_config['reporter']
@@ -80,7 +84,6 @@ def get_logger(name, config=None) -> logging.Logger:
     splunk_handler.setFormatter(splunk_formatter)
     splunk_handler.setLevel(logging.INFO)
 
-    logger = logging.getLogger(name)
     logger.addHandler(console_handler)
     logger.addHandler(error_log_handler)
     logger.addHandler(splunk_handler)
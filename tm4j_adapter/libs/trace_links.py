@@ -0,0 +1,64 @@
+"""
+Module implements accumulation of trace links (testcase web links, testcycle Jira links), so they are created
+with few tracelink/bulk/create requests instead of one request per testcase.
+Links are posted when batch size is reached and on flush, e.g. at the end of export.
+"""
+import atexit
+import threading
+from configparser import ConfigParser
+from libs.batching import BulkAccumulator, AsyncBulkAccumulator
+from libs.tm_log import get_logger
+
+logger = get_logger(__name__)
+
+
+class TraceLinkAccumulator(BulkAccumulator):
+    """
+    Thread-safe accumulator of trace links payloads:
+        links = TraceLinkAccumulator(post_links, batch_size=100)
+        links.add([{'testCaseId': 1, 'url': '...', 'typeId': 1}])    # posted when 100 links are collected
+        links.flush()                                               # posts the rest
+    Failed batches are bisected, so only rejected links (e.g. duplicates) are lost.
+    """
+    def __init__(self, post_links: callable = None, batch_size: int = 100, threads_qty: int = 1):
+        """
+        :param post_links: function taking list of links payloads, shared accumulator gets it on add and flush
+        :param batch_size: max links per request, 1 posts every link at once
+        """
+        super().__init__(post_links, batch_size, threads_qty, name='Trace links', unique=True)
+
+
+class AsyncTraceLinkAccumulator(AsyncBulkAccumulator):
+    """Same as TraceLinkAccumulator for coroutine post_links"""
+    def __init__(self, post_links: callable, batch_size: int = 100):
+        super().__init__(post_links, batch_size, name='Trace links', unique=True)
+
+
+def link_batch_size(config: ConfigParser) -> int:
+    return int(config['PERFORMANCE']['linkBatchSize'])
+
+
+_shared_lock = threading.Lock()
+_shared_accumulators = dict()
+
+
+def get_shared_link_accumulator(config: ConfigParser) -> TraceLinkAccumulator:
+    """
+    Returns process-wide accumulator of TM4J url and user from config. It has no post_links:
+    links are posted by the client that adds or flushes them, see BulkAccumulator
+    """
+    client = (config['GENERAL']['tm4jUrl'], config['GENERAL']['tm4jLogin'])
+    with _shared_lock:
+        if client not in _shared_accumulators:
+            _shared_accumulators[client] = TraceLinkAccumulator(None, link_batch_size(config),
+                                                                int(config['GENERAL']['threadsQty']))
+        return _shared_accumulators[client]
+
+
+@atexit.register
+def warn_about_unflushed_links():
+    """links are not posted at exit, where session and logging may be torn down already, they are only reported"""
+    with _shared_lock:
+        unflushed = sum(len(accumulator) for accumulator in _shared_accumulators.values())
+    if unflushed:
+        logger.warning(f'{unflushed} trace links were not posted: export ended without flush_trace_links')
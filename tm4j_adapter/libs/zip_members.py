@@ -0,0 +1,52 @@
+"""
+Module implements reading attachments straight from zip archives, e.g. Rocs logs from artifacts.zip,
+so they are not extracted to disk. Every archive is opened once per process and its members are read
+when attachments are uploaded; zipfile allows concurrent reads of one archive from several threads.
+"""
+import threading
+from os import path
+from typing import NamedTuple
+from zipfile import ZipFile
+
+
+class ZipMember(NamedTuple):
+    """file in zip archive, used instead of attachment file path"""
+    archive: str                            # path to zip archive
+    name: str                               # member name in archive
+
+    def __str__(self):
+        return f'{self.archive}:{self.name}'
+
+
+_archives_lock = threading.Lock()
+_archives = dict()
+
+
+def _get_archive(archive: str) -> ZipFile:
+    with _archives_lock:
+        if archive not in _archives:
+            _archives[archive] = ZipFile(archive, 'r')
+        return _archives[archive]
+
+
+def open_attachment(file_path):
+    """
+    :param file_path: attachment file path or ZipMember
+    :return: binary file object, member of zip archive is decompressed while it is read
+    """
+    if isinstance(file_path, ZipMember):
+        return _get_archive(file_path.archive).open(file_path.name)
+    return open(file_path, 'rb')
+
+
+def attachment_name(file_path) -> str:
+    """:return: file name of attachment file path or ZipMember"""
+    return path.basename(file_path.name if isinstance(file_path, ZipMember) else file_path)
+
+
+def close_archives():
+    """closes archives opened to read attachments"""
+    with _archives_lock:
+        for archive in _archives.values():
+            archive.close()
+        _archives.clear()
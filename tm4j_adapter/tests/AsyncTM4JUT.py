@@ -0,0 +1,88 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+from classes.AsyncTM4J import AsyncTM4J
+from classes.DataStructures import TestCaseHandle, TestCycleHandle, TestResultHandle
+from tests.TestData.FakeApi import FakeApi, PROJECT, write_config, reset_shared_state
+
+TESTCASE = {'key': 'CST-T1', 'name': 'login', 'folder': '/Auto',
+            'testScript': {'type': 'STEP_BY_STEP', 'steps': [{'description': 'open'}, {'description': 'check'}]}}
+TESTRUN = {'key': 'CST-R1', 'name': 'nightly', 'folder': '/Runs'}
+
+
+class AsyncTM4JTests(unittest.TestCase):
+
+    def setUp(self):
+        reset_shared_state()
+        self.directory = tempfile.TemporaryDirectory()
+        self.config_path = write_config(os.path.join(self.directory.name, 'parseconfig.ini'))
+        self.api = FakeApi([('GET', r'/project$', PROJECT),
+                            ('GET', r'/testcase/search\?.*name = "login"', [TESTCASE]),
+                            ('GET', r'/testcase/search\?', []),
+                            ('GET', r'/testcase/CST-T1\?fields=id', {'id': 101}),
+                            ('GET', r'/testrun/search\?.* key = "CST-R1"', [TESTRUN]),
+                            ('GET', r'/testrun/CST-R1\?fields=id', {'id': 201}),
+                            ('GET', r'/environments\?projectKey=CST', [{'name': 'QA'}]),
+                            ('POST', r'/testrun/CST-R1/testcase/CST-T1/testresult$', {'id': 301})])
+        patches = [patch('aiohttp.ClientSession', side_effect=self.api.session),
+                   patch('aiohttp.TCPConnector', Mock())]
+        for session_patch in patches:
+            session_patch.start()
+            self.addCleanup(session_patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_with_client(self, coroutine_function):
+        async def run():
+            async with AsyncTM4J(self.config_path) as atm:
+                return atm, await coroutine_function(atm)
+        return asyncio.run(run())
+
+    def test_handles_are_returned(self):
+        async def export(atm):
+            testcase = await atm.get_testcase(name='login')
+            testcycle = await atm.get_testcycle(key='CST-R1')
+            test_result = await atm.create_test_result(testcase, testcycle, 'Pass', 'qa', 'robot')
+            return testcase, testcycle, test_result
+
+        atm, (testcase, testcycle, test_result) = self.run_with_client(export)
+        self.assertEqual(TestCaseHandle(key='CST-T1', name='login', folder='/Auto', internal_id=101, data=TESTCASE),
+                         testcase)
+        self.assertEqual(TestCycleHandle(key='CST-R1', name='nightly', internal_id=201, data=TESTRUN), testcycle)
+        self.assertEqual(TestResultHandle(id=301, testcase_key='CST-T1', testcycle_key='CST-R1'), test_result)
+        posted = self.api.requests[-1][2]
+        self.assertEqual('QA', posted['environment'])
+        self.assertEqual(['Pass', 'Pass'], [step['status'] for step in posted['scriptResults']])
+        self.assertIsNone(atm._session)
+
+    def test_concurrent_searches_share_one_session_and_request(self):
+        async def export(atm):
+            return await asyncio.gather(*[atm.get_testcase(name='login') for _ in range(20)])
+
+        _, testcases = self.run_with_client(export)
+        self.assertEqual({'CST-T1'}, {testcase.key for testcase in testcases})
+        self.assertEqual(1, self.api.count('GET', r'/project$'))
+        self.assertEqual(1, self.api.count('GET', r'/testcase/search'))
+        self.assertEqual(1, self.api.count('GET', r'/testcase/CST-T1\?fields=id'))
+
+    def test_missing_testcase_is_not_created_if_autocreate_is_off(self):
+        from classes.Exceptions import TM4JObjectNotFound
+        with self.assertRaises(TM4JObjectNotFound):
+            self.run_with_client(lambda atm: atm.get_testcase(name='logout'))
+        self.assertEqual(0, self.api.count('POST'))
+
+    def test_warm_cache_answers_lookup_without_requests(self):
+        self.config_path = write_config(self.config_path, cachePath=os.path.join(self.directory.name, 'cache.sqlite'))
+        self.run_with_client(lambda atm: atm.get_testcase(name='login'))
+        reset_shared_state()
+        requests = len(self.api.requests)
+        _, testcase = self.run_with_client(lambda atm: atm.get_testcase(name='login'))
+        self.assertEqual(('CST-T1', 101, TESTCASE), (testcase.key, testcase.internal_id, testcase.data))
+        self.assertEqual(['/project'], [url[-8:] for _, url, _ in self.api.requests[requests:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from libs.batching import post_in_chunks, BulkAccumulator
+
+
+class BatchingTests(unittest.TestCase):
+
+    def test_failed_chunk_is_bisected(self):
+        chunks = list()
+        singles = list()
+
+        def post_chunk(chunk):
+            if 13 in chunk:
+                raise ValueError('rejected')
+            chunks.append(chunk)
+
+        def post_single(item):
+            if item == 13:
+                raise ValueError('rejected')
+            singles.append(item)
+
+        failed = post_in_chunks(list(range(40)), 10, post_chunk, post_single, threads_qty=2)
+        self.assertEqual([13], failed)
+        self.assertEqual(39, sum(len(chunk) for chunk in chunks) + len(singles))
+        self.assertEqual([list(range(10)), list(range(20, 30)), list(range(30, 40))],
+                         sorted(chunk for chunk in chunks if len(chunk) == 10))
+        self.assertLessEqual(len(singles), 2)
+
+    def test_chunk_failed_for_deterministic_reason_is_not_bisected(self):
+        requests = list()
+
+        def post_chunk(chunk):
+            requests.append(chunk)
+            raise Exception('Status 403 for URL http://tm4j/rest/tests/1.0/tracelink/bulk/create')
+
+        failed = post_in_chunks(list(range(8)), 4, post_chunk, post_chunk)
+        self.assertEqual(list(range(8)), sorted(failed))
+        self.assertEqual(2, len(requests))
+
+    def test_accumulator_posts_full_batches_and_returns_failed(self):
+        requests = list()
+
+        def post_items(items):
+            if ('tce3', 2) in items:
+                raise ValueError('rejected')
+            requests.append(items)
+
+        accumulator = BulkAccumulator(post_items, batch_size=5)
+        for tce in range(4):
+            accumulator.add([(f'tce{tce}', step) for step in range(3)])
+        self.assertEqual([5, 5], [len(request) for request in requests])
+        self.assertEqual(2, len(accumulator))
+        accumulator.flush()
+        self.assertEqual([('tce3', 2)], accumulator.pop_failed())
+        self.assertEqual([], accumulator.pop_failed())
+        self.assertEqual({'Items posted': 11, 'Items failed': 1}, accumulator.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -123,7 +123,8 @@ class FeatureFileUpdate(BddParse):
         self.assertTrue(cmp(self.before_feature, self.after_feature))
 
     def test_every_feature_test_updated_with_keys(self):
-        expected_export_results = {'Files read': 3, 'Results found': 1, 'Exported': 1, 'Failed': 0}
+        expected_export_results = {'Files read': 3, 'Results found': 1, 'Exported': 1, 'Failed': 0,
+                                   'Calls per testcase': 0.0}
         with patch('classes.tmconnect.TM4J', new=mocked_tm4j) as patched_tm4j:
             self.bdd_parser.tm = patched_tm4j
             self.bdd_parser.do_export_results()
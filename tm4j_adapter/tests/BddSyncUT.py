@@ -0,0 +1,100 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import bdd_parser
+from classes.BddParser import BddParser
+from tests.TestData.FakeApi import FakeApi, write_config, reset_shared_state, project_routes, number_in
+
+FEATURE = """Feature: Gallery filters
+  Scenario: User opens gallery
+    Given I access "gallery" api as "doctor"
+    Then It has action "filters"
+
+  Scenario Outline: User filters gallery
+    Given I access "gallery" api as "<user>"
+    Then It has action "<action>"
+    Examples: users
+      | user   | action  |
+      | doctor | filters |
+      | nurse  | search  |
+"""
+KEYS = {'User opens gallery': 'CST-T51', 'User filters gallery': 'CST-T52'}
+
+
+class BddSyncTests(unittest.TestCase):
+
+    def setUp(self):
+        reset_shared_state()
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, 'features'))
+        self.feature_path = os.path.join(self.directory.name, 'features', 'gallery.feature')
+        with open(self.feature_path, 'w') as file:
+            file.write(FEATURE)
+        self.config_path = write_config(os.path.join(self.directory.name, 'parseconfig.ini'))
+        self.set_bdd_config(localRepoRoot=self.directory.name, featuresFolderInLocalRepository='features',
+                            repoLink='http://git/repo', diffTestsUpdate='False', copyFolderStructure='False')
+        self.links = list()
+        self.api = FakeApi([('POST', r'/atm/1.0/testcase$', lambda url, payload: {'key': KEYS[payload['name']]}),
+                            ('PUT', r'/tests/1.0/testcase/\d+$', ''),
+                            ('POST', r'/tracelink/bulk/create$',
+                             lambda url, payload: self.links.extend(payload) or ''),
+                            ('GET', r'/testcase/CST-T\d+\?fields=id,projectId,traceLinks', self.remote_links)] +
+                           project_routes())
+        api_patch = self.api.patch_tm4j()
+        api_patch.start()
+        self.addCleanup(api_patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def set_bdd_config(self, **options):
+        config = ConfigParser()
+        config.read(self.config_path)
+        config['BDD'].update(options)
+        with open(self.config_path, 'w') as file:
+            config.write(file)
+
+    def remote_links(self, url: str, payload) -> dict:
+        internal_id = 100 + number_in(r'CST-T(\d+)', url)
+        return {'id': internal_id, 'traceLinks': [link for link in self.links if link['testCaseId'] == internal_id]}
+
+    def test_plan_is_applied_once(self):
+        parser = BddParser(self.config_path)
+        parser.read_files([self.feature_path])
+        plan = parser.plan()
+        self.assertEqual((2, 0, 0), (len(plan.creates), len(plan.updates), len(plan.links)))
+        self.assertEqual([], parser.apply(plan))
+        self.assertEqual(2, self.api.count('POST', r'/atm/1.0/testcase$'))
+        self.assertEqual(1, self.api.count('PUT', r'/tests/1.0/testcase/\d+$'))
+        self.assertEqual(1, self.api.count('POST', r'/tracelink/bulk/create$'))
+        self.assertEqual({'http://git/repo/gallery.feature'}, {link['url'] for link in self.links})
+        with open(self.feature_path) as file:
+            feature = file.read()
+        self.assertIn('Scenario: CST-T51_User opens gallery', feature)
+        self.assertIn('Scenario Outline: CST-T52_User filters gallery', feature)
+
+        # testcases are up to date and have links, so only links are checked
+        requests = len(self.api.requests)
+        plan = parser.plan()
+        self.assertEqual((0, 0, 2), (len(plan.creates), len(plan.updates), len(plan.links)))
+        self.assertEqual([], parser.apply(plan))
+        self.assertEqual({'GET'}, {method for method, _, _ in self.api.requests[requests:]})
+        self.assertEqual(2, len(self.links))
+
+    def test_plan_option_does_not_export(self):
+        output = io.StringIO()
+        with patch.object(sys, 'argv', ['bdd_parser.py', '--plan', '-c', self.config_path]), redirect_stdout(output):
+            bdd_parser.main()
+        self.assertIn('testcases to create: 2', output.getvalue())
+        self.assertEqual({'GET'}, {method for method, _, _ in self.api.requests})
+        with open(self.feature_path) as file:
+            self.assertEqual(FEATURE, file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
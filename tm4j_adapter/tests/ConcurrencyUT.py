@@ -0,0 +1,38 @@
+import unittest
+from libs.concurrency import AdaptiveLimiter, max_concurrency, get_shared_limiter
+from libs.config import read_config, DEFAULT_CONFIG_PATH
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+
+    def test_limit_grows_while_latency_is_stable(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.1)
+        self.assertEqual(4, int(limiter.limit))
+
+    def test_limit_backs_off_on_error(self):
+        limiter = AdaptiveLimiter(initial_limit=8)
+        limiter.acquire()
+        limiter.release(0.1, is_error=True)
+        self.assertEqual(4, int(limiter.limit))
+        self.assertEqual(1.0, limiter.error_rate)
+
+    def test_limit_backs_off_once_per_round_trip(self):
+        limiter = AdaptiveLimiter(initial_limit=8, min_limit=2)
+        limiter.release(0.1)
+        for _ in range(10):
+            limiter.release(1.0)
+        self.assertEqual(4, int(limiter.limit))
+
+    def test_threads_qty_is_kept_by_default(self):
+        config = read_config(DEFAULT_CONFIG_PATH)
+        self.assertEqual(int(config['GENERAL']['threadsQty']), max_concurrency(config))
+        self.assertIsNone(get_shared_limiter(config))
+        config['PERFORMANCE']['adaptiveConcurrency'] = 'True'
+        self.assertEqual(int(config['PERFORMANCE']['maxConcurrency']), max_concurrency(config))
+
+
+if __name__ == '__main__':
+    unittest.main()
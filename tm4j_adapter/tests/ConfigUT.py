@@ -0,0 +1,46 @@
+import configparser
+import os
+import tempfile
+import unittest
+from libs.config import read_config, DEFAULT_CONFIG_PATH
+
+
+class ReadConfigTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.directory.name, 'parseconfig.ini')
+        self.config = configparser.ConfigParser()
+        self.config.read(DEFAULT_CONFIG_PATH)
+        self.config.remove_section('PERFORMANCE')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self):
+        with open(self.config_path, 'w') as file:
+            self.config.write(file)
+
+    def test_config_without_performance_section_takes_defaults(self):
+        self.write_config()
+        config = read_config(self.config_path)
+        self.assertEqual('False', config['PERFORMANCE']['asyncClient'])
+        self.assertEqual('', config['PERFORMANCE']['cachePath'])
+        self.assertEqual('5', config['GENERAL']['threadsQty'])
+
+    def test_performance_options_of_config_override_defaults(self):
+        self.config['PERFORMANCE'] = {'asyncClient': 'True'}
+        self.write_config()
+        config = read_config(self.config_path)
+        self.assertEqual('True', config['PERFORMANCE']['asyncClient'])
+        self.assertEqual('200', config['PERFORMANCE']['asyncMaxInFlight'])
+
+    def test_missing_general_option_is_reported(self):
+        self.config.remove_option('GENERAL', 'threadsQty')
+        self.write_config()
+        with self.assertRaises(ValueError):
+            read_config(self.config_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
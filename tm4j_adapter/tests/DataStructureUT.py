@@ -51,6 +51,33 @@ class DataStructureTests(unittest.TestCase):
         print('------------')
         print(tce)
 
+    def test_add_result_merges_by_key_or_name(self):
+        ter = TestsExecutionResults([dict({'id': 1, 'name': 'Pass'})])
+        first = ter.add_result('CST-T1', 'login', 'Pass', 'log1', 'xml1', '1000', 1)
+        second = ter.add_result(None, 'logout', 'Pass', 'log2', 'xml2', '1000', 1)
+        self.assertIs(first, ter.add_result('CST-T1', 'renamed', 'Pass', 'log3', 'xml3', '1000', 2))
+        self.assertIs(first, ter.add_result('CST-T2', 'login', 'Pass', 'log4', 'xml4', '1000', 3))
+        self.assertIs(second, ter.add_result(None, 'logout', 'Pass', 'log5', 'xml5', '1000', 2))
+        ter.extend([TestCaseExecution(key='CST-T3', name='extended')])
+        self.assertIs(ter[2], ter.add_result('CST-T3', 'other', 'Pass', 'log6', 'xml6', '1000', 1))
+        self.assertEqual(3, len(ter))
+        self.assertEqual(['login', 'logout'], [x.name for x in ter[0:2]])
+        self.assertIs(second, ter[0:2].find_result(None, 'logout'))
+
+    def test_find_result_after_remove_and_append(self):
+        ter = TestsExecutionResults([dict({'id': 1, 'name': 'Pass'})])
+        for name in ('a', 'b', 'c'):
+            ter.add_result(None, name, 'Pass', 'log', 'xml', '1000', 1)
+        ter.remove(ter.find_result(None, 'a'))
+        ter.append(TestCaseExecution(name='d'))
+        self.assertIsNone(ter.find_result(None, 'a'))
+        self.assertEqual('b', ter.find_result(None, 'b').name)
+        self.assertEqual('d', ter.find_result(None, 'd').name)
+        del ter[0]
+        ter.insert(0, TestCaseExecution(name='e'))
+        self.assertEqual(['e', 'c', 'd'], [ter.find_result(None, name).name for name in ('e', 'c', 'd')])
+        self.assertIsNone(ter.find_result(None, 'b'))
+
     def test_zip_with_id(self):
         expected_1 = [{'index': 0,
                        'parameterSetId': 1,
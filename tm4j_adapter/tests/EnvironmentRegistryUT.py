@@ -0,0 +1,30 @@
+import unittest
+from classes.EnvironmentRegistry import EnvironmentRegistry
+
+
+class EnvironmentRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = EnvironmentRegistry()
+        self.registry.load(lambda: ['QAS', 'Prod'])
+        self.created = list()
+
+    def test_name_is_resolved_case_insensitively(self):
+        self.assertEqual('QAS', self.registry.resolve('qas', self.created.append))
+        self.assertEqual('Prod', self.registry.resolve('Prod', self.created.append))
+        self.assertEqual([], self.created)
+
+    def test_missing_environment_is_created_once(self):
+        for env in ('Dev', 'dev', 'Dev'):
+            self.assertEqual('Dev', self.registry.resolve(env, self.created.append))
+        self.assertEqual(['Dev'], self.created)
+
+    def test_unavailable_registry_keeps_names(self):
+        registry = EnvironmentRegistry()
+        registry.load(lambda: None)
+        self.assertEqual('qas', registry.resolve('qas', self.created.append))
+        self.assertEqual([], self.created)
+
+
+if __name__ == '__main__':
+    unittest.main()
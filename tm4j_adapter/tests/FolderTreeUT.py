@@ -0,0 +1,33 @@
+import unittest
+from classes.FolderTree import FolderTree, folder_paths
+
+
+class FolderTreeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = FolderTree()
+        self.tree.load(lambda: folder_paths({'children': [{'name': 'UI', 'children': [{'name': 'Login'}]},
+                                                          {'name': 'API', 'children': []}]}))
+
+    def test_exists(self):
+        self.assertEqual(3, len(self.tree))
+        self.assertTrue(self.tree.exists('/UI/Login'))
+        self.assertFalse(self.tree.exists('UI/Logout'))
+
+    def test_missing_folders_are_created_once_parents_first(self):
+        created = list()
+        folders = ['UI/Logout/Session', 'BDD/features', 'UI/Login', 'BDD']
+        self.assertEqual(['BDD', 'BDD/features', 'UI/Logout', 'UI/Logout/Session'], self.tree.missing(folders))
+        self.tree.ensure(folders, created.append)
+        self.assertEqual(['BDD', 'BDD/features', 'UI/Logout', 'UI/Logout/Session'], created)
+        self.assertEqual([], self.tree.ensure(folders, created.append))
+
+    def test_unavailable_tree_treats_folders_as_existing(self):
+        tree = FolderTree()
+        tree.load(lambda: None)
+        self.assertTrue(tree.exists('Any'))
+        self.assertEqual([], tree.missing(['Any/Folder']))
+
+
+if __name__ == '__main__':
+    unittest.main()
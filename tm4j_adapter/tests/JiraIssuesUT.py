@@ -0,0 +1,42 @@
+import unittest
+from urllib.parse import urlsplit, parse_qs
+from classes.BaseTm4j import _jira_search_url
+from libs.jira_issues import JiraIssueResolver
+
+
+class JiraIssuesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.issues = {f'JQA-{i}': str(10000 + i) for i in range(1, 6)}
+        self.queries = list()
+
+    def search_issues(self, jql: str, start_at: int, max_results: int) -> dict:
+        self.queries.append((jql, start_at))
+        keys = jql[len('key in ('):-1].split(', ')
+        found = [{'key': key, 'id': self.issues[key]} for key in keys if key in self.issues]
+        # server returns at most 2 issues per page
+        return {'issues': found[start_at:start_at + 2], 'total': len(found)}
+
+    def test_issues_are_resolved_with_paged_searches(self):
+        resolver = JiraIssueResolver(self.search_issues, batch_size=3)
+        ids = resolver.resolve(['JQA-1', 'JQA-2', 'JQA-3', 'JQA-4', 'JQA-404'])
+        self.assertEqual({'JQA-1': '10001', 'JQA-2': '10002', 'JQA-3': '10003', 'JQA-4': '10004', 'JQA-404': None},
+                         ids)
+        self.assertEqual([('key in (JQA-1, JQA-2, JQA-3)', 0), ('key in (JQA-1, JQA-2, JQA-3)', 2),
+                          ('key in (JQA-4, JQA-404)', 0)], self.queries)
+
+    def test_resolved_and_missing_issues_are_cached(self):
+        resolver = JiraIssueResolver(self.search_issues, batch_size=10)
+        resolver.resolve(['JQA-1', 'JQA-404'])
+        self.assertEqual({'JQA-404': None, 'JQA-1': '10001', 'JQA-5': '10005'},
+                         resolver.resolve(['JQA-404', 'JQA-1', 'JQA-5']))
+        self.assertEqual(['key in (JQA-1, JQA-404)', 'key in (JQA-5)'], [jql for jql, _ in self.queries])
+
+    def test_search_query_is_url_encoded(self):
+        url = _jira_search_url('http://jira/rest/api/2', 'key in (JQA-1, JQA-2)', 0, 50)
+        self.assertNotIn(' ', url)
+        self.assertEqual(['key in (JQA-1, JQA-2)'], parse_qs(urlsplit(url).query)['jql'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from classes.JunitParser import iter_junit_testcases
+
+REPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuites>
+    <testsuite name="UI">
+        <properties><property name="browser" value="chrome"/></properties>
+        <testsuite name="UI.Login">
+            <testcase classname="UI.Login" name="testLogin" time="1.5"/>
+            <testcase classname="UI.Login" name="testLogout" time="0.2">
+                <failure message="Logout button not found">trace</failure>
+            </testcase>
+            <system-out>suite output</system-out>
+        </testsuite>
+        <testcase classname="UI" name="testCrash">
+            <error message="NullPointerException"/>
+        </testcase>
+        <testcase classname="UI" name="testLater" time="">
+            <skipped/>
+        </testcase>
+    </testsuite>
+</testsuites>
+"""
+
+
+class JunitReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.xml')
+        with os.fdopen(handle, 'w') as f:
+            f.write(REPORT)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_nested_suites_and_statuses(self):
+        self.assertEqual([('testLogin', 'Pass', '', 1500),
+                          ('testLogout', 'Fail', '<strong>Failure:</strong>Logout button not found<br>trace', 200),
+                          ('testCrash', 'Fail', '<strong>Error:</strong>NullPointerException<br>', 0),
+                          ('testLater', 'Not Executed', '<strong>Skipped:</strong><br>', 0)],
+                         list(iter_junit_testcases(self.path)))
+
+    def test_report_without_suites(self):
+        with open(self.path, 'w') as f:
+            f.write('<report><testcase name="orphan"/></report>')
+        with self.assertRaises(ValueError):
+            list(iter_junit_testcases(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+from libs.multi_threading import run_threaded
+
+
+class MultiThreadingTests(unittest.TestCase):
+
+    def test_results_failed_on_retry_are_returned(self):
+        attempts = list()
+
+        def post(result):
+            attempts.append(result)
+            if result == 'broken':
+                raise ValueError('rejected')
+
+        self.assertEqual(['broken'], run_threaded(['ok', 'broken', 'fine'], post, None, 2))
+        self.assertEqual(2, attempts.count('broken'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from libs.parallel_parse import read_files_parallel, MIN_FILES_PER_PROCESS
+
+
+def read_number(file_path):
+    return int(file_path.split('.')[0])
+
+
+class ParallelParseTests(unittest.TestCase):
+
+    def test_small_file_set_is_read_in_current_process(self):
+        files = ['2.feature', '1.feature']
+        self.assertEqual([2, 1], read_files_parallel(lambda file_path: read_number(file_path), files, 4))
+
+    def test_process_pool_keeps_files_order(self):
+        files = [f'{number}.feature' for number in reversed(range(MIN_FILES_PER_PROCESS * 2))]
+        self.assertEqual([read_number(file) for file in files], read_files_parallel(read_number, files, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
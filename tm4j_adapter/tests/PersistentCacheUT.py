@@ -0,0 +1,46 @@
+import os
+import tempfile
+import threading
+import unittest
+from libs.persistent_cache import PersistentCache, TESTCASE_ID, fingerprint
+
+
+class PersistentCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite')
+
+    def test_value_is_kept_between_instances(self):
+        PersistentCache(self.path, 60, 'scope').set(TESTCASE_ID, 'CST-T1', 101)
+        cache = PersistentCache(self.path, 60, 'scope')
+        self.assertEqual(101, cache.get(TESTCASE_ID, 'CST-T1'))
+        self.assertIsNone(PersistentCache(self.path, 60, 'other project').get(TESTCASE_ID, 'CST-T1'))
+        cache.invalidate(TESTCASE_ID, 'CST-T1')
+        self.assertIsNone(cache.get(TESTCASE_ID, 'CST-T1'))
+
+    def test_expired_value(self):
+        cache = PersistentCache(self.path, -1, 'scope')
+        cache.set(TESTCASE_ID, 'CST-T1', 101)
+        self.assertIsNone(cache.get(TESTCASE_ID, 'CST-T1'))
+
+    def test_concurrent_writers(self):
+        cache = PersistentCache(self.path, 60, 'scope')
+        threads = [threading.Thread(target=lambda i=i: [cache.set(TESTCASE_ID, f'CST-T{i}-{j}', j)
+                                                         for j in range(20)]) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(19, cache.get(TESTCASE_ID, 'CST-T4-19'))
+
+    def test_fingerprint_does_not_depend_on_keys_order(self):
+        self.assertEqual(fingerprint({'name': 'n', 'labels': ['a']}, 'link'),
+                         fingerprint({'labels': ['a'], 'name': 'n'}, 'link'))
+        self.assertNotEqual(fingerprint({'name': 'n', 'labels': ['a']}, 'link'),
+                            fingerprint({'name': 'n', 'labels': ['b']}, 'link'))
+
+
+if __name__ == '__main__':
+    unittest.main()
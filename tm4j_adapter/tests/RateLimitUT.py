@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+from libs.rate_limit import TokenBucket, FileTokenBucket, fcntl
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_burst_is_free_then_requests_are_spaced(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        delays = [bucket.reserve() for _ in range(5)]
+        self.assertEqual([0, 0, 0], delays[:3])
+        self.assertAlmostEqual(0.1, delays[3], places=2)
+        self.assertAlmostEqual(0.2, delays[4], places=2)
+
+    @unittest.skipIf(fcntl is None, 'file locks are not supported')
+    def test_file_bucket_is_shared_between_instances(self):
+        path = os.path.join(tempfile.mkdtemp(), 'test.bucket')
+        first = FileTokenBucket(rate=10, burst=2, file_path=path)
+        second = FileTokenBucket(rate=10, burst=2, file_path=path)
+        self.assertEqual(0, first.reserve())
+        self.assertEqual(0, second.reserve())
+        self.assertAlmostEqual(0.1, first.reserve(), places=2)
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from libs.retry import RetryPolicy, CONNECTION, THROTTLED, SERVER, classify_status, parse_retry_after
+
+
+class RetryPolicyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(budgets={CONNECTION: 2, THROTTLED: 3, SERVER: 1}, base_delay=1, max_delay=10)
+
+    def test_budget_is_counted_per_error_class(self):
+        attempts = dict()
+        self.assertIsNotNone(self.policy.next_delay('GET', SERVER, attempts))
+        self.assertIsNone(self.policy.next_delay('GET', SERVER, attempts))
+        self.assertIsNotNone(self.policy.next_delay('GET', CONNECTION, attempts))
+        self.assertEqual({SERVER: 1, CONNECTION: 1}, attempts)
+
+    def test_post_is_retried_only_when_throttled(self):
+        self.assertIsNone(self.policy.next_delay('post', SERVER, dict()))
+        self.assertIsNone(self.policy.next_delay('post', CONNECTION, dict()))
+        self.assertIsNotNone(self.policy.next_delay('post', THROTTLED, dict()))
+
+    def test_delay_is_capped(self):
+        attempts = dict()
+        for _ in range(3):
+            self.assertLessEqual(self.policy.next_delay('get', THROTTLED, attempts), 10)
+        self.assertEqual(10, self.policy.next_delay('put', CONNECTION, attempts, retry_after=120))
+
+    def test_retry_after_header(self):
+        self.assertEqual(5, parse_retry_after('5'))
+        self.assertEqual(0, parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'))
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_classify_status(self):
+        self.assertEqual(THROTTLED, classify_status(429))
+        self.assertEqual(SERVER, classify_status(503))
+        self.assertIsNone(classify_status(404))
+
+
+if __name__ == '__main__':
+    unittest.main()
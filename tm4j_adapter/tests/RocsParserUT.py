@@ -66,18 +66,21 @@ class TestResultsMockedPost(RocsParse):
     @patch('classes.ThreadedParser.ThreadedParser.do_export_results',
            new=Mock())
     def test_testcycle_creation(self):
-        testrun = call(self.parseconfig['EXECUTION']['testcycleName'],
-                       self.parseconfig['GENERAL']['trFolder'])
+        testrun = call(name=self.parseconfig['EXECUTION']['testcycleName'],
+                       folder=self.parseconfig['GENERAL']['trFolder'],
+                       key=None,
+                       linked_issues=self.parseconfig['EXECUTION']['jiraTaskList'])
+        self.rocs_parser.testcycle_key = None
         self.rocs_parser.do_export_results()
-        self.assertEqual(mocked_tm4j.find_testcycle.call_args, testrun)
+        self.assertEqual(mocked_tm4j.get_testcycle.call_args, testrun)
         self.assertEqual(self.rocs_parser.testcycle_key, 'CST-R1')
 
     def test_results_posting(self):
-        self.rocs_parser.testcycle_key = 'CST-R1'
-        with patch('classes.RocsParser.TM4J', new=mocked_tm4j) as patched_tm:
-            self.rocs_parser._post_single_result(self.current_result)
-            tm_calls = patched_tm.mock_calls
-            self.assertEqual(tm_calls[1][1][0], self.current_result)
+        self.rocs_parser.testcycle = mocked_tm4j.get_testcycle()
+        self.rocs_parser._post_single_result(self.current_result)
+        post_call = mocked_tm4j.create_data_driven_test_results.call_args
+        self.assertEqual(post_call[0][0], self.current_result)
+        self.assertEqual(post_call[1]['testcycle'].key, 'CST-R1')
 
     def test_unposted_save(self):
         self.rocs_parser.manage_unposted_results(self.allParseResults)
@@ -0,0 +1,30 @@
+import io
+import unittest
+from classes.RocsParser import read_testcase_attributes
+
+REPORT = b'''<?xml version="1.0" encoding="UTF-8"?>
+<testsuite time="2.038805" tests="1" name="tests.healthcheck.Healthcheck">
+    <testcase time="2.038805" name="CST-T1_Healthcheck -- @1.2 examples" status="failed"
+     classname="tests.healthcheck.Healthcheck">
+        <system-out><![CDATA[@scenario.begin''' + b'\n' * 100000 + b''']]></system-out>
+    </testcase>
+</testsuite>
+'''
+
+
+class RocsReportTests(unittest.TestCase):
+
+    def test_first_testcase_attributes_are_read_without_the_rest_of_report(self):
+        report = io.BytesIO(REPORT)
+        testcase = read_testcase_attributes(report)
+        self.assertEqual(('CST-T1_Healthcheck -- @1.2 examples', 'failed', '2.038805'),
+                         (testcase['name'], testcase['status'], testcase['time']))
+        self.assertLess(report.tell(), 10000)
+
+    def test_report_without_testcase(self):
+        with self.assertRaises(ValueError):
+            read_testcase_attributes(io.BytesIO(b'<testsuite tests="0"></testsuite>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
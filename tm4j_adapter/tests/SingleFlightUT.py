@@ -0,0 +1,43 @@
+import threading
+import time
+import unittest
+from libs.single_flight import SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = list()
+        results = list()
+
+        def lookup():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'key': 'CST-T1'}
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('url', lookup))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, flight.coalesced)
+        self.assertEqual([{'key': 'CST-T1'}] * 5, results)
+        results[0]['key'] = 'changed'
+        self.assertEqual('CST-T1', results[1]['key'])
+
+    def test_sequential_calls_are_not_shared(self):
+        flight = SingleFlight()
+        self.assertEqual(1, flight.do('url', lambda: 1))
+        self.assertEqual(2, flight.do('url', lambda: 2))
+        self.assertEqual(0, flight.coalesced)
+
+    def test_exception_is_raised(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('url', lambda: int('x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import re
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from classes.TM4J import TM4J
+from classes.DataStructures import TestCaseHandle, TestCycleHandle, TestResultHandle
+from classes.Exceptions import TM4JObjectNotFound
+from tests.TestData.FakeApi import FakeApi, make_config, reset_shared_state, project_routes, make_testcase_data
+
+
+class TM4JClientTests(unittest.TestCase):
+
+    def setUp(self):
+        reset_shared_state()
+        self.api = FakeApi(project_routes())
+        api_patch = self.api.patch_tm4j()
+        api_patch.start()
+        self.addCleanup(api_patch.stop)
+        self.config = make_config()
+
+    def make_cached_config(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return make_config(cachePath=os.path.join(directory.name, 'cache.sqlite'))
+
+    def test_instances_share_session_and_project_id(self):
+        instances = [TM4J(config=self.config) for _ in range(5)]
+        self.assertEqual(1, len({id(tm._session) for tm in instances}))
+        self.assertEqual({17}, {tm._tc_project_id for tm in instances})
+        self.assertEqual(1, self.api.count('GET', r'/project$'))
+
+    def test_handles_are_returned_without_changing_instance(self):
+        tm = TM4J(config=self.config)
+        testcase = tm.get_testcase(name='test 1')
+        testcycle = tm.get_testcycle(key='CST-R1')
+        test_result = tm.create_test_result(testcase, testcycle, 'Pass', 'QA', 'robot')
+        self.assertEqual(TestCaseHandle(key='CST-T1', name='test 1', folder='/Auto', internal_id=101,
+                                        data=make_testcase_data(1)), testcase)
+        self.assertEqual(TestCycleHandle(key='CST-R1', name='nightly', internal_id=201,
+                                         data={'key': 'CST-R1', 'name': 'nightly'}), testcycle)
+        self.assertEqual(TestResultHandle(id=301, testcase_key='CST-T1', testcycle_key='CST-R1'), test_result)
+        self.assertIsNone(tm.testcase['key'])
+        self.assertIsNone(tm.testrun['key'])
+
+    def test_one_instance_is_shared_by_threads(self):
+        tm = TM4J(config=self.config)
+        testcycle = tm.get_testcycle(key='CST-R1')
+
+        def post(number: int) -> tuple:
+            testcase = tm.get_testcase(name=f'test {number}')
+            test_result = tm.create_test_result(testcase, testcycle, 'Pass', 'QA', 'robot')
+            return testcase.key, testcase.internal_id, test_result
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(post, range(1, 41)))
+        self.assertEqual([(f'CST-T{number}', 100 + number) for number in range(1, 41)],
+                         [(key, internal_id) for key, internal_id, _ in results])
+        self.assertEqual([f'CST-T{number}' for number in range(1, 41)],
+                         [test_result.testcase_key for _, _, test_result in results])
+
+    def test_testcase_is_saved_with_one_request(self):
+        self.api.routes[:0] = FakeApi([('POST', r'/atm/1.0/testcase$', {'key': 'CST-T50'}),
+                                       ('PUT', r'/atm/1.0/testcase/CST-T50$', ''),
+                                       ('PUT', r'/tests/1.0/testcase/150$', '')]).routes
+        tm = TM4J(config=self.config)
+        values = {'name': 'test 50', 'folder': 'Auto/New', 'status': 'Approved', 'labels': ['smoke'],
+                  'testScript': {'steps': [{'index': 0, 'description': 'step'}]}}
+        requests = len(self.api.requests)
+        created = tm.create_testcase_from_values(values)
+        self.assertEqual(['POST'], [method for method, _, _ in self.api.requests[requests:]])
+        self.assertEqual(('CST-T50', 'test 50', '/Auto/New'), (created.key, created.name, created.data['folder']))
+        self.assertEqual(created.data, tm.find_remote_testcase(dict(values, key='CST-T50')))
+
+        requests = len(self.api.requests)
+        updated = tm.update_testcase_from_values(created.data, dict(values, objective='changed'))
+        self.assertEqual(['PUT'], [method for method, _, _ in self.api.requests[requests:]])
+        self.assertEqual('changed', updated.data['objective'])
+        self.assertTrue(tm.is_testcase_up_to_date(updated.data, dict(values, objective='changed')))
+
+    def test_param_type_is_put_only_for_changed_parameters(self):
+        self.api.routes[:0] = FakeApi([('POST', r'/atm/1.0/testcase$', {'key': 'CST-T50'}),
+                                       ('PUT', r'/atm/1.0/testcase/CST-T50$', ''),
+                                       ('PUT', r'/tests/1.0/testcase/150$', '')]).routes
+        tm = TM4J(config=self.config)
+        values = {'name': 'test 50', 'folder': 'Auto', 'status': 'Approved', 'parameters': {'variables': ['a']},
+                  'testScript': {'steps': [{'description': 'step {a}'}]}}
+        created = tm.create_testcase_from_values(values)
+        self.assertEqual(150, created.internal_id)
+        self.assertEqual(1, self.api.count('PUT', r'/tests/1.0/testcase/150$'))
+        tm.update_testcase_from_values(created.data, dict(values, objective='changed'))
+        self.assertEqual(1, self.api.count('PUT', r'/tests/1.0/testcase/150$'))
+
+    def test_warm_cache_answers_lookups_without_requests(self):
+        config = self.make_cached_config()
+
+        def export() -> list:
+            tm = TM4J(config=config)
+            testcycle = tm.get_testcycle(key='CST-R1')
+            requests = len(self.api.requests)
+            for number in range(1, 11):
+                tm.create_test_result(tm.get_testcase(name=f'test {number}'), testcycle, 'Pass', 'QA', 'robot')
+            return [url for method, url, _ in self.api.requests[requests:] if '/testcase/' in url and method == 'GET']
+
+        self.assertEqual(20, len(export()))
+        reset_shared_state()
+        self.assertEqual([], export())
+
+        # testcase deleted since the last run is searched again only after posting its result fails
+        deleted = ('POST', r'/testcase/CST-T3/testresult$', TM4JObjectNotFound('deleted'))
+        self.api.routes[:0] = FakeApi([deleted]).routes
+        reset_shared_state()
+        tm = TM4J(config=config)
+        with self.assertRaises(TM4JObjectNotFound):
+            tm.create_test_result(tm.get_testcase(name='test 3'), tm.get_testcycle(key='CST-R1'),
+                                  'Pass', 'QA', 'robot')
+        searches = self.api.count('GET', r'/testcase/search')
+        tm.get_testcase(name='test 3')
+        tm.get_testcase(name='test 4')
+        self.assertEqual(searches + 1, self.api.count('GET', r'/testcase/search'))
+
+    def test_warm_cache_answers_batched_lookups_without_searches(self):
+        self.api.routes[:0] = FakeApi([('GET', r'/testcase/search\?.*name IN',
+                                        lambda url, _: [make_testcase_data(int(number))
+                                                        for number in re.findall(r'"test (\d+)"', url)])]).routes
+        config = self.make_cached_config()
+        lookups = [(f'test {number}', None, None) for number in range(1, 11)]
+        TM4J(config=config).resolve_testcases(lookups)
+        reset_shared_state()
+        searches = self.api.count('GET', r'/testcase/search')
+        resolved = TM4J(config=config).resolve_testcases(lookups)
+        self.assertEqual(searches, self.api.count('GET', r'/testcase/search'))
+        self.assertEqual([f'CST-T{number}' for number in range(1, 11)],
+                         [testcase['key'] for testcase in resolved.values()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from classes.TestCaseIndex import TestCaseIndex
+
+
+class TestCaseIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TestCaseIndex()
+        self.index.load(lambda: [[{'key': 'CST-T1', 'name': 'login', 'folder': '/UI'},
+                                  {'key': 'CST-T2', 'name': 'login', 'folder': '/API'}],
+                                 [{'key': 'CST-T3', 'name': 'logout', 'folder': '/UI/Session'}]])
+
+    def test_find(self):
+        self.assertEqual(3, len(self.index))
+        self.assertEqual('CST-T2', self.index.find(name='login', folder='API')['key'])
+        self.assertEqual('CST-T3', self.index.find(name='logout', folder='/UI/Session/')['key'])
+        self.assertEqual('CST-T1', self.index.find(name='login')['key'])
+        self.assertEqual('logout', self.index.find(key='CST-T3')['name'])
+        self.assertIsNone(self.index.find(name='login', folder='Other'))
+
+    def test_load_once(self):
+        self.assertFalse(self.index.load(lambda: [[{'key': 'CST-T4', 'name': 'other'}]]))
+        self.assertIsNone(self.index.find(key='CST-T4'))
+
+    def test_discard(self):
+        self.index.set_internal_id('CST-T1', 101)
+        self.assertEqual('CST-T1', self.index.find_by_internal_id(101)['key'])
+        self.index.discard('CST-T1')
+        self.assertIsNone(self.index.find(name='login', folder='UI'))
+        self.assertIsNone(self.index.find_by_internal_id(101))
+        self.assertIsNone(self.index.get_internal_id('CST-T1'))
+
+    def test_renamed_testcase_is_discarded_by_all_its_names(self):
+        self.index.add({'key': 'CST-T3', 'name': 'sign out', 'folder': '/UI/Session'})
+        self.index.discard('CST-T3')
+        self.assertIsNone(self.index.find(name='logout', folder='UI/Session'))
+        self.assertIsNone(self.index.find(name='sign out'))
+        self.assertEqual('CST-T2', self.index.find(name='login', folder='API')['key'])
+
+    def test_found_data_is_copy(self):
+        self.index.find(key='CST-T1')['name'] = 'changed'
+        self.assertEqual('login', self.index.find(key='CST-T1')['name'])
+
+    def test_absent_name_until_added(self):
+        self.index.mark_absent('login', 'UI')
+        self.index.mark_absent('signup', 'UI')
+        self.assertFalse(self.index.is_absent('login', '/UI'))
+        self.assertTrue(self.index.is_absent('signup', '/UI/'))
+        self.assertFalse(self.index.is_absent('signup', 'API'))
+        self.index.add({'key': 'CST-T4', 'name': 'signup', 'folder': '/UI'})
+        self.assertFalse(self.index.is_absent('signup', 'UI'))
+
+
+if __name__ == '__main__':
+    unittest.main()
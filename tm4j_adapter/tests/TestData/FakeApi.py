@@ -0,0 +1,150 @@
+"""
+Fake TM4J API answering requests of TM4J and AsyncTM4J clients in unit tests without network
+"""
+import configparser
+import copy
+import json
+import re
+from unittest.mock import patch
+from classes import BaseTm4j, EnvironmentRegistry, FolderTree, TestCaseIndex, TestRunItemIndex
+from libs import jira_issues, persistent_cache, trace_links
+from libs.config import DEFAULT_CONFIG_PATH
+
+TM4J_URL = 'http://tm4j.test/rest/atm/1.0'
+SERVICE_URL = 'http://tm4j.test/rest/tests/1.0'
+PROJECT = [{'key': 'CST', 'id': 17}]
+
+
+def make_testcase_data(number: int) -> dict:
+    return {'key': f'CST-T{number}', 'name': f'test {number}', 'folder': '/Auto',
+            'testScript': {'type': 'STEP_BY_STEP', 'steps': [{'description': 'step'}]}}
+
+
+def number_in(pattern: str, url: str) -> int:
+    return int(re.search(pattern, url).group(1))
+
+
+def project_routes() -> list:
+    """
+    routes of project with testcase 'test N' with key CST-TN and internal id 100 + N for every N,
+    testcycle CST-R1 and environment QA. Results are created with id 300 + N
+    """
+    return [('GET', r'/project$', PROJECT),
+            ('GET', r'/testcase/search\?.*name = "test \d+"',
+             lambda url, _: [make_testcase_data(number_in(r'name = "test (\d+)"', url))]),
+            ('GET', r'/testcase/search\?', []),
+            ('GET', r'/testcase/CST-T\d+\?fields=id', lambda url, _: {'id': 100 + number_in(r'CST-T(\d+)', url)}),
+            ('GET', r'/testrun/search\?.* key = "CST-R1"', [{'key': 'CST-R1', 'name': 'nightly'}]),
+            ('GET', r'/testrun/CST-R1\?fields=id', {'id': 201}),
+            ('GET', r'/environments\?projectKey=CST', [{'name': 'QA'}]),
+            ('POST', r'/testrun/CST-R1/testcase/CST-T\d+/testresult$',
+             lambda url, _: {'id': 300 + number_in(r'CST-T(\d+)', url)}),
+            ('POST', r'/testrun/CST-R1/testresults$',
+             lambda url, payload: [{'id': 300 + number_in(r'CST-T(\d+)', result['testCaseKey'])}
+                                   for result in payload])]
+
+
+def make_config(**performance) -> configparser.ConfigParser:
+    """default config without folders preload, PERFORMANCE options can be overridden, e.g. cachePath in temp dir"""
+    config = configparser.ConfigParser()
+    config.read(DEFAULT_CONFIG_PATH)
+    config['GENERAL'].update(tm4jUrl=TM4J_URL, tm4jProjectKey='CST', tcFolder='Auto', trFolder='Runs')
+    config['PERFORMANCE'].update(preloadFolders='False')
+    config['PERFORMANCE'].update(performance)
+    return config
+
+
+def write_config(path: str, **performance) -> str:
+    with open(path, 'w') as file:
+        make_config(**performance).write(file)
+    return path
+
+
+def reset_shared_state():
+    """forgets process-wide indexes, registries and ids, so every test starts with empty project"""
+    for shared in (BaseTm4j._shared_project_ids, TestCaseIndex._shared_indexes, TestRunItemIndex._shared_indexes,
+                   EnvironmentRegistry._shared_registries, FolderTree._shared_trees, jira_issues._shared_resolvers,
+                   trace_links._shared_accumulators, persistent_cache._shared_caches):
+        shared.clear()
+
+
+class FakeApi:
+    """
+    Records requests and answers them with the first route matching method and url:
+        api = FakeApi([('GET', r'/project$', PROJECT),
+                       ('POST', r'/testcase$', lambda url, payload: {'key': 'CST-T1'})])
+    Route response is returned as is, called with request url and payload if it is callable
+    or raised if it is exception. Callable answering None passes request to the next routes
+    """
+    def __init__(self, routes: list):
+        self.routes = [(method, re.compile(pattern), response) for method, pattern, response in routes]
+        self.requests = list()          # (method, url, payload)
+
+    def answer(self, method: str, url: str, payload=None):
+        """answers request, json payload is parsed"""
+        method = method.upper()
+        try:
+            payload = json.loads(payload) if isinstance(payload, str) and payload else payload
+        except ValueError:
+            pass
+        self.requests.append((method, url, payload))
+        for route_method, pattern, response in self.routes:
+            if route_method == method and pattern.search(url):
+                response = response(url, payload) if callable(response) else copy.deepcopy(response)
+                if response is None:
+                    continue
+                if isinstance(response, Exception):
+                    raise response
+                return response
+        raise AssertionError(f'Unexpected request {method} {url}')
+
+    def count(self, method: str, pattern: str = '') -> int:
+        return len([url for request_method, url, _ in self.requests
+                    if request_method == method and re.search(pattern, url)])
+
+    def patch_tm4j(self):
+        """patches TM4J requests, so they are answered by this api"""
+        def do(tm, method: str, url: str, payload=None, *args, **kwargs):
+            return self.answer(method, url, payload)
+        return patch.object(BaseTm4j.BaseTm4j, '_do', new=do)
+
+    def session(self, *args, **kwargs):
+        """aiohttp.ClientSession replacement, so AsyncTM4J requests are answered by this api"""
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, api: FakeApi):
+        self.api = api
+        self.closed = False
+
+    def request(self, method: str, url: str, data=None, headers=None):
+        return FakeResponse(self.api, method, url, data)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeResponse:
+    def __init__(self, api: FakeApi, method: str, url: str, data):
+        self.api = api
+        self.method = method
+        self.url = url
+        self.data = data
+        self.status = 200
+        self.headers = dict()
+        self._text = ''
+
+    async def __aenter__(self):
+        response = self.api.answer(self.method, self.url, self.data)
+        self._text = json.dumps(response) if response is not None else ''
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    async def text(self):
+        return self._text
+
+    def raise_for_status(self):
+        pass
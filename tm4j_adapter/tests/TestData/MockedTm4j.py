@@ -1,5 +1,6 @@
 from unittest.mock import Mock, create_autospec, PropertyMock
 from classes import TM4J
+from classes.DataStructures import TestCaseHandle, TestCycleHandle, TestResultHandle
 from tests.TestData.tmconnect.prefilled_tm4j_items import testcase_full, testrun_full
 
 mocked_tm4j = create_autospec(TM4J.TM4J)
@@ -7,11 +8,27 @@ mocked_tm4j.find_testcase = Mock(return_value='CST-T1')
 type(mocked_tm4j).testcase = PropertyMock(return_value=testcase_full)
 mocked_tm4j.update_testcase = Mock()
 mocked_tm4j.add_testcase_weblink = Mock()
+mocked_tm4j.add_weblink = Mock(return_value={})
+mocked_tm4j.flush_trace_links = Mock(return_value=[])
+mocked_tm4j.get_testcase_weblinks = Mock(return_value=[])
+mocked_tm4j.get_unchanged_testcase_key = Mock(return_value=None)
+mocked_tm4j.find_remote_testcase = Mock(return_value=None)
+mocked_tm4j.missing_folders = Mock(return_value=[])
+mocked_tm4j.ensure_folders = Mock(return_value=[])
+mocked_tm4j.create_testcase_from_values = Mock(return_value=TestCaseHandle(key='CST-T1', internal_id=1,
+                                                                           data=testcase_full))
+mocked_tm4j.set_testcase_fingerprint = Mock()
 mocked_tm4j.find_testcycle = Mock(return_value='CST-R1')
 type(mocked_tm4j).testrun = PropertyMock(return_value=testrun_full)
 mocked_tm4j.post_test_result = Mock()
 mocked_tm4j.post_data_driven_test_results = Mock()
 mocked_tm4j.attach_testcase_result_file = Mock()
+mocked_tm4j.get_testcase = Mock(return_value=TestCaseHandle(key='CST-T1', internal_id=1, data=testcase_full))
+mocked_tm4j.get_testcycle = Mock(return_value=TestCycleHandle(key='CST-R1', internal_id=1, data=testrun_full))
+mocked_tm4j.create_test_result = Mock(return_value=TestResultHandle(id=1, testcase_key='CST-T1',
+                                                                    testcycle_key='CST-R1'))
+mocked_tm4j.create_data_driven_test_results = Mock(return_value=TestResultHandle(id=1, testcase_key='CST-T1',
+                                                                                 testcycle_key='CST-R1'))
 
 
 exc_mocked_tm4j = create_autospec(TM4J.TM4J)
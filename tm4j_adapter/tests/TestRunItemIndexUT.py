@@ -0,0 +1,37 @@
+import unittest
+from classes.TestRunItemIndex import TestRunItemIndex
+
+
+def make_items(*keys):
+    return [{'id': i, '$lastTestResult': {'id': 100 + i, 'testCase': {'key': key}}} for i, key in enumerate(keys)]
+
+
+class TestRunItemIndexTests(unittest.TestCase):
+
+    def test_items_are_loaded_once(self):
+        index = TestRunItemIndex()
+        index.refresh(lambda: make_items('CST-T1', 'CST-T2'))
+        index.refresh(lambda: make_items())
+        self.assertEqual((1, 101), index.get('CST-T2'))
+        self.assertEqual(1, index.reloads)
+
+    def test_reload_after_result_is_posted(self):
+        index = TestRunItemIndex()
+        index.refresh(lambda: make_items('CST-T1'))
+        first, second = index.mark_posted(), index.mark_posted()
+        index.refresh(lambda: make_items('CST-T1', 'CST-T2', 'CST-T3'), first)
+        index.refresh(lambda: make_items(), second)
+        self.assertEqual((2, 102), index.get('CST-T3'))
+        self.assertEqual(2, index.reloads)
+
+    def test_last_result_is_updated_in_place(self):
+        index = TestRunItemIndex()
+        index.refresh(lambda: make_items('CST-T1'))
+        index.set_last_result('CST-T1', 555)
+        self.assertEqual((0, 555), index.get('CST-T1'))
+        index.refresh(lambda: make_items('CST-T1'), index.mark_posted())
+        self.assertEqual((0, 555), index.get('CST-T1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
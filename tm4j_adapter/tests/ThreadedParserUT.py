@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from classes.Exceptions import TM4JException
+from classes.DataStructures import PendingTestResult
+from classes.ThreadedParser import ThreadedParser
+from tests.TestData.FakeApi import FakeApi, write_config, reset_shared_state, project_routes
+
+
+class ResultsParser(ThreadedParser):
+    """parses nothing, parse_results are testcase names"""
+    def __init__(self, config_path: str):
+        super().__init__(config_path)
+        self.unposted = list()
+
+    def _resolve_single_result(self, name: str) -> PendingTestResult:
+        return PendingTestResult(self.tm.get_testcase(name=name), 'Pass', 'QA', 'robot')
+
+    def _post_single_result(self, name: str):
+        self.tm.create_test_result(self.tm.get_testcase(name=name), self.testcycle, 'Pass', 'QA', 'robot')
+
+    def manage_unposted_results(self, failed_posts: list):
+        self.unposted = failed_posts
+
+
+def reject_testcase_13(url: str, payload):
+    """rejects result of CST-T13 posted alone or in chunk"""
+    keys = [result['testCaseKey'] for result in payload] if isinstance(payload, list) else [url]
+    return TM4JException('rejected') if any('CST-T13' in key for key in keys) else None
+
+
+class ThreadedParserTests(unittest.TestCase):
+
+    def setUp(self):
+        reset_shared_state()
+        self.directory = tempfile.TemporaryDirectory()
+        self.api = FakeApi([('POST', r'/testresults?$', reject_testcase_13)] + project_routes())
+        api_patch = self.api.patch_tm4j()
+        api_patch.start()
+        self.addCleanup(api_patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def export(self, names: list, **performance) -> ResultsParser:
+        parser = ResultsParser(write_config(os.path.join(self.directory.name, 'parseconfig.ini'), **performance))
+        parser.testcycle = parser.tm.get_testcycle(key='CST-R1')
+        parser.parse_results = names
+        parser.do_export_results()
+        return parser
+
+    def test_results_are_posted_in_chunks(self):
+        parser = self.export([f'test {number}' for number in range(1, 26) if number != 13], resultBatchSize='10')
+        self.assertEqual(3, self.api.count('POST', r'/testresults$'))
+        self.assertEqual(0, self.api.count('POST', r'/testresult$'))
+        self.assertEqual((24, 0), (parser.export_results['Exported'], parser.export_results['Failed']))
+
+    def test_results_are_posted_one_by_one_by_default(self):
+        parser = self.export([f'test {number}' for number in range(1, 6)])
+        self.assertEqual(0, self.api.count('POST', r'/testresults$'))
+        self.assertEqual(5, self.api.count('POST', r'/testresult$'))
+        self.assertEqual((5, 0), (parser.export_results['Exported'], parser.export_results['Failed']))
+
+    def test_failed_links_are_reported(self):
+        self.api.routes[:0] = FakeApi([('POST', r'/tracelink/bulk/create$', TM4JException('rejected'))]).routes
+        parser = ResultsParser(write_config(os.path.join(self.directory.name, 'parseconfig.ini')))
+        parser.tm.trace_links.add([{'testRunId': 201, 'issueId': 1, 'typeId': 3}], parser.tm._post_trace_links)
+        parser.testcycle = parser.tm.get_testcycle(key='CST-R1')
+        parser.parse_results = ['test 1']
+        with self.assertLogs(parser.logger, 'ERROR') as logs:
+            parser.do_export_results()
+        self.assertIn('1 trace links were not posted', '\n'.join(logs.output))
+        self.assertEqual((1, 0), (parser.export_results['Exported'], parser.export_results['Failed']))
+
+    def test_rejected_and_not_found_results_are_failed(self):
+        names = [f'test {number}' for number in range(1, 26)] + ['unknown']
+        for batch_size in ('10', '1'):
+            with self.subTest(resultBatchSize=batch_size):
+                parser = self.export(names, resultBatchSize=batch_size)
+                self.assertEqual((24, 2), (parser.export_results['Exported'], parser.export_results['Failed']))
+                self.assertEqual(['test 13', 'unknown'], sorted(parser.unposted))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from libs import trace_links
+from libs.trace_links import TraceLinkAccumulator, get_shared_link_accumulator, warn_about_unflushed_links
+from tests.TestData.FakeApi import make_config
+
+
+class TraceLinksTests(unittest.TestCase):
+
+    def test_links_are_posted_in_batches(self):
+        requests = list()
+        links = TraceLinkAccumulator(requests.append, batch_size=10)
+        for testcase_id in range(25):
+            links.add([{'testCaseId': testcase_id, 'url': 'link', 'typeId': 1}])
+        self.assertEqual([10, 10], [len(request) for request in requests])
+        links.flush()
+        self.assertEqual([10, 10, 5], [len(request) for request in requests])
+        self.assertEqual(25, links.posted)
+
+    def test_duplicates_are_skipped_and_rejected_link_is_isolated(self):
+        requests = list()
+
+        def post_links(payload):
+            if any(link['testCaseId'] == 3 for link in payload):
+                raise ValueError('rejected')
+            requests.append(payload)
+
+        links = TraceLinkAccumulator(post_links, batch_size=100)
+        for testcase_id in list(range(8)) * 2:
+            links.add([{'testCaseId': testcase_id, 'url': 'link', 'typeId': 1}])
+        links.flush()
+        self.assertEqual(7, sum(len(request) for request in requests))
+        self.assertEqual({'Trace links posted': 7, 'Trace links failed': 1}, links.stats())
+
+    def test_shared_links_are_posted_by_client_flushing_them(self):
+        trace_links._shared_accumulators.clear()
+        self.addCleanup(trace_links._shared_accumulators.clear)
+        first, second = list(), list()
+        links = get_shared_link_accumulator(make_config())
+        self.assertIs(links, get_shared_link_accumulator(make_config()))
+        links.add([{'testCaseId': 1, 'url': 'link', 'typeId': 1}], first.extend)
+        links.add([{'testCaseId': 2, 'url': 'link', 'typeId': 1}], second.extend)
+        with self.assertLogs(trace_links.logger, 'WARNING'):
+            warn_about_unflushed_links()
+        self.assertEqual(([], []), (first, second))
+        links.flush(second.extend)
+        self.assertEqual([], first)
+        self.assertEqual([1, 2], [link['testCaseId'] for link in second])
+
+
+if __name__ == '__main__':
+    unittest.main()
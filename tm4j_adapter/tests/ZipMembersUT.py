@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from zipfile import ZipFile
+from libs.zip_members import ZipMember, open_attachment, attachment_name, close_archives
+
+
+class ZipMembersTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tempdir.name, 'artifacts.zip')
+        with ZipFile(self.archive, 'w') as artifacts:
+            artifacts.writestr('logs/split_login_feature.log', b'@scenario.begin')
+
+    def tearDown(self):
+        close_archives()
+        self.tempdir.cleanup()
+
+    def test_member_is_read_without_extraction(self):
+        member = ZipMember(self.archive, 'logs/split_login_feature.log')
+        with open_attachment(member) as file:
+            self.assertEqual(b'@scenario.begin', file.read())
+        self.assertEqual('split_login_feature.log', attachment_name(member))
+        self.assertEqual(['artifacts.zip'], os.listdir(self.tempdir.name))
+
+    def test_file_path_is_opened(self):
+        with open_attachment(self.archive) as file:
+            self.assertEqual(b'PK', file.read(2))
+        self.assertEqual('artifacts.zip', attachment_name(self.archive))
+
+
+if __name__ == '__main__':
+    unittest.main()
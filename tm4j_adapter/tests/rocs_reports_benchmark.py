@@ -0,0 +1,86 @@
+"""
+Benchmark of rocs report decoding: minidom (the former RocsParser path) against read_testcase_attributes.
+Builds artifacts.zip with 10k reports and logs in temp dir and reads all reports from it with both decoders:
+    python -m tests.rocs_reports_benchmark [members]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from os import path
+from xml.dom.minidom import parseString
+from zipfile import ZipFile, ZIP_DEFLATED
+from classes.RocsParser import read_testcase_attributes
+
+REPORT = '''<?xml version="1.0" encoding="UTF-8"?>
+<testsuite timestamp="2019-07-18T14:12:41.136257" time="2.038805" tests="1" skipped="0"
+ name="tests.feature{index}.Scenario {index}" hostname="87c0e25a48cf" failures="0" errors="0">
+    <testcase time="2.038805" name="CST-T{index}_Scenario {index} -- @1.{row} examples" status="passed"
+     classname="tests.feature{index}.Scenario {index}">
+        <system-out><![CDATA[
+@scenario.begin
+{output}
+@scenario.end
+]]></system-out>
+    </testcase>
+</testsuite>
+'''
+OUTPUT = '\n'.join(f'  Given step {step} passed in 0.001s' for step in range(200))
+
+
+def make_artifact(artifact_path: str, members: int):
+    with ZipFile(artifact_path, 'w', compression=ZIP_DEFLATED) as artifacts:
+        for index in range(members):
+            artifacts.writestr(f'TESTS-tests.feature{index}.xml', REPORT.format(index=index, row=index % 5, output=OUTPUT))
+            artifacts.writestr(f'split_feature{index}_feature.log', OUTPUT)
+
+
+def read_with_minidom(report) -> dict:
+    testcase = parseString(report.read()).getElementsByTagName("testcase")[0]
+    return {name: testcase.attributes[name].value for name in ('name', 'status', 'time')}
+
+
+def read_with_pull_parser(report) -> dict:
+    attributes = read_testcase_attributes(report)
+    return {name: attributes[name] for name in ('name', 'status', 'time')}
+
+
+def read_reports(artifact_path: str, read: callable) -> list:
+    with ZipFile(artifact_path, 'r') as artifacts:
+        results = list()
+        for filename in artifacts.namelist():
+            if '.xml' in filename:
+                with artifacts.open(filename) as report:
+                    results.append(read(report))
+        return results
+
+
+def measure(artifact_path: str, read: callable) -> tuple:
+    """:return: decoded attributes, seconds, peak MB allocated while one report is decoded"""
+    start = time.perf_counter()
+    results = read_reports(artifact_path, read)
+    seconds = time.perf_counter() - start
+    with ZipFile(artifact_path, 'r') as artifacts:
+        with artifacts.open(artifacts.namelist()[0]) as report:
+            tracemalloc.start()
+            read(report)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+    return results, seconds, peak
+
+
+def main(members: int = 10000):
+    with tempfile.TemporaryDirectory() as tempdir:
+        artifact_path = path.join(tempdir, 'artifacts.zip')
+        make_artifact(artifact_path, members)
+        baseline, minidom_seconds, minidom_peak = measure(artifact_path, read_with_minidom)
+        results, pull_seconds, pull_peak = measure(artifact_path, read_with_pull_parser)
+    assert results == baseline, 'decoders read different attributes'
+    print(f'{members} reports')
+    print(f'minidom:      {minidom_seconds:.2f}s, peak {minidom_peak:.2f} MB per report')
+    print(f'pull parser:  {pull_seconds:.2f}s, peak {pull_peak:.2f} MB per report')
+    print(f'speedup:      {minidom_seconds / pull_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])